@@ -0,0 +1,101 @@
+"""
+benchmark for scoring the compatibility tags of wheel artifacts (as done when selecting the best artifact of a package).
+
+usage: PYTHONPATH=src:. python benchmarks/bench_compatibility_tags.py [--projects NAME,NAME,..] [--repeat R]
+
+the wheel file names are taken from the pypi json api of the given `projects` (requires network access, falling back to
+a synthetic listing that mimics projects with many binary wheels per release). the compatibility tags of all the
+file names are then scored against the running interpreter:
+ - by the unmemoized scorer (the behavior before the scores were memoized)
+ - by `compatibility_score` starting with empty memos (each unique tag and tag triple is scored once)
+ - by `compatibility_score` with warm memos
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List, Callable
+from urllib.request import urlopen
+
+from pkm.api.distributions.wheel_distribution import WheelDistribution
+from pkm.api.environments.environment_introspection import EnvironmentIntrospection
+
+_DEFAULT_PROJECTS = 'numpy,scipy,pandas,cryptography,pydantic-core,grpcio,lxml,pillow'
+
+_PLATFORMS = [
+    'manylinux_2_17_x86_64.manylinux2014_x86_64', 'manylinux_2_17_aarch64.manylinux2014_aarch64',
+    'musllinux_1_1_x86_64', 'musllinux_1_1_aarch64', 'macosx_10_9_x86_64', 'macosx_11_0_arm64',
+    'macosx_10_9_universal2', 'win32', 'win_amd64', 'win_arm64', 'manylinux_2_5_i686.manylinux1_i686']
+
+
+def synthetic_listing() -> List[str]:
+    result = []
+    for minor in range(40):
+        for py in range(6, 14):
+            for platform_ in _PLATFORMS:
+                result.append(f"project-1.{minor}.0-cp3{py}-cp3{py}-{platform_}.whl")
+        result.append(f"project-1.{minor}.0-py3-none-any.whl")
+    return result
+
+
+def projects_listing(projects: List[str]) -> List[str]:
+    result = []
+    for project in projects:
+        with urlopen(f"https://pypi.org/pypi/{project}/json") as response:
+            releases = json.loads(response.read())['releases']
+        result.extend(
+            file['filename'] for files in releases.values() for file in files if file['filename'].endswith('.whl'))
+    return result
+
+
+def measure(title: str, repeat: int, operation: Callable[[], object], setup: Callable[[], object] = lambda: None):
+    best = float('inf')
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        operation()
+        best = min(best, time.perf_counter() - start)
+    print(f"{title:<26} {best * 1000:>10.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--projects', default=_DEFAULT_PROJECTS)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    try:
+        file_names = projects_listing(args.projects.split(','))
+    except OSError as e:
+        print(f"could not fetch the projects listing ({e}), using a synthetic one")
+        file_names = synthetic_listing()
+
+    tags = [WheelDistribution.extract_compatibility_tags_of(Path(it)) for it in file_names]
+    introspection = EnvironmentIntrospection.compute(Path(sys.executable))
+    scorer = introspection._compatibility_tag_scorer  # noqa
+
+    def unmemoized_score(tag: str):
+        scores = [score for interpreters, abis, platforms in (tag.split('-'),)
+                  for interpreter in interpreters.split('.') for abi in abis.split('.')
+                  for platform_ in platforms.split('.')
+                  if (score := scorer(interpreter, abi, platform_)) is not None]
+        return max(scores, default=None)
+
+    def clear_memos():
+        introspection._tag_scores.clear()  # noqa
+        introspection._triple_scores.clear()  # noqa
+
+    compatible = sum(1 for it in set(tags) if introspection.compatibility_score(it) is not None)
+    print(f"{len(tags)} wheels ({len(set(tags))} unique tags, {compatible} of them compatible with {sys.executable})")
+
+    measure("unmemoized scorer", args.repeat, lambda: [unmemoized_score(it) for it in tags])
+    measure("score (cold memos)", args.repeat, lambda: [introspection.compatibility_score(it) for it in tags],
+            clear_memos)
+    measure("score (warm memos)", args.repeat, lambda: [introspection.compatibility_score(it) for it in tags])
+
+
+if __name__ == '__main__':
+    main()
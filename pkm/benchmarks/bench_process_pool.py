@@ -0,0 +1,83 @@
+"""
+benchmark for the startup and the per task costs of the process pool workers.
+
+usage: PYTHONPATH=src:. python benchmarks/bench_process_pool.py [--tasks N]
+
+measures:
+ - the worker startup time (spawning the interpreter and importing the preloaded modules), without preloading and
+   with the modules that pkm preloads for its installation tasks
+ - the latency of the first task sent to a cold pool and to a pool that was warmed up ahead of time
+ - `tasks` tasks that use an environment's markers, when the environment is sent without its introspection (the
+   worker introspects the interpreter for each task) and with it
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from typing import Callable
+
+from pkm.api import pkm as pkm_module
+from pkm.api.environments.environment import Environment
+from pkm.utils.multiproc import ProcessPoolExecutor
+
+
+def measure(title: str, operation: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    operation()
+    elapsed = time.perf_counter() - start
+    print(f"{title:<42} {elapsed * 1000:>10.2f} ms")
+    return elapsed
+
+
+def startup(preload_modules) -> float:
+    pool = ProcessPoolExecutor(max_workers=1, preload_modules=preload_modules)
+    try:
+        pool.warm_up()
+        pool.execute(os.getpid).result()
+        return pool.average_worker_startup_seconds
+    finally:
+        pool.close()
+
+
+def first_task_latency(warm: bool):
+    pool = ProcessPoolExecutor(max_workers=1, preload_modules=pkm_module._WORKER_PRELOADED_MODULES)  # noqa
+    try:
+        if warm:
+            pool.warm_up()
+            time.sleep(max(startup(()), 0.1) * 4)  # other work (e.g., downloads) is done while the worker starts
+        measure(f"first task latency ({'warm' if warm else 'cold'} pool)", lambda: pool.execute(os.getpid).result())
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tasks', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'worker startup (no preload)':<42} {startup(()) * 1000:>10.2f} ms")
+    print(f"{'worker startup (pkm preload)':<42} "
+          f"{startup(pkm_module._WORKER_PRELOADED_MODULES) * 1000:>10.2f} ms")  # noqa
+
+    first_task_latency(warm=False)
+    first_task_latency(warm=True)
+
+    pool = ProcessPoolExecutor(max_workers=1, preload_modules=pkm_module._WORKER_PRELOADED_MODULES)  # noqa
+    try:
+        pool.warm_up()
+        pool.execute(os.getpid).result()
+
+        measure(f"{args.tasks} tasks (env without introspection)",
+                lambda: [pool.execute(getattr, Environment.current(), 'markers').result() for _ in range(args.tasks)])
+
+        env = Environment.current()
+        _ = env.markers
+        measure(f"{args.tasks} tasks (env with introspection)",
+                lambda: [pool.execute(getattr, env, 'markers').result() for _ in range(args.tasks)])
+    finally:
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+micro-benchmark for the pubgrub solver on synthetic deep conflict graphs.
+
+usage: python benchmarks/bench_pubgrub.py [--fillers N] [--chains C] [--depth D] [--versions V] [--backtracks B]
+    [--repeat R]
+
+the generated problem contains `fillers` unrelated packages (that are decided early and therefore live at the bottom
+of the partial solution) and `chains` chains of `depth` packages with `versions` versions each where version k of a
+link depends on exactly version k of the next link while the last link only has its oldest version available -
+forcing the solver to repeatedly backjump over a large partial solution.
+
+in addition, the partial solution backtracking is measured in isolation - `fillers` decisions (each with a derived
+assignment) are made and then the deepest level is repeatedly undone and redone.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Dict, List, cast
+
+from pkm.api.versions.version import Version, StandardVersion
+from pkm.api.versions.version_specifiers import VersionMatch
+from pkm.resolution.pubgrub import Problem, Solver, Term, PartialSolution, Incompatibility
+
+
+class SyntheticConflictProblem(Problem):
+
+    def __init__(self, fillers: int, chains: int, depth: int, versions: int):
+        graph: Dict[str, Dict[str, List[Term]]] = {}
+
+        root_deps = [Term.create(f"filler{i}", "*") for i in range(fillers)]
+        root_deps.extend(Term.create(f"chain{c}-link0", "*") for c in range(chains))
+        graph["root"] = {"1.0.0": root_deps}
+
+        for i in range(fillers):
+            graph[f"filler{i}"] = {f"{v}.0.0": [] for v in range(1, 4)}
+
+        for c in range(chains):
+            for i in range(depth):
+                graph[f"chain{c}-link{i}"] = {
+                    f"{v}.0.0": [Term.create(f"chain{c}-link{i + 1}", f"=={v}.0.0")]
+                    for v in range(1, versions + 1)}
+            graph[f"chain{c}-link{depth}"] = {"1.0.0": []}
+
+        self._graph = graph
+
+    def get_dependencies(self, package: str, version: Version) -> List[Term]:
+        return self._graph[package][str(version)]
+
+    def get_versions(self, package: str) -> List[StandardVersion]:
+        return sorted((Version.parse(v) for v in self._graph[package]), reverse=True)
+
+    def has_version(self, package: str, version: Version) -> bool:
+        return str(version) in self._graph[package]
+
+
+def bench_solver(fillers: int, chains: int, depth: int, versions: int) -> float:
+    problem = SyntheticConflictProblem(fillers, chains, depth, versions)
+    start = time.perf_counter()
+    solution = Solver(problem).solve()
+    elapsed = time.perf_counter() - start
+
+    assert str(solution["chain0-link0"]) == "1.0.0", f"unexpected solution: {solution}"
+    return elapsed
+
+
+def bench_backtracking(fillers: int, iterations: int) -> float:
+    version = VersionMatch(Version.parse("1.0.0"))
+    solution = PartialSolution()
+    solution.assign(Term("root", version))
+    for i in range(fillers):
+        solution.assign(Term(f"filler{i}", version))
+        solution.assign(Term(f"filler{i}-dep", version), cause=cast(Incompatibility, "synthetic"))
+
+    deepest_level = fillers
+    start = time.perf_counter()
+    for _ in range(iterations):
+        solution.backtrack(deepest_level - 1)
+        solution.assign(Term(f"filler{fillers - 1}", version))
+        solution.assign(Term(f"filler{fillers - 1}-dep", version), cause=cast(Incompatibility, "synthetic"))
+
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fillers", type=int, default=300)
+    parser.add_argument("--chains", type=int, default=5)
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--versions", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+
+    parser.add_argument("--backtracks", type=int, default=10_000)
+    args = parser.parse_args()
+
+    timings = [bench_backtracking(args.fillers, args.backtracks) for _ in range(args.repeat)]
+    print(f"partial solution backtracking, fillers={args.fillers} backtracks={args.backtracks}: "
+          f"best={min(timings):.3f}s, avg={sum(timings) / len(timings):.3f}s")
+
+    timings = [bench_solver(args.fillers, args.chains, args.depth, args.versions) for _ in range(args.repeat)]
+    print(f"solver, fillers={args.fillers} chains={args.chains} depth={args.depth} versions={args.versions}: "
+          f"best={min(timings):.3f}s, avg={sum(timings) / len(timings):.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+benchmark for parsing pep 508 requirement strings.
+
+usage: PYTHONPATH=src:. python benchmarks/bench_requirements.py [--count N] [--repeat R]
+
+the requirement strings are the `Requires-Dist` entries of the distributions installed in the running interpreter
+(falling back to a small built-in sample when there are not enough of them), repeated (shuffled) up to `count` strings
+to simulate the repeated parsing of the same requirements by the resolver, the installed packages metadata, lock files,
+etc. then the strings are parsed:
+ - by the character level `PEP508DependencyParser` (the behavior before the parse caches were added)
+ - once per unique string, by `PEP508DependencyParser` and by the tokenizer based fast path
+ - by `Dependency.parse` starting with empty caches (each unique string is parsed once, mostly using the tokenizer
+   based fast path)
+ - by `Dependency.parse` with warm caches
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.metadata
+import random
+import time
+from typing import List, Callable
+
+from pkm.api.dependencies import dependency, env_markers
+from pkm.api.dependencies.dependency import Dependency, PEP508DependencyParser
+from pkm.api.versions import version_parser
+
+_SAMPLE = [
+    'attrs (>=20.1.0)', 'idna', 'charset-normalizer<4,>=2', 'urllib3<3,>=1.21.1', 'certifi>=2017.4.17',
+    'PySocks!=1.5.7,>=1.5.6; extra == "socks"', 'chardet<6,>=3.0.2; extra == "use-chardet-on-py3"',
+    'typing-extensions>=4.0.0; python_version < "3.11"', 'colorama; platform_system == "Windows"',
+    'importlib-metadata>=3.6; python_version < "3.10"', 'numpy>=1.22.4; python_version < "3.11"',
+    'pytest>=7.0; extra == "test"', 'pytest-cov[toml]>=2.12.0; extra == "test"', 'six>=1.5',
+    'cffi (>=1.14) ; os_name == "nt" and implementation_name != "pypy"', 'exceptiongroup>=1.0.2; python_version<"3.11"',
+    'tomli>=1.0.0; python_version < "3.11"', 'packaging>=20', 'pluggy<2,>=1.5', 'iniconfig', 'python-dateutil>=2.8.2',
+    'pytz>=2020.1', 'tzdata>=2022.7', 'sphinx~=7.2; extra == "docs"', 'MarkupSafe>=2.0', 'click>=8.1.3',
+    'Jinja2>=3.1.2', 'Werkzeug>=3.0.0', 'itsdangerous>=2.1.2', 'blinker>=1.6.2', 'pywin32>=226; sys_platform == "win32"',
+]
+
+
+def requirement_strings() -> List[str]:
+    result = [it for dist in importlib.metadata.distributions() for it in (dist.requires or ())]
+    return result if len(result) >= len(_SAMPLE) else result + _SAMPLE
+
+
+def clear_caches():
+    dependency._INTERNED_DEPENDENCIES.clear()  # noqa
+    env_markers._INTERNED_MARKERS.clear()  # noqa
+    version_parser._INTERNED_SPECIFIERS.clear()  # noqa
+    version_parser._INTERNED_VERSIONS.clear()  # noqa
+
+
+def measure(title: str, repeat: int, operation: Callable[[], object], setup: Callable[[], object] = lambda: None):
+    best = float('inf')
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        operation()
+        best = min(best, time.perf_counter() - start)
+    print(f"{title:<26} {best * 1000:>10.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    unique_strings = sorted(set(requirement_strings()))
+    strings = (unique_strings * (args.count // len(unique_strings) + 1))[:args.count]
+    random.Random(0).shuffle(strings)
+
+    simple = sum(1 for it in unique_strings if dependency._parse_simple_dependency(it) is not None)  # noqa
+    print(f"{len(strings)} requirement strings ({len(unique_strings)} unique, {simple} handled by the fast path)")
+
+    measure("pep508 parser", args.repeat, lambda: [PEP508DependencyParser(it).read_dependency() for it in strings])
+    measure("pep508 parser (unique)", args.repeat,
+            lambda: [PEP508DependencyParser(it).read_dependency() for it in unique_strings], clear_caches)
+    measure("fast path (unique)", args.repeat,
+            lambda: [dependency._parse_simple_dependency(it) for it in unique_strings], clear_caches)  # noqa
+    measure("parse (cold caches)", args.repeat, lambda: [Dependency.parse(it) for it in strings], clear_caches)
+    measure("parse (warm caches)", args.repeat, lambda: [Dependency.parse(it) for it in strings])
+
+
+if __name__ == '__main__':
+    main()
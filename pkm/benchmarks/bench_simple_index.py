@@ -0,0 +1,84 @@
+"""
+benchmark for the network traffic required to collect dependency information from a package index.
+
+usage: PYTHONPATH=src:. python benchmarks/bench_simple_index.py [--projects P] [--versions V] [--inspect I]
+    [--wheel-size S]
+
+a local stand-in index (see `tests/repositories/stand_in_index.py`) is populated with `projects` projects having
+`versions` versions each, then for each project the `inspect` latest versions are matched and their dependencies are
+computed (similar to what the resolver does while backtracking). this is done using:
+ - the pypi json api (`/pypi/<name>/json` + `/pypi/<name>/<version>/json`)
+ - the simple api with pep 691 json responses and pep 658 metadata files
+ - the simple api (html) on an index that does not serve metadata files, reading the wheel metadata using range
+   requests (lazy wheels)
+ - the simple api (html) on an index that does not serve metadata files nor support range requests (requiring
+   full wheel downloads)
+
+for each mode, the number of requests and the number of bytes transferred are reported.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable, Dict, List
+
+from pkm.api.environments.environment import Environment
+from pkm.api.repositories.repository import Repository
+from pkm.repositories.pypi_repository import PypiRepositoryBuilder
+from pkm.repositories.simple_repository import SimpleRepository
+from tests.repositories.stand_in_index import StandInIndex
+
+
+def build_projects(projects: int, versions: int) -> Dict[str, Dict[str, List[str]]]:
+    result: Dict[str, Dict[str, List[str]]] = {}
+    for p in range(projects):
+        dependencies = [f"project-{d} >=1.0" for d in range(p + 1, min(p + 4, projects))]
+        result[f"project-{p}"] = {f"1.{v}": dependencies for v in range(versions)}
+    return result
+
+
+def bench_mode(title: str, projects: Dict[str, Dict[str, List[str]]], inspect: int, wheel_size: int,
+               repository_factory: Callable[[StandInIndex], Repository], **index_options):
+    env = Environment.current()
+    with StandInIndex(projects, wheel_padding=wheel_size, **index_options) as index:
+        repository = repository_factory(index)
+
+        start = time.perf_counter()
+        for name in projects:
+            for package in repository.match(name, env)[:inspect]:
+                package.dependencies(env.installation_target)
+        elapsed = time.perf_counter() - start
+
+        print(f"{title:<36} {len(index.requests):>8} requests {index.bytes_sent / 1024:>12.1f} KiB "
+              f"{elapsed:>8.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--projects', type=int, default=20)
+    parser.add_argument('--versions', type=int, default=100)
+    parser.add_argument('--inspect', type=int, default=3)
+    parser.add_argument('--wheel-size', type=int, default=256 * 1024)
+    args = parser.parse_args()
+
+    projects = build_projects(args.projects, args.versions)
+    print(f"{args.projects} projects x {args.versions} versions, inspecting {args.inspect} versions per project, "
+          f"wheels of ~{args.wheel_size // 1024} KiB")
+
+    bench_mode("pypi json api", projects, args.inspect, args.wheel_size,
+               lambda index: PypiRepositoryBuilder().build('bench', f"{index.url}/pypi"))
+
+    bench_mode("simple api, pep 691 + pep 658", projects, args.inspect, args.wheel_size,
+               lambda index: SimpleRepository('bench', f"{index.url}/simple"))
+
+    bench_mode("simple api, html, lazy wheels", projects, args.inspect, args.wheel_size,
+               lambda index: SimpleRepository('bench', f"{index.url}/simple"),
+               json_api=False, serve_metadata=False)
+
+    bench_mode("simple api, html, full wheels", projects, args.inspect, args.wheel_size,
+               lambda index: SimpleRepository('bench', f"{index.url}/simple"),
+               json_api=False, serve_metadata=False, range_requests=False)
+
+
+if __name__ == '__main__':
+    main()
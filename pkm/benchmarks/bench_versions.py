@@ -0,0 +1,90 @@
+"""
+benchmark for parsing, sorting and hashing versions.
+
+usage: PYTHONPATH=src:. python benchmarks/bench_versions.py [--project NAME] [--copies C] [--repeat R]
+
+the release strings are taken from the pypi json api of the given `project` (if supplied, requires network access)
+or from a synthetic listing that mimics a large real-world project (many minor/patch releases, each with its dev, alpha,
+beta, release-candidate and post releases). the listing is duplicated `copies` times (shuffled) to simulate the
+repeated lookups performed by the resolver, then:
+ - all the strings are parsed
+ - the parsed versions are sorted (as done when matching packages and by the solver)
+ - the versions are inserted into a set and looked up in a dict (as done by the solver data structures)
+ - the (unique) versions are filtered by a set of specifiers, checking each version with `allows_version` and
+   using `SortedVersions` (bisection)
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from typing import List, Callable
+from urllib.request import urlopen
+
+from pkm.api.versions.version import Version
+from pkm.api.versions.version_specifiers import VersionSpecifier, SortedVersions
+
+
+def synthetic_listing() -> List[str]:
+    result = []
+    for major in range(3):
+        for minor in range(30):
+            base = f"{major}.{minor}"
+            result.extend([f"{base}.0.dev0", f"{base}.0a1", f"{base}.0b1", f"{base}.0rc1", f"{base}.0rc2"])
+            result.extend(f"{base}.{patch}" for patch in range(12))
+            result.extend([f"{base}.1.post1", f"{base}.2+local.7", f"{base}.3.post2.dev1"])
+    return result
+
+
+def project_listing(project: str) -> List[str]:
+    with urlopen(f"https://pypi.org/pypi/{project}/json") as response:
+        return list(json.load(response)['releases'].keys())
+
+
+def measure(title: str, repeat: int, operation: Callable[[], object]):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        best = min(best, time.perf_counter() - start)
+    print(f"{title:<24} {best * 1000:>10.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--project', default=None)
+    parser.add_argument('--copies', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    listing = project_listing(args.project) if args.project else synthetic_listing()
+    strings = listing * args.copies
+    random.Random(0).shuffle(strings)
+    print(f"{len(listing)} release strings x {args.copies} copies")
+
+    versions = [Version.parse(it) for it in strings]
+
+    measure("parse", args.repeat, lambda: [Version.parse(it) for it in strings])
+    measure("sort", args.repeat, lambda: sorted(versions))
+
+    def hash_lookups():
+        index = dict.fromkeys(set(versions))
+        return sum(1 for it in versions if it in index)
+
+    measure("set + dict lookups", args.repeat, hash_lookups)
+
+    unique_versions = sorted(set(versions), reverse=True)
+    index = SortedVersions(unique_versions)
+    specifiers = [
+        VersionSpecifier.parse(it)
+        for it in (">=1.0", "<2.5, >=1.2", "~=1.4", "==2.3.*", "!=1.1.0, !=1.2.0, <3", ">0.5.0.post1")]
+
+    measure("filter (allows_version)", args.repeat,
+            lambda: [[v for v in unique_versions if s.allows_version(v)] for s in specifiers])
+    measure("filter (bisection)", args.repeat, lambda: [index.matching(s) for s in specifiers])
+    measure("count (bisection)", args.repeat, lambda: [index.count_matching(s) for s in specifiers])
+
+
+if __name__ == '__main__':
+    main()
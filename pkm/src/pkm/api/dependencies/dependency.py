@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass, replace
-from typing import Optional, List, TYPE_CHECKING
+from typing import Optional, List, TYPE_CHECKING, Dict
 
 from pkm.api.dependencies.env_markers import PEP508EnvMarkerParser, EnvironmentMarker
 from pkm.api.versions.version import UrlVersion
@@ -67,7 +68,44 @@ class Dependency:
 
     @classmethod
     def parse(cls, text: str) -> "Dependency":
-        return PEP508DependencyParser(text).read_dependency()
+        if (dependency := _INTERNED_DEPENDENCIES.get(text)) is None:
+            if len(_INTERNED_DEPENDENCIES) >= _MAX_INTERNED_DEPENDENCIES:
+                _INTERNED_DEPENDENCIES.clear()
+            dependency = _INTERNED_DEPENDENCIES[text] = \
+                _parse_simple_dependency(text) or PEP508DependencyParser(text).read_dependency()
+        return dependency
+
+
+# dependencies are immutable, so the same requirement string is parsed once and the resulting instance is shared
+_INTERNED_DEPENDENCIES: Dict[str, Dependency] = {}
+_MAX_INTERNED_DEPENDENCIES = 64 * 1024
+
+# the common requirement forms (`name[extras] (>=x,<y); marker`) are tokenized by a regular expression, the versions
+# are restricted to forms that the version parser fully consumes so the result is identical to the one of
+# `PEP508DependencyParser`, anything else (urls, unusual versions, multiline text, etc.) is left for it to handle
+_SIMPLE_IDENTIFIER = r"[A-Za-z_][A-Za-z0-9_.\-]*"
+_SIMPLE_VERSION = r"\d+(?:\.\d+)*(?:(?:a|b|rc)\d+)?(?:\.post\d+)?(?:\.dev\d+)?(?:\.\*)?"
+_SIMPLE_CLAUSES = rf"(?:===|==|!=|~=|<=|>=|<|>)[ \t]*{_SIMPLE_VERSION}" \
+                  rf"(?:[ \t]*,[ \t]*(?:===|==|!=|~=|<=|>=|<|>)[ \t]*{_SIMPLE_VERSION})*"
+_SIMPLE_DEPENDENCY_RX = re.compile(
+    rf"[ \t]*(?P<name>{_SIMPLE_IDENTIFIER})[ \t]*"
+    rf"(?:\[(?P<extras>[ \t]*{_SIMPLE_IDENTIFIER}(?:[ \t]*,[ \t]*{_SIMPLE_IDENTIFIER})*[ \t]*)\][ \t]*)?"
+    rf"(?P<spec>{_SIMPLE_CLAUSES}|\([ \t]*{_SIMPLE_CLAUSES}[ \t]*\))?[ \t]*"
+    rf"(?:;[ \t]*(?P<marker>[^\n]*))?")
+
+
+def _parse_simple_dependency(text: str) -> Optional[Dependency]:
+    from pkm.api.packages.package import PackageDescriptor
+
+    if not (match := _SIMPLE_DEPENDENCY_RX.fullmatch(text)):
+        return None
+
+    name, extras, spec, marker = match.group('name', 'extras', 'spec', 'marker')
+    return Dependency(
+        PackageDescriptor.normalize_name(name),
+        VersionSpecifier.parse(spec) if spec else AllowAllVersions,
+        extras=[it.strip() for it in extras.split(',')] if extras else None,
+        env_marker=EnvironmentMarker.parse_pep508(marker) if marker else None)
 
 
 class PEP508DependencyParser(SimpleParser):
@@ -1,4 +1,5 @@
-from typing import Callable, Optional, List, Sequence, TYPE_CHECKING
+import operator
+from typing import Optional, List, Sequence, TYPE_CHECKING, Dict, Tuple, FrozenSet, Union, Callable
 
 from pkm.api.versions.version import Version
 from pkm.api.versions.version_specifiers import VersionSpecifier
@@ -6,32 +7,178 @@ from pkm.utils.parsers import SimpleParser
 
 _EXTRAS_COLLECTION_T = List
 _EXTRAS_T = _EXTRAS_COLLECTION_T[str]
-_MARKER_PRED_T = Callable[["Environment", _EXTRAS_T], bool]
-_MARKER_GET_T = Callable[["Environment", _EXTRAS_T], Sequence[str]]
-_MARKER_OP_T = Callable[[Sequence[str], Sequence[str]], bool]
+_MARKERS_T = Dict[str, str]
+_RESULT_KEY_T = Tuple[str, FrozenSet[str]]
 
 if TYPE_CHECKING:
     from pkm.api.environments.environment import Environment
 
+# markers are immutable, so the same marker text is compiled once and the resulting instance (with its results cache)
+# is shared between all the dependencies that use it
+_INTERNED_MARKERS: Dict[str, "EnvironmentMarker"] = {}
+_MAX_INTERNED_MARKERS = 16 * 1024
+_MAX_CACHED_RESULTS = 1024
+_NO_EXTRAS: FrozenSet[str] = frozenset()
+
 
 class EnvironmentMarker:
 
-    # noinspection PyShadowingBuiltins
-    def __init__(self, expr: str, exec: _MARKER_PRED_T):
+    def __init__(self, expr: str, tree: "_MarkerNode"):
         self._expr = expr
-        self._exec = exec
+        self._tree = tree
+        self._results: Dict[_RESULT_KEY_T, bool] = {}
 
     def evaluate_on(self, env: "Environment", extras: _EXTRAS_T) -> bool:
-        return self._exec(env, extras)
+        """
+        evaluate this marker on the given environment, the result is memoized per the environment's markers hash and
+        the given extras
+        :param env: the environment to evaluate on
+        :param extras: the extras that were requested for the package holding this marker
+        :return: true if the marker holds for the given environment and extras
+        """
+        key = (env.markers_hash, frozenset(extras) if extras else _NO_EXTRAS)
+        if (result := self._results.get(key)) is None:
+            if len(self._results) >= _MAX_CACHED_RESULTS:
+                self._results.clear()
+            result = self._results[key] = bool(self._tree.evaluate(env.markers, extras))
+        return result
 
     def __str__(self) -> str:
         return self._expr
 
     @classmethod
     def parse_pep508(cls, text: str) -> "EnvironmentMarker":
+        if marker := _INTERNED_MARKERS.get(text):
+            return marker
         return PEP508EnvMarkerParser(text).read_marker()
 
 
+def _intern_marker(expr: str, tree: "_MarkerNode") -> EnvironmentMarker:
+    if (marker := _INTERNED_MARKERS.get(expr)) is None:
+        if len(_INTERNED_MARKERS) >= _MAX_INTERNED_MARKERS:
+            _INTERNED_MARKERS.clear()
+        marker = _INTERNED_MARKERS[expr] = EnvironmentMarker(expr, tree)
+    return marker
+
+
+class _MarkerNode:
+    __slots__ = ()
+
+    def evaluate(self, markers: _MARKERS_T, extras: _EXTRAS_T) -> bool:
+        raise NotImplementedError()
+
+
+class _MarkerValue:
+    __slots__ = ()
+
+    def value_of(self, markers: _MARKERS_T, extras: _EXTRAS_T) -> Union[str, _EXTRAS_T]:
+        raise NotImplementedError()
+
+
+class _Literal(_MarkerValue):
+    __slots__ = ('value',)
+
+    def __init__(self, value: str):
+        self.value = value
+
+    def value_of(self, markers: _MARKERS_T, extras: _EXTRAS_T) -> str:
+        return self.value
+
+
+class _EnvironmentVariable(_MarkerValue):
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def value_of(self, markers: _MARKERS_T, extras: _EXTRAS_T) -> str:
+        return markers[self.name]
+
+
+class _Extra(_MarkerValue):
+    __slots__ = ()
+
+    def value_of(self, markers: _MARKERS_T, extras: _EXTRAS_T) -> _EXTRAS_T:
+        return extras
+
+
+_VERSION_OPS = ("<=", "<", ">=", ">", "!=", "==", "===", "~=")
+_STRING_OPS: Dict[str, Callable[[str, str], bool]] = {
+    '<=': operator.le, '<': operator.lt, '>=': operator.ge, '>': operator.gt, '!=': operator.ne, '==': operator.eq,
+    '===': operator.eq, 'in': lambda a, b: a in b, 'not in': lambda a, b: a not in b}
+
+# marks a comparison whose (constant) right operand is not a version, such comparisons are done on the strings
+_NOT_A_SPECIFIER = object()
+
+
+class _Comparison(_MarkerNode):
+    __slots__ = ('_left', '_op', '_right', '_left_version', '_right_spec')
+
+    def __init__(self, left: _MarkerValue, op: str, right: _MarkerValue):
+        self._left = left
+        self._op = op
+        self._right = right
+
+        # constant operands are parsed once, at compile time
+        self._left_version: Optional[Version] = None
+        self._right_spec: Optional[object] = None
+        if op in _VERSION_OPS:
+            if isinstance(left, _Literal):
+                self._left_version = Version.parse(left.value)
+            if isinstance(right, _Literal):
+                try:
+                    self._right_spec = VersionSpecifier.parse(f"{op} {right.value}")
+                except ValueError:
+                    if op != '~=':  # invalid ~= specifiers are reported on evaluation
+                        self._right_spec = _NOT_A_SPECIFIER
+
+    def evaluate(self, markers: _MARKERS_T, extras: _EXTRAS_T) -> bool:
+        a = self._left.value_of(markers, extras)
+        b = self._right.value_of(markers, extras)
+        op = self._op
+
+        if op not in _VERSION_OPS:
+            return _STRING_OPS[op](str(a), str(b))
+
+        if op in ('==', '==='):
+            if isinstance(a, _EXTRAS_COLLECTION_T):
+                return b in a
+            elif isinstance(b, _EXTRAS_COLLECTION_T):
+                return a in b
+
+        if (spec := self._right_spec) is not _NOT_A_SPECIFIER:
+            try:
+                a_ver = self._left_version if self._left_version is not None else Version.parse(str(a))
+                if spec is None:
+                    spec = VersionSpecifier.parse(f"{op} {b}")
+                return spec.allows_version(a_ver)
+            except ValueError:
+                if op == '~=':
+                    raise
+
+        return _STRING_OPS[op](str(a), str(b))
+
+
+class _And(_MarkerNode):
+    __slots__ = ('_operands',)
+
+    def __init__(self, operands: Sequence[_MarkerNode]):
+        self._operands = tuple(operands)
+
+    def evaluate(self, markers: _MARKERS_T, extras: _EXTRAS_T) -> bool:
+        return all(it.evaluate(markers, extras) for it in self._operands)
+
+
+class _Or(_MarkerNode):
+    __slots__ = ('_operands',)
+
+    def __init__(self, operands: Sequence[_MarkerNode]):
+        self._operands = tuple(operands)
+
+    def evaluate(self, markers: _MARKERS_T, extras: _EXTRAS_T) -> bool:
+        return any(it.evaluate(markers, extras) for it in self._operands)
+
+
 _MARKER_STR_CHARS = set(
     ' \t0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIZKLMNOPQRSTUVWXYZ().{}-_*#:;,/?[]!`~@$%^&=+|<>')
 
@@ -51,50 +198,28 @@ class PEP508EnvMarkerParser(SimpleParser):
         self.match_or_err(quote, f'expecting closing quote: ({quote})')
         return content
 
-    def _read_marker_var(self) -> _MARKER_GET_T:
+    def _read_marker_var(self) -> _MarkerValue:
         if self.peek() in '"\'':
-            v_str = self._read_str()
-            return lambda e, x: v_str
-        else:
-            v_ident = self._read_identifier()
+            return _Literal(self._read_str())
 
-            if v_ident == 'extra':
-                return lambda e, x: x
+        v_ident = self._read_identifier()
+        if v_ident == 'extra':
+            return _Extra()
 
-            return lambda e, x: e.markers[v_ident]
+        return _EnvironmentVariable(v_ident)
 
-    def _read_marker_op(self) -> _MARKER_OP_T:
-        version_or_string_op = self.match_any("<=", "<", ">=", ">", "!=", "==", "===", "~=")
+    def _read_marker_op(self) -> str:
+        version_or_string_op = self.match_any(*_VERSION_OPS)
         if version_or_string_op:
-            def _op(a: Sequence[str], b: Sequence[str]) -> bool:
-
-                if version_or_string_op in ('==', '==='):
-                    if isinstance(a, _EXTRAS_COLLECTION_T):
-                        return b in a
-                    elif isinstance(b, _EXTRAS_COLLECTION_T):
-                        return a in b
-
-                try:
-                    a_ver = Version.parse(str(a))
-                    spec = VersionSpecifier.parse(f"{version_or_string_op} {b}")
-                    return spec.allows_version(a_ver)
-                except ValueError:
-                    if version_or_string_op == '~=':
-                        raise
-                    return eval(f"{repr(str(a))} {version_or_string_op} {repr(str(b))}")
-
-            return _op
+            return version_or_string_op
 
         string_op: str = self.match("in") or (self.match("not", "in") and "not in")
         if not string_op:
             self.raise_err("could not parse operator")
 
-        def _op(a: Sequence[str], b: Sequence[str]) -> bool:
-            return eval(f"{repr(str(a))} {string_op} {repr(str(b))}")
-
-        return _op
+        return string_op
 
-    def _read_marker_expr(self) -> _MARKER_PRED_T:
+    def _read_marker_expr(self) -> _MarkerNode:
         self.match_ws()
 
         if self.match("("):
@@ -108,49 +233,38 @@ class PEP508EnvMarkerParser(SimpleParser):
         self.match_ws()
         right = self._read_marker_var()
 
-        return lambda e, x: op(left(e, x), right(e, x))
+        return _Comparison(left, op, right)
 
-    def _read_marker_compound_expr(self) -> _MARKER_PRED_T:
+    def _read_marker_compound_expr(self) -> _MarkerNode:
         self.match_ws()
 
-        expr: Optional[_MARKER_PRED_T] = None
-        self.match_ws()
-
-        ors: List[_MARKER_PRED_T] = []
+        # 'and' binds tighter than 'or', so the expression is collected as a disjunction of conjunctions
+        ors: List[List[_MarkerNode]] = []
         while self.is_not_empty() and self.peek() not in ';)':
 
-            if expr:
+            if ors:
                 lop = self.match_any('and', 'or')
                 if not lop:
                     self.raise_err('expecting logical operator: and/or')
 
                 next_expr = self._read_marker_expr()
-
                 if lop == 'and':
-                    def expr(e, x, ex1=expr, ex2=next_expr):
-                        return ex1(e, x) and ex2(e, x)
-
+                    ors[-1].append(next_expr)
                 else:
-                    ors.append(expr)
-                    expr = next_expr
+                    ors.append([next_expr])
 
             else:
-                expr = self._read_marker_expr()
+                ors.append([self._read_marker_expr()])
 
             self.match_ws()
 
-        if ors:
-            ors.append(expr)
-
-            def expr(e, x):
-                return any(expr_(e, x) for expr_ in ors)
-
-        if expr is None:
+        if not ors:
             self.raise_err('expecting environment marker expression')
 
-        return expr
+        ands = [ands[0] if len(ands) == 1 else _And(ands) for ands in ors]
+        return ands[0] if len(ands) == 1 else _Or(ands)
 
     def read_marker(self) -> EnvironmentMarker:
         p = self.position
-        exe = self._read_marker_compound_expr()
-        return EnvironmentMarker(self.text[p:self.position], exe)
+        tree = self._read_marker_compound_expr()
+        return _intern_marker(self.text[p:self.position], tree)
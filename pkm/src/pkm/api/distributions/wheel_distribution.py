@@ -1,24 +1,32 @@
-import compileall
-import importlib.util
+import hashlib
 import re
+import shutil
+import stat
+import time
 import warnings
+import zipfile
 from dataclasses import replace
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Optional, TYPE_CHECKING, List, Dict
-from zipfile import ZipFile
+from typing import Optional, TYPE_CHECKING, List, Dict, Tuple
+from zipfile import ZipFile, BadZipFile, ZipInfo
 
 from pkm.api.dependencies.dependency import Dependency
-from pkm.api.distributions.distinfo import DistInfo, RecordsFileConfiguration, Record
+from pkm.api.distributions.distinfo import DistInfo, RecordsFileConfiguration, Record, WheelFileConfiguration
 from pkm.api.distributions.distribution import Distribution
 from pkm.api.packages.package import PackageDescriptor
 from pkm.api.packages.package_installation_info import PackageInstallationInfo
+from pkm.api.packages.package_monitors import BytecodeCompilationMonitoredOp
 from pkm.api.packages.package_metadata import PackageMetadata
 from pkm.api.versions.version import StandardVersion
 from pkm.api.versions.version_specifiers import StandardVersionRange
 from pkm.launchers.executables import Executables
-from pkm.utils.archives import extract_archive
-from pkm.utils.files import path_to, CopyTransaction, temp_dir, is_empty_directory
+from pkm.utils.bytecode import compile_sources, is_compilation_deferred
+from pkm.utils.content_store import ContentStore
+from pkm.utils.entrypoints import EntryPoint
+from pkm.utils.files import path_to, CopyTransaction, is_empty_directory
+from pkm.utils.hashes import HashSignature
+from pkm.utils.http.http_client import HttpException
 
 _METADATA_FILE_RX = re.compile("[^/]*\\.dist-info/METADATA")
 
@@ -26,6 +34,7 @@ if TYPE_CHECKING:
     from pkm.api.packages.package import PackageInstallationTarget
     from pkm.api.projects.project import Project
     from pkm.api.environments.environment import Environment
+    from pkm.utils.http.http_client import HttpClient
 
 
 class InstallationException(IOError):
@@ -48,6 +57,23 @@ class WheelDistribution(Distribution):
                         return PackageMetadata.load(Path(tdir) / name)
         raise FileNotFoundError("could not find metadata in wheel")
 
+    @staticmethod
+    def fetch_remote_metadata(
+            http: "HttpClient", url: str, resource_name: Optional[str] = None) -> Optional[PackageMetadata]:
+        """
+        read the metadata of a remote wheel without downloading the whole wheel (see `HttpClient.fetch_zip_member`)
+        :param http: the http client to use
+        :param url: the url of the wheel
+        :param resource_name: human readable name of the wheel, used for monitoring
+        :return: the wheel metadata or None if it could not be read without downloading the wheel
+        """
+        try:
+            if metadata_file := http.fetch_zip_member(url, _METADATA_FILE_RX, resource_name):
+                return PackageMetadata.load(metadata_file)
+        except (HttpException, BadZipFile):
+            pass  # the caller is expected to fall back into downloading the wheel
+        return None
+
     @property
     def owner_package(self) -> PackageDescriptor:
         return self._package
@@ -122,61 +148,199 @@ class WheelDistribution(Distribution):
                 else:
                     ct.copy(d, site_packages / d.name)
 
-            # build entry points
-            scripts_path = Path(target.scripts)
-            for entrypoint in entrypoints:
-                if entrypoint.is_script():
-                    ct.touch(Executables.generate_for_entrypoint(target.env, entrypoint, scripts_path))
-
-            #  compile py to pyc
-            new_pyc_files: List[str] = []
-            with warnings.catch_warnings():
-                warnings.filterwarnings('ignore')
-                for cc in ct.copied_files:
-                    if cc.suffix == '.py':
-                        compileall.compile_file(cc, force=True, quiet=2)
-                        new_pyc_files.append(importlib.util.cache_from_source(str(cc)))
-
-            # mark the compiled files in the transaction, so that they will be added to record
-            for npf in new_pyc_files:
-                ct.touch(Path(npf))
-
-            # build the new records file
-            new_dist_info = DistInfo.load(site_packages / dist_info.path.name)
-            new_record_file = new_dist_info.load_record_cfg()
-
             precomputed_hashes = {
                 r.file: r.hash_signature for r in records_file.records if r.hash_signature
             } if not skip_record_verification else None
-            new_record_file.sign_files(ct.copied_files, site_packages, precomputed_hashes)
 
-            new_record_file.save()
-
-            # and finally, mark the installer and the requested flag
-            (new_dist_info.path / "INSTALLER").write_text(f"pkm")
-            if user_request:
-                new_dist_info.mark_as_user_requested(user_request)
-            if installation_info:
-                new_dist_info.save_installation_info(installation_info)
+            _complete_installation(
+                package, ct, DistInfo.load(site_packages / dist_info.path.name), site_packages, entrypoints, target,
+                precomputed_hashes, user_request, installation_info)
 
     def install_to(self, target: "PackageInstallationTarget", user_request: Optional[Dependency] = None,
                    installation_mode: Optional[PackageInstallationInfo] = None):
         """
         Implementation of wheel installer based on PEP427
         as described in: https://packaging.python.org/en/latest/specifications/binary-distribution-format/
+
+        the wheel members are streamed directly into their installation paths (no temporary extraction), each member
+        is verified against its RECORD hash while it is written and the verified hash is reused for the installed
+        RECORD, so that each byte is read once and written once.
+        when the content store is enabled, members whose content is already in the store are materialized from it
+        (see `ContentStore`) and the other members are added to it after they were verified
         """
 
-        with temp_dir() as tmp_path:
-            extract_archive(self._wheel, tmp_path)
-            if not installation_mode:
-                installation_mode = PackageInstallationInfo()
+        if not installation_mode:
+            installation_mode = PackageInstallationInfo()
+
+        if not installation_mode.compatibility_tag:
+            installation_mode = replace(
+                installation_mode, compatibility_tag=WheelDistribution.extract_compatibility_tags_of(self._wheel))
+
+        from pkm.api.pkm import pkm
+        store = pkm.content_store if pkm.config.content_store else None
 
-            if not installation_mode.compatibility_tag:
-                installation_mode = replace(
-                    installation_mode, compatibility_tag=WheelDistribution.extract_compatibility_tags_of(self._wheel))
+        with ZipFile(self._wheel) as zipf:
+            _install_wheel_archive(self._package, zipf, target, user_request, installation_mode, store)
+
+
+def _complete_installation(
+        package: PackageDescriptor, ct: CopyTransaction, new_dist_info: DistInfo, site_packages: Path,
+        entrypoints: List[EntryPoint], target: "PackageInstallationTarget",
+        precomputed_hashes: Optional[Dict[str, HashSignature]], user_request: Optional[Dependency],
+        installation_info: Optional[PackageInstallationInfo]):
+    # build entry points
+    scripts_path = Path(target.scripts)
+    for entrypoint in entrypoints:
+        if entrypoint.is_script():
+            ct.touch(Executables.generate_for_entrypoint(target.env, entrypoint, scripts_path))
+
+    #  compile py to pyc (unless the compilation is done in a separate phase, see `InstallationPlan.execute`)
+    from pkm.api.pkm import pkm
+    compilation = pkm.config.bytecode_compilation
+    if compilation == "inline" or (compilation == "batch" and not is_compilation_deferred()):
+        optimization_levels = pkm.config.bytecode_optimization_levels
+        with BytecodeCompilationMonitoredOp([package], optimization_levels) as mop:
+            start = time.perf_counter()
+            new_pyc_files = compile_sources(
+                [str(it) for it in ct.copied_files if it.suffix == '.py'], optimization_levels)
+            mop.files_compiled, mop.elapsed_seconds = len(new_pyc_files), time.perf_counter() - start
+
+        # mark the compiled files in the transaction, so that they will be added to record
+        for npf in new_pyc_files:
+            ct.touch(Path(npf))
+
+    # build the new records file (replacing the wheel's one if it was installed as part of the transaction)
+    new_record_file = RecordsFileConfiguration.from_config({}, new_dist_info.record_path())
+    new_record_file.sign_files(
+        (it for it in ct.copied_files if it != new_record_file.path), site_packages, precomputed_hashes)
+
+    new_record_file.save()
+
+    # and finally, mark the installer and the requested flag
+    (new_dist_info.path / "INSTALLER").write_text(f"pkm")
+    if user_request:
+        new_dist_info.mark_as_user_requested(user_request)
+    if installation_info:
+        new_dist_info.save_installation_info(installation_info)
+
+
+def _install_wheel_archive(
+        package: PackageDescriptor, zipf: ZipFile, target: "PackageInstallationTarget",
+        user_request: Optional[Dependency], installation_info: Optional[PackageInstallationInfo],
+        store: Optional[ContentStore] = None):
+    members = [it for it in zipf.infolist() if not it.is_dir()]
+
+    dist_info_names = {name for it in members if (name := it.filename.split('/', 1)[0]).endswith('.dist-info')}
+    if not dist_info_names:
+        raise InstallationException(f"wheel for {package} does not contain dist-info")
+    if len(dist_info_names) != 1:
+        raise InstallationException(f"wheel for {package} contains more than one possible dist-info")
+    dist_info_name = dist_info_names.pop()
+
+    wheel_file = WheelFileConfiguration.load(zipfile.Path(zipf, f"{dist_info_name}/WHEEL"))
+    wheel_file.validate_supported_version()
+
+    site_packages = Path(target.purelib if wheel_file.root_is_purelib else target.platlib)
+    new_dist_info = DistInfo.load(site_packages / dist_info_name)
+    data_dir_name = Path(dist_info_name).with_suffix(".data").name
+    record_member = f"{dist_info_name}/RECORD"
+
+    with CopyTransaction() as ct:
+        if not any(it.filename == record_member for it in members):
+            raise InstallationException(
+                f"Unsigned wheel for package {dist_info_name.split('-')[0]} (no RECORD file found in dist-info)")
+
+        # the wheel's RECORD is written first (it is replaced by the installed RECORD when the installation completes)
+        with zipf.open(record_member) as record_fd, ct.open_for_write(new_dist_info.record_path()) as target_fd:
+            shutil.copyfileobj(record_fd, target_fd)
+        record_by_path: Dict[str, Record] = {r.file: r for r in new_dist_info.load_record_cfg().records}
+
+        signatures: Dict[str, HashSignature] = {}
+        for member in members:
+            path = member.filename
+            if path == record_member:
+                continue
+
+            if not (record := record_by_path.get(path)) or not record.hash_signature:
+                raise InstallationException(f"Wheel contains files with no signature in RECORD, e.g., {path}")
+
+            parts = path.split('/')
+            if path.startswith('/') or '..' in parts:
+                raise InstallationException(f"Wheel contains file outside of its installation root: {path}")
+
+            shabang_interpreter: Optional[Path] = None
+            if parts[0] == data_dir_name and len(parts) > 2:
+                target_path = Path(getattr(target, parts[1]) or Path(target.data, parts[1]), *parts[2:])
+                if parts[1] == 'scripts':
+                    shabang_interpreter = target.env.interpreter_path
+            else:
+                target_path = site_packages.joinpath(*parts)
+
+            # dist-info files may be modified in place after the installation and scripts are patched per
+            # environment, so both are not shared through the content store
+            use_store = store is not None and not shabang_interpreter and parts[0] != dist_info_name
+            if use_store and record.hash_signature.hash_type == 'sha256' and store.materialize(
+                    record.hash_signature.hex_value(), ct.prepare(target_path)):
+                signatures[str(path_to(site_packages, target_path))] = record.hash_signature
+                continue
+
+            verified, signature = _install_wheel_member(
+                zipf, member, ct, target_path, record.hash_signature, shabang_interpreter)
+
+            if not verified:
+                if parts[0] == dist_info_name:
+                    warnings.warn(f"mismatch hash signature for {target_path}")
+                else:
+                    raise InstallationException(f"File signature not matched for: {record.file}")
 
-            WheelDistribution.install_extracted_wheel(
-                self._package, tmp_path, target, user_request, installation_mode)
+            if use_store:
+                store.insert(signature.hex_value(), target_path)
+
+            signatures[str(path_to(site_packages, target_path))] = signature
+
+        _complete_installation(
+            package, ct, new_dist_info, site_packages, new_dist_info.load_entrypoints_cfg().entrypoints, target,
+            signatures, user_request, installation_info)
+
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _install_wheel_member(
+        zipf: ZipFile, member: ZipInfo, ct: CopyTransaction, target_path: Path, record_signature: HashSignature,
+        shabang_interpreter: Optional[Path]) -> Tuple[bool, HashSignature]:
+    """
+    stream the given wheel `member` into `target_path`, verifying its content against `record_signature` on the way
+    :param zipf: the wheel archive
+    :param member: the member to install
+    :param ct: the installation transaction
+    :param target_path: the installation path of the member
+    :param record_signature: the member's signature, as found in the wheel's RECORD
+    :param shabang_interpreter: if given, the member is a script whose shabang line should be patched to use this
+        interpreter
+    :return: tuple (verified, signature) where verified is True if the member content matched `record_signature`
+        and signature is the (sha256) signature of the written file, to be used in the installed RECORD
+    """
+    verifier = record_signature.create_digester()
+    signer = verifier if record_signature.hash_type == 'sha256' and not shabang_interpreter else hashlib.sha256()
+
+    with zipf.open(member) as source_fd, ct.open_for_write(target_path) as target_fd:
+        first_chunk = True
+        while chunk := source_fd.read(_CHUNK_SIZE):
+            verifier.update(chunk)
+            if shabang_interpreter and first_chunk:
+                line_end = chunk.find(b'\n') + 1 or len(chunk)
+                chunk = Executables.patch_shabang_line(chunk[:line_end], shabang_interpreter) + chunk[line_end:]
+            if signer is not verifier:
+                signer.update(chunk)
+            target_fd.write(chunk)
+            first_chunk = False
+
+    if shabang_interpreter:
+        target_path.chmod(target_path.stat().st_mode | stat.S_IEXEC)
+
+    return record_signature.validate_digest(verifier), \
+        HashSignature.create_urlsafe_base64_nopad_encoded('sha256', signer)
 
 
 def _find_dist_info(unpacked_wheel: Path, package: PackageDescriptor) -> DistInfo:
@@ -17,7 +17,7 @@ from pkm.api.environments.environment_introspection import EnvironmentIntrospect
 from pkm.api.packages.package_installation import PackageInstallationTarget
 from pkm.api.packages.package_installation_info import StoreMode
 from pkm.api.packages.site_packages import SitePackages
-from pkm.api.pkm import HasAttachedRepository
+from pkm.api.pkm import HasAttachedRepository, pkm
 from pkm.api.repositories.repository import Repository
 from pkm.api.versions.version import StandardVersion, Version
 from pkm.utils.commons import unone, NoSuchElementException
@@ -52,10 +52,17 @@ class Environment(HasAttachedRepository, Serializable):
             self.zoo = zoo  # noqa
 
     def __getstate__(self):
-        return [[self._env_path, self._interpreter_path], {'use_user_site': self._use_user_site, 'zoo': self.zoo}]
+        # an already computed introspection is shipped along, so that the receiver (e.g., a worker process) does not
+        # have to introspect the interpreter again
+        introspection: Optional[EnvironmentIntrospection] = self.__dict__.get('_cached__introspection')
+        # noinspection PyProtectedMember
+        return [[self._env_path, self._interpreter_path], {'use_user_site': self._use_user_site, 'zoo': self.zoo},
+                introspection._data if introspection else None]
 
     def __setstate__(self, state):
         self.__init__(*state[0], **state[1])
+        if len(state) > 2 and state[2] is not None:
+            self._introspection = EnvironmentIntrospection(state[2])
 
     @property
     def path(self) -> Path:
@@ -83,9 +90,8 @@ class Environment(HasAttachedRepository, Serializable):
     @cached_property
     def _introspection(self) -> EnvironmentIntrospection:
         if not Environment.is_venv_path(self._env_path):  # system environment
-            return EnvironmentIntrospection.compute(self.interpreter_path)
-        return EnvironmentIntrospection.load_or_compute(
-            self._env_path / 'etc/pkm/env_introspection.json', self.interpreter_path, True)
+            return pkm.introspection_cache.get(self.interpreter_path)
+        return pkm.introspection_cache.get(self.interpreter_path, self._env_path)
 
     @property
     def name(self) -> str:
@@ -149,6 +155,14 @@ class Environment(HasAttachedRepository, Serializable):
         """
         return self._introspection.compatibility_score(tag)
 
+    @property
+    def compatibility_fingerprint(self) -> str:
+        """
+        :return: a digest that identifies how this environment scores compatibility tags (see `compatibility_tag_score`),
+                 environments with the same fingerprint select the same artifacts
+        """
+        return self._introspection.compatibility_fingerprint
+
     @cached_property
     def markers(self) -> Dict[str, str]:
         """
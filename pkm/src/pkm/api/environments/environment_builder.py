@@ -3,10 +3,8 @@ import shutil
 import sys
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict
 
 from pkm.api.environments.environment import Environment
-from pkm.api.environments.environment_introspection import EnvironmentIntrospection
 from pkm.api.pkm import pkm
 from pkm.api.versions.version import Version
 from pkm.api.versions.version_specifiers import VersionSpecifier
@@ -14,7 +12,6 @@ from pkm.config.configclass import ConfigFile, config, config_field
 from pkm.config.configfiles import WheelFileConfigIO
 from pkm.utils.commons import NoSuchElementException
 
-_INTERPRETER_INTROSPECTIONS: Dict[str, EnvironmentIntrospection] = {}
 _PYVENV_SEP_RX = re.compile("\\s*=\\s*")
 
 
@@ -49,7 +46,7 @@ class EnvironmentBuilder:
         if env_path.exists():
             raise FileExistsError(f"{env_path} already exists")
 
-        ispc = _introspection_for(interpreter_path)
+        ispc = pkm.introspection_cache.get(interpreter_path)
         sys_platform = ispc['sys']['platform']
         is_windows = ispc.is_windows_env()
         sys_vinfo = ispc['sys']['version_info']
@@ -104,14 +101,6 @@ class EnvironmentBuilder:
         return Environment(env_path)
 
 
-def _introspection_for(interpreter_path: Path) -> EnvironmentIntrospection:
-    interpreter_key = str(interpreter_path.absolute())
-    if (intro := _INTERPRETER_INTROSPECTIONS.get(interpreter_key)) is None:
-        _INTERPRETER_INTROSPECTIONS[interpreter_key] = intro = EnvironmentIntrospection.compute(interpreter_path)
-
-    return intro
-
-
 @dataclass
 @config(io=WheelFileConfigIO())
 class PyVEnvConfiguration(ConfigFile):
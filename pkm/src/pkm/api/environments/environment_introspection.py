@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import os
+import platform
 import re
 import subprocess
 import warnings
@@ -82,6 +84,9 @@ result = {
 print(json.dumps(result))
 """
 
+_UNSCORED = object()
+_MAX_MEMOIZED_SCORES = 16 * 1024
+
 _USER_SCHEME_BY_PLATFORM = {
     "Linux": "posix_user",
     "Windows": "nt_user",
@@ -95,6 +100,11 @@ class EnvironmentIntrospection:
     def __init__(self, data: Dict[str, Any]):
         self._data = data
 
+        # compatibility scores are memoized per tag and per (interpreter, abi, platform) triple, artifact selection
+        # scores the (mostly repeating) tags of every artifact of every candidate version
+        self._tag_scores: Dict[str, Optional[Comparable]] = {}
+        self._triple_scores: Dict[Tuple[str, str, str], Optional[Comparable]] = {}
+
     def __getitem__(self, item):
         return self._data[item]
 
@@ -148,13 +158,26 @@ class EnvironmentIntrospection:
         :return: an opaque score object that support __le__ and __eq__ operations (read: comparable)
                  which can be treated as a score (read: higher is better)
         """
+        if (score := self._tag_scores.get(tag, _UNSCORED)) is _UNSCORED:
+            if len(self._tag_scores) >= _MAX_MEMOIZED_SCORES:
+                self._tag_scores.clear()
+            score = self._tag_scores[tag] = self._compute_compatibility_score(tag)
+        return score
+
+    def _compute_compatibility_score(self, tag: str) -> Optional[Comparable]:
         try:
+            triple_scores = self._triple_scores
+            if len(triple_scores) >= _MAX_MEMOIZED_SCORES:
+                triple_scores.clear()
+
             max_score = None
             interpreters, abis, platforms = tag.split("-")
             for interpreter in interpreters.split("."):
                 for abi in abis.split("."):
                     for platform_ in platforms.split("."):
-                        score = self._compatibility_tag_scorer(interpreter, abi, platform_)
+                        triple = (interpreter, abi, platform_)
+                        if (score := triple_scores.get(triple, _UNSCORED)) is _UNSCORED:
+                            score = triple_scores[triple] = self._compatibility_tag_scorer(*triple)
 
                         if score is not None and (max_score is None or max_score < score):
                             max_score = score
@@ -164,6 +187,25 @@ class EnvironmentIntrospection:
             traceback.print_exc()
             return None
 
+    @cached_property
+    def compatibility_fingerprint(self) -> str:
+        """
+        :return: a digest of the interpreter information that the compatibility tags scoring is based on (see
+                 `compatibility_score`), introspections with the same fingerprint score every tag the same
+        """
+        data, sysconfig_vars = self._data, self._data['sysconfig']['vars']
+        elf = _ElfData.read(Path(self.interpreter_path)) if data['platform']['system'] == 'Linux' else None
+        material = [
+            data['sys']['implementation']['name'], data['sys']['version_info'][:2], data['sys']['maxsize'],
+            data['sys']['has_totalrefcount'], data['sys']['maxunicode'],
+            [sysconfig_vars.get(it) for it in ('SOABI', 'Py_DEBUG', 'WITH_PYMALLOC', 'Py_UNICODE_SIZE')],
+            data['importlib']['machinery']['EXTENSION_SUFFIXES'], data['os']['conf'].get('CS_GNU_LIBC_VERSION'),
+            data['platform']['system'], data['platform']['mac_ver'], data['sysconfig']['platform'],
+            # the elf program interpreter distinguishes musl based interpreters
+            [elf.is_32_bit, elf.is_little_endian, elf.machine, elf.flags, elf.interpreter] if elf else None]
+
+        return hashlib.sha256(json.dumps(material).encode()).hexdigest()
+
     @property
     def interpreter_name(self) -> str:
         """
@@ -395,30 +437,108 @@ class EnvironmentIntrospection:
             output = proc_result.stdout.decode()
             return cls(data=json.loads(output))
 
-    @classmethod
-    def load_or_compute(
-            cls, path: Path, interpreter_path: Path,
-            save_if_recomputed: bool = True) -> "EnvironmentIntrospection":
 
-        try:
-            data = json.loads(path.read_text()) if path.exists() else {}
-        except JSONDecodeError as err:
-            warnings.warn(f"env introspection is corrupted, rebuilding it: {err}")
-            data = {}
-
-        current_introspection_sentinal = hash((_INTROSPECTION_CODE, str(interpreter_path.absolute())))
-        if (introspection_sentinal := data.get('introspection')) \
-                and introspection_sentinal == current_introspection_sentinal:
-            return cls(data=data)
-
-        result = cls.compute(interpreter_path)
-        if save_if_recomputed:
-            data = result._data
-            data['introspection'] = current_introspection_sentinal
-            path.parent.mkdir(exist_ok=True, parents=True)
-            path.write_text(json.dumps(data))
+class IntrospectionCache:
+    """
+    a persistent cache of interpreter introspections, kept in the pkm home and shared by all the processes.
 
-        return result
+    the entries are keyed by a stable fingerprint of the introspection code and the identity of the interpreter binary
+    (its real path, inode, size and modification time), so an entry is invalidated when its interpreter is replaced.
+    introspections of virtual environments are stored relocatable (with the environment root replaced by a placeholder)
+    so that all the environments that are based on the same interpreter share a single entry
+    """
+
+    def __init__(self, workspace: Path):
+        self.workspace = workspace
+        self._templates: Dict[str, str] = {}  # fingerprint -> (relocatable) introspection json
+        # the introspections are immutable, so each one is shared within the process (along with its memoized scores)
+        self._introspections: Dict[Tuple[str, Optional[str]], EnvironmentIntrospection] = {}
+
+    def get(self, interpreter_path: Path, env_root: Optional[Path] = None) -> EnvironmentIntrospection:
+        """
+        :param interpreter_path: the interpreter to get the introspection of
+        :param env_root: if the interpreter belongs to a virtual environment, the root of this environment
+        :return: the introspection of the given interpreter, computed only if it is not found in the cache
+        """
+        fingerprint = _introspection_fingerprint(interpreter_path, env_root)
+        key = (fingerprint, str(env_root.absolute()) if env_root is not None else None)
+        if introspection := self._introspections.get(key):
+            return introspection
+
+        entry_path = self.workspace / f"{fingerprint}.json"
+
+        if (template := self._templates.get(fingerprint)) is None:
+            try:
+                template = entry_path.read_text()
+                json.loads(template)
+            except FileNotFoundError:
+                template = None
+            except (JSONDecodeError, UnicodeDecodeError) as err:
+                warnings.warn(f"cached interpreter introspection is corrupted, rebuilding it: {err}")
+                template = None
+
+        if template is None:
+            introspection = EnvironmentIntrospection.compute(interpreter_path)
+            template = json.dumps(introspection._data)
+            if env_root is not None:
+                template = _relocate(template, env_root, to_placeholder=True)
+                if _ENV_ROOT_PLACEHOLDER not in template:  # unexpected layout, cannot be shared
+                    return introspection
+
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = entry_path.with_name(f".{entry_path.name}.{os.getpid()}.tmp")
+            temp_path.write_text(template)
+            os.replace(temp_path, entry_path)
+
+        self._templates[fingerprint] = template
+        data = _relocate(template, env_root, to_placeholder=False) if env_root is not None else template
+        introspection = self._introspections[key] = EnvironmentIntrospection(json.loads(data))
+        return introspection
+
+
+_INTROSPECTION_CODE_DIGEST = hashlib.sha256(_INTROSPECTION_CODE.encode()).hexdigest()
+_ENV_ROOT_PLACEHOLDER = "<pkm:env-root>"
+_INCLUDE_SYSTEM_SITE_RX = re.compile(r"^\s*include-system-site-packages\s*=\s*(\S+)", re.MULTILINE)
+
+
+def _introspection_fingerprint(interpreter_path: Path, env_root: Optional[Path]) -> str:
+    real_path = os.path.realpath(interpreter_path)
+    st = os.stat(real_path)
+    parts = [_INTROSPECTION_CODE_DIGEST, real_path, st.st_ino, st.st_size, st.st_mtime_ns, *_host_system_parts()]
+
+    if env_root is not None:
+        # the layout of the environment and its configuration (rather than its location) affect the introspection
+        try:
+            pyvenv_cfg = (env_root / 'pyvenv.cfg').read_text()
+        except OSError:
+            pyvenv_cfg = ''
+        include_system_site = (m := _INCLUDE_SYSTEM_SITE_RX.search(pyvenv_cfg)) and m.group(1).lower()
+        parts += ['venv', os.path.relpath(interpreter_path.absolute(), env_root.absolute()), include_system_site]
+
+    return hashlib.sha256('\0'.join(str(it) for it in parts).encode()).hexdigest()
+
+
+def _host_system_parts() -> List[str]:
+    # the introspection also records the kernel release/version and libc version (platform and confstr values),
+    # these may change (e.g., on a system upgrade) while the interpreter binary stays the same
+    uname = platform.uname()
+    parts = [uname.release, uname.version]
+    try:
+        parts.append(os.confstr('CS_GNU_LIBC_VERSION') or '')
+    except (AttributeError, ValueError, OSError):
+        parts.append('')
+    return parts
+
+
+def _relocate(introspection_json: str, env_root: Path, to_placeholder: bool) -> str:
+    absolute_root = json.dumps(str(env_root.absolute()))[1:-1]
+    if not to_placeholder:
+        return introspection_json.replace(_ENV_ROOT_PLACEHOLDER, absolute_root)
+
+    for root in {absolute_root, json.dumps(os.path.realpath(env_root))[1:-1]}:
+        # only whole path prefixes are replaced, e.g., '/envs/a' in '/envs/a/bin' but not in '/envs/ab'
+        introspection_json = re.sub(re.escape(root) + '(?=["/\\\\])', _ENV_ROOT_PLACEHOLDER, introspection_json)
+    return introspection_json
 
 
 def _mac_arch(arch: str, is_32bit: bool) -> str:
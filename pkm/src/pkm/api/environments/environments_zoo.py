@@ -9,7 +9,7 @@ from typing import Iterator, List, Dict, TYPE_CHECKING
 
 from pkm.api.environments.environment import Environment
 from pkm.api.environments.environment_builder import EnvironmentBuilder
-from pkm.api.pkm import HasAttachedRepository
+from pkm.api.pkm import HasAttachedRepository, pkm
 from pkm.api.versions.version_specifiers import VersionSpecifier
 from pkm.config.configclass import config, config_field, ConfigFile
 from pkm.config.configfiles import TomlConfigIO
@@ -60,6 +60,10 @@ class EnvironmentsZoo(HasAttachedRepository, Serializable):
         if isinstance(repo, SharedPackagesRepository):
             repo.remove_unused_packages(self.list())
 
+        # removing packages (here or by deleting environments) releases the content store objects they linked
+        if pkm.config.content_store:
+            pkm.content_store.collect_garbage()
+
     @contextmanager
     def activate(self, env: Dict[str, str] = os.environ):
         prev_path = env.get("PATH")
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
+import json
 import os.path
 import platform
 import re
 import subprocess
 import sys
 from dataclasses import dataclass
+from json import JSONDecodeError
 from pathlib import Path
 from subprocess import CalledProcessError
-from typing import List, Optional, Set
+from typing import List, Optional, Set, Dict, Any, Iterator
 
 from pkm.api.environments.environment import Environment
 from pkm.api.packages.package import PackageDescriptor
@@ -19,9 +21,19 @@ from pkm.utils.systems import is_executable
 
 
 class InstalledPythonsLocator:
+    """
+    locates the python interpreters that are installed on this machine: the ones in the PATH and the ones under the
+    given search paths (e.g., ~/.pyenv/versions). the search paths are not scanned recursively, an interpreter is
+    looked up in the search path itself, its `bin` (or `Scripts`) directory and the ones of its direct subdirectories.
 
-    def __init__(self, search_paths: Optional[List[str]] = None):
+    to find out their versions, the interpreters are probed (executed), the probe results are kept in the given
+    `registry_file` keyed by the interpreter binary identity (real path, modification time and size) so that only
+    new or changed interpreters are probed (in parallel)
+    """
+
+    def __init__(self, search_paths: Optional[List[str]] = None, registry_file: Optional[Path] = None):
         self._search_paths = search_paths or []
+        self._registry_file = registry_file
 
     @cached_property
     def all_installed(self) -> List[InstalledInterpreter]:
@@ -33,32 +45,51 @@ class InstalledPythonsLocator:
         for sp in self._search_paths:
             interpreters_in_path.update(_lookup_in_path(Path(sp).expanduser()))
         interpreters_in_path.add(Path(sys.executable).resolve())
-        for interpreter_path in interpreters_in_path:
-            try:
-                cmdout = subprocess.run(
-                    [str(interpreter_path), "-c",
-                     "import platform;import sys;print(platform.python_version());print(sys.executable)"],
-                    capture_output=True)
-                cmdout.check_returncode()
 
-                version_str, executable = cmdout.stdout.decode().strip().splitlines(keepends=False)
-                executable = Path(executable.strip()).resolve()
+        for probe in self._probe_all(interpreters_in_path):
+            if not probe or (executable := Path(probe['executable'])) in executeables_matched:
+                continue
 
-                if executable in executeables_matched:
-                    continue
+            executeables_matched.add(executable)
+            result.append(InstalledInterpreter(
+                executable, PackageDescriptor("python", Version.parse(probe['version']))))
 
-                executeables_matched.add(executable)
+        return sorted(result, key=lambda p: p.version, reverse=True)
 
-                result.append(InstalledInterpreter(
-                    executable,
-                    PackageDescriptor("python", Version.parse(version_str.strip()))))
+    def _probe_all(self, interpreters: Set[Path]) -> List[Optional[Dict[str, Any]]]:
+        registry = self._load_registry()
+        identities = {str(it): identity for it in interpreters if (identity := _binary_identity(it))}
 
-            except (ChildProcessError, CalledProcessError):
-                # import traceback
-                # traceback.print_exc()
-                pass  # skip this interpreter
+        to_probe = [Path(it) for it, identity in identities.items()
+                    if (entry := registry.get(it)) is None or entry['identity'] != identity]
+        if to_probe:
+            from pkm.api.pkm import pkm
+            for interpreter, probe in zip(to_probe, pkm.threads.map(_probe_interpreter, to_probe)):
+                registry[str(interpreter)] = {'identity': identities[str(interpreter)], 'probe': probe}
 
-        return sorted(result, key=lambda p: p.version, reverse=True)
+        # entries of interpreters that are no longer found are dropped
+        registry = {it: registry[it] for it in identities}
+        if to_probe or len(registry) != len(identities):
+            self._save_registry(registry)
+
+        return [entry['probe'] for entry in registry.values()]
+
+    def _load_registry(self) -> Dict[str, Dict[str, Any]]:
+        if not self._registry_file:
+            return {}
+        try:
+            return json.loads(self._registry_file.read_text())
+        except (FileNotFoundError, JSONDecodeError, UnicodeDecodeError):
+            return {}
+
+    def _save_registry(self, registry: Dict[str, Dict[str, Any]]):
+        if not self._registry_file:
+            return
+
+        self._registry_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self._registry_file.with_name(f".{self._registry_file.name}.{os.getpid()}.tmp")
+        temp_file.write_text(json.dumps(registry))
+        os.replace(temp_file, self._registry_file)
 
     def match(self, version_spec: VersionSpecifier) -> List[InstalledInterpreter]:
         result = [
@@ -97,12 +128,52 @@ def _as_python_executeable(file: Path) -> Optional[Path]:
     return None
 
 
+def _binary_identity(file: Path) -> Optional[List[int]]:
+    try:
+        st = file.stat()
+        return [st.st_mtime_ns, st.st_size]
+    except OSError:
+        return None
+
+
+def _probe_interpreter(interpreter_path: Path) -> Optional[Dict[str, str]]:
+    try:
+        cmdout = subprocess.run(
+            [str(interpreter_path), "-c",
+             "import platform;import sys;print(platform.python_version());print(sys.executable)"],
+            capture_output=True)
+        cmdout.check_returncode()
+
+        version_str, executable = cmdout.stdout.decode().strip().splitlines(keepends=False)
+        return {'version': version_str.strip(), 'executable': str(Path(executable.strip()).resolve())}
+    except (OSError, ChildProcessError, CalledProcessError, ValueError):
+        return None  # skip this interpreter
+
+
+def _lookup_dirs(path: Path) -> Iterator[Path]:
+    yield path
+    try:
+        children = [it for it in path.iterdir() if it.is_dir()]
+    except OSError:
+        return
+
+    for child in children:
+        if child.name in ('bin', 'Scripts'):
+            yield child
+        else:
+            yield child
+            yield child / 'bin'
+            yield child / 'Scripts'
+
+
 def _lookup_in_path(path: Path):
-    return {
-        executable
-        for file in path.rglob("python")
-        if (executable := _as_python_executeable(file))
-    }
+    result: Set[Path] = set()
+    for directory in _lookup_dirs(path):
+        try:
+            result.update(executable for file in directory.iterdir() if (executable := _as_python_executeable(file)))
+        except OSError:
+            pass
+    return result
 
 
 def _lookup_in_env_path() -> Set[Path]:
@@ -16,6 +16,7 @@ if TYPE_CHECKING:
     from pkm.api.dependencies.dependency import Dependency
     from pkm.api.packages.package_metadata import PackageMetadata
     from pkm.api.packages.package_installation import PackageInstallationTarget
+    from pkm.utils.promises import Promise
 
 
 @dataclass(frozen=True)
@@ -170,6 +171,16 @@ class Package(ABC):
                (editable = by reference, copy, auto = editable if package installed from source otherwise false)
         """
 
+    def prefetch(self, env: "Environment") -> Optional["Promise"]:
+        """
+        start retrieving (in the background) the resources that are required in order to install this package into
+        the given `env`, so that a later installation will not have to wait for them
+        :note: this is an optional operation, only packages that retrieve remote resources should implement it
+        :param env: the environment that this package is going to be installed into
+        :return: promise that completes when the resources were retrieved or None if there is nothing to prefetch
+        """
+        return None
+
     def uninstall(self) -> bool:
         """
         uninstall this package from its package installation target, returns true if the package was removed from the
@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import importlib.util
+import math
+import os
+import time
 from _ast import Set
 from abc import ABC
 from concurrent.futures import ThreadPoolExecutor
@@ -11,7 +15,7 @@ from typing import List, Dict, Optional, Union, Set, TYPE_CHECKING
 from pkm.api.dependencies.dependency import Dependency
 from pkm.api.packages.package_installation_info import StoreMode
 from pkm.api.packages.package import Package, PackageDescriptor
-from pkm.api.packages.package_monitors import PackageOperationMonitoredOp
+from pkm.api.packages.package_monitors import PackageOperationMonitoredOp, BytecodeCompilationMonitoredOp
 from pkm.api.packages.site_packages import InstalledPackage
 from pkm.api.packages.site_packages import SitePackages
 from pkm.api.repositories.repository import Repository, AbstractRepository
@@ -19,12 +23,13 @@ from pkm.api.versions.version import StandardVersion
 from pkm.api.versions.version_specifiers import VersionMatch, StandardVersionRange, AllowAllVersions
 from pkm.resolution.dependency_resolver import resolve_dependencies
 from pkm.resolution.pubgrub import UnsolvableProblemException
+from pkm.utils.bytecode import compile_sources, deferred_compilation
 from pkm.utils.commons import UnsupportedOperationException
 from pkm.utils.delegations import delegate
 from pkm.utils.types import Serializable
 from pkm.utils.iterators import first_or_none
 from pkm.utils.multiproc import ProcessPoolExecutor
-from pkm.utils.promises import Promise, await_all_promises_or_cancel
+from pkm.utils.promises import Promise, await_all_promises_or_cancel, await_all_promises
 from pkm.utils.properties import cached_property, clear_cached_properties
 
 if TYPE_CHECKING:
@@ -290,15 +295,84 @@ class InstallationPlan:
         parallelism = pkm.config.concurrency_mode if concurrency_mode is None else concurrency_mode
         threads = pkm.threads if parallelism != "none" else None
 
-        if parallelism == "proc" and sum(1 for it in tasks if it.can_be_multiprocessesd()) > 1:
+        procpool: Optional[ProcessPoolExecutor] = None
+        if parallelism == "proc" and (multiprocessed := sum(1 for it in tasks if it.can_be_multiprocessesd())) > 1:
             procpool = pkm.processes
-            await_all_promises_or_cancel([task.execute(threads, procpool) for task in tasks])
+            # the workers start (and import pkm) while the artifacts are downloaded
+            procpool.warm_up(multiprocessed)
 
-        else:
-            await_all_promises_or_cancel([task.execute(threads, None) for task in tasks])
+        # download the required artifacts up front using the http engine, which does not occupy a thread per
+        # download, the installation tasks (that may run in other processes) will then find them in the local cache.
+        # failed downloads are ignored here, they will be retried (and reported) by the installation tasks
+        await_all_promises([p for task in tasks if (p := task.prefetch())], ignore_error=True)
+
+        await_all_promises_or_cancel([task.execute(threads, procpool) for task in tasks])
 
         site.reload()
 
+        if pkm.config.bytecode_compilation == "batch":
+            # packages whose operation is attached to their preinstalled instance only had their flags updated
+            installed = [
+                installed_package for package, operation in operations.items()
+                if operation in (PackageOperation.INSTALL, PackageOperation.UPDATE)
+                and not isinstance(package, InstalledPackage)
+                and (installed_package := site.installed_package(package.name))]
+
+            # compilation is cpu bound, so it uses the process pool whatever the installation concurrency mode is
+            compile_installed_packages(installed, pkm.config.bytecode_optimization_levels, pkm.processes)
+
+
+_MIN_COMPILATION_BATCH = 64
+
+
+def compile_installed_packages(
+        packages: List[InstalledPackage], optimization_levels: List[int],
+        procpool: Optional[ProcessPoolExecutor] = None):
+    """
+    compile the python sources of the given installed packages into bytecode and add the created bytecode files to
+    the packages' RECORD, the sources of all the packages are compiled together, in batches
+    :param packages: the packages to compile
+    :param optimization_levels: the optimization levels to compile the sources with
+    :param procpool: if given, the batches are compiled concurrently using this pool, otherwise in the current thread
+                     (a single batch is always compiled in the current thread)
+    """
+
+    sources: Dict[str, InstalledPackage] = {
+        str(file): package
+        for package in packages
+        for file in package.dist_info.installed_files() if file.suffix == '.py'}
+
+    if not sources:
+        return
+
+    with BytecodeCompilationMonitoredOp([p.descriptor for p in packages], optimization_levels) as mop:
+        start = time.perf_counter()
+
+        source_list = list(sources)
+        batch_size = max(_MIN_COMPILATION_BATCH, math.ceil(len(source_list) / ((os.cpu_count() or 1) * 4)))
+        if len(source_list) <= batch_size:
+            procpool = None  # not worth the round trip to the pool
+        promises = [
+            Promise.execute(procpool, compile_sources, source_list[i:i + batch_size], optimization_levels)
+            for i in range(0, len(source_list), batch_size)]
+
+        # bytecode is an optimization, failing to compile a batch should not fail the installation
+        await_all_promises(promises, ignore_error=True)
+        compiled: Dict[InstalledPackage, List[Path]] = {}
+        for promise in promises:
+            if promise.is_succeeded():
+                for pyc in promise.result():
+                    if package := sources.get(importlib.util.source_from_cache(pyc)):
+                        compiled.setdefault(package, []).append(Path(pyc))
+
+        for package, pyc_files in compiled.items():
+            records_file = package.dist_info.load_record_cfg()
+            records_file.sign_files(pyc_files, package.dist_info.path.parent.resolve())
+            records_file.save()
+
+        mop.files_compiled = sum(len(it) for it in compiled.values())
+        mop.elapsed_seconds = time.perf_counter() - start
+
 
 class _PackageOperationTask:
     def __init__(self, package: Package, operation: PackageOperation, store_mode: StoreMode,
@@ -309,6 +383,11 @@ class _PackageOperationTask:
         self._user_request = user_request
         self._target = target
 
+    def prefetch(self) -> Optional[Promise]:
+        if self._operation in (PackageOperation.INSTALL, PackageOperation.UPDATE):
+            return self._package.prefetch(self._target.env)
+        return None
+
     def can_be_multiprocessesd(self):
         return isinstance(self._package, Serializable)
 
@@ -336,7 +415,9 @@ class _PackageOperationTask:
 
 
 def _po_execute(package: Package, mtd: str, *args, **kwargs):
-    getattr(package, mtd)(*args, **kwargs)
+    # the bytecode of the installed packages is compiled by the plan, after all of its operations completed
+    with deferred_compilation():
+        getattr(package, mtd)(*args, **kwargs)
 
 
 class _UserRequestPackage(Package):
@@ -378,6 +459,13 @@ class _RemovalRepository(AbstractRepository):
         match = self._preinstalled.get(dependency.package_name_key)
         return [_RemovalPackage(match)] if match else []
 
+    def fingerprint(self, package_name: str, env: Environment) -> Optional[str]:
+        if package_name == self._user_request.name:
+            return _user_request_fingerprint(self._user_request)
+
+        match = self._preinstalled.get(PackageDescriptor.package_name_key(package_name))
+        return f"installed:{match.version}" if match else "not-installed"
+
 
 class _RemovalPackage(Package, Serializable):
 
@@ -449,3 +537,24 @@ class _InstallationRepository(Repository, ABC):
             packages = [p for p in packages if unspecified_limit.allows_version(p.version)]
 
         return packages
+
+    def fingerprint(self, package_name: str, env: Environment) -> Optional[str]:
+        name_key = PackageDescriptor.package_name_key(package_name)
+        if name_key == self._user_request.name_key:
+            return _user_request_fingerprint(self._user_request)
+
+        installed = self._installed_packages.get(name_key)
+        if installed and self._fast_plan_mode:
+            return f"installed:{installed.version}"
+
+        if (base_fingerprint := self._repo.fingerprint(package_name, env)) is None:
+            return None
+
+        installed_version = installed.version if installed else ''
+        unspecified_spec = self._fast_plan_mode and name_key in self._unspecified_spec_packages
+        return f"{base_fingerprint}|installed:{installed_version}|unspecified:{unspecified_spec}"
+
+
+# noinspection PyProtectedMember
+def _user_request_fingerprint(user_request: _UserRequestPackage) -> str:
+    return ';'.join(sorted(str(d) for d in user_request._request))
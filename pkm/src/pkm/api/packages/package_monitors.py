@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List
 
 from pkm.api.packages.package import PackageDescriptor
 from pkm.utils.monitors import MonitoredOperation
@@ -12,3 +12,12 @@ if TYPE_CHECKING:
 class PackageOperationMonitoredOp(MonitoredOperation):
     package: PackageDescriptor
     operation: "PackageOperation"
+
+
+@dataclass
+class BytecodeCompilationMonitoredOp(MonitoredOperation):
+    packages: List[PackageDescriptor]
+    optimization_levels: List[int]
+    # updated when the compilation completes
+    files_compiled: int = 0
+    elapsed_seconds: float = 0.0
@@ -16,6 +16,7 @@ from pkm.utils.types import Comparable
 if TYPE_CHECKING:
     from pkm.api.environments.environment import Environment
     from pkm.api.packages.package_installation import PackageInstallationTarget
+    from pkm.utils.promises import Promise
 
 
 @dataclass(frozen=True, eq=True)
@@ -98,6 +99,31 @@ class AbstractPackage(Package):
         :return: the stored artifact
         """
 
+    # noinspection PyMethodMayBeStatic,PyUnusedLocal
+    def _prefetch_artifact(self, artifact: PackageArtifact) -> Optional["Promise"]:
+        """
+        start retrieving the given artifact in the background, packages whose artifacts are remote should override this
+        method so that `prefetch` will be able to download them ahead of the installation
+        :param artifact: the artifact to prefetch
+        :return: promise that completes when the artifact was retrieved or None if it cannot be prefetched
+        """
+        return None
+
+    def prefetch(self, env: "Environment") -> Optional["Promise"]:
+        if (artifact := self.best_artifact_for(env)) and id(artifact) not in self._path_per_artifact_id:
+            return self._prefetch_artifact(artifact)
+        return None
+
+    # noinspection PyMethodMayBeStatic,PyUnusedLocal
+    def _retrieve_artifact_metadata(self, artifact: PackageArtifact) -> Optional[PackageMetadata]:
+        """
+        retrieve the metadata of the given binary artifact without retrieving the artifact itself, packages whose
+        artifacts are remote should override this method if they can do it more efficiently than downloading them
+        :param artifact: the artifact to retrieve the metadata of
+        :return: the metadata of the artifact or None if it cannot be retrieved without retrieving the artifact
+        """
+        return None
+
     def install_to(
             self, target: "PackageInstallationTarget", user_request: Optional["Dependency"] = None,
             store_mode: StoreMode = StoreMode.AUTO):
@@ -132,6 +158,13 @@ class AbstractPackage(Package):
 
         if deps := self._dependencies_per_artifact_id.get(id(artifact)):
             return deps
+
+        # avoid retrieving a binary artifact only for reading its metadata if possible
+        if artifact.is_binary() and id(artifact) not in self._path_per_artifact_id \
+                and (metadata := self._retrieve_artifact_metadata(artifact)):
+            self._dependencies_per_artifact_id[id(artifact)] = metadata.dependencies
+            return metadata.dependencies
+
         resource = self._get_or_retrieve_artifact_path(artifact)
         filename = artifact.file_name
         if filename.endswith('.whl'):
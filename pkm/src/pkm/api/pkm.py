@@ -5,7 +5,8 @@ from abc import ABC, abstractmethod
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import TYPE_CHECKING, List
+from threading import Lock
+from typing import TYPE_CHECKING, List, Optional
 
 from pkm.config.configclass import config, config_field, ConfigFile
 from pkm.config.configfiles import TomlConfigIO
@@ -20,10 +21,19 @@ if TYPE_CHECKING:
     from pkm.api.repositories.repository import Repository
     from pkm.api.repositories.repository_loader import RepositoryLoader
     from pkm.build.source_build_cache import SourceBuildCache
+    from pkm.build.build_environments import BuildEnvironments
+    from pkm.resolution.resolution_cache import ResolutionCache
     from pkm.api.repositories.repository_management import RepositoryManagement
+    from pkm.utils.content_store import ContentStore
+    from pkm.api.environments.environment_introspection import IntrospectionCache
 
 ENV_PKM_HOME = "PKM_HOME"
 
+# the modules that the tasks sent to the process pool (mainly package installations) use
+_WORKER_PRELOADED_MODULES = (
+    'pkm.api.pkm', 'pkm.api.packages.package_installation', 'pkm.api.distributions.wheel_distribution',
+    'pkm.repositories.pypi_repository')
+
 
 @dataclass
 class _PkmRepositories:
@@ -36,7 +46,41 @@ class _PkmRepositories:
 class PkmGeneralConfiguration(ConfigFile):
     #: can be: "proc", "thread", "none"
     concurrency_mode: str = config_field(key="concurrency.mode", default="proc")
+    #: the number of process pool workers that are kept running (with their modules preloaded) while idle, so that
+    #: later installations do not pay for spawning them again
+    concurrency_warm_workers: int = config_field(key="concurrency.warm-workers", default=2)
     interpreters_search_paths: List[str] = config_field(key='interpreters.search-paths', default_factory=list)
+    #: when enabled, dependency resolution results are cached and reused while the repositories answers are unchanged
+    resolution_cache: bool = config_field(key="resolution.cache", default=True)
+    #: the number of top candidate versions of a newly required package whose dependencies are speculatively
+    #: fetched during dependency resolution (0 disables speculative fetching)
+    resolution_prefetch_versions: int = config_field(key="resolution.prefetch-versions", default=2)
+    #: the maximal number of concurrent downloads (across all hosts)
+    http_max_connections: int = config_field(key="http.max-connections", default=16)
+    #: the maximal number of concurrent downloads from a single host
+    http_max_connections_per_host: int = config_field(key="http.max-connections-per-host", default=8)
+    #: when to compile the installed python sources into bytecode, can be: "batch" (after an installation completes,
+    #: compile the sources of all the installed packages together using the process pool, packages that are installed
+    #: directly and not as part of an installation are compiled while installed), "inline" (while installing each
+    #: package) or "none" (skip, the interpreter will compile the sources on their first import)
+    bytecode_compilation: str = config_field(key="installation.bytecode-compilation", default="batch")
+    #: the optimization levels to compile bytecode for (0, 1 or 2, see the interpreter's -O flag)
+    bytecode_optimization_levels: List[int] = config_field(
+        key="installation.bytecode-optimization-levels", default_factory=lambda: [0])
+    #: when enabled, the files of installed wheels are kept in a content addressed store (under the pkm home) and
+    #: later installations of the same files materialize them from the store instead of extracting them again
+    content_store: bool = config_field(key="installation.content-store", default=False)
+    #: how files are materialized from the content store, can be: "auto" (reflink, falling back to hardlink and then
+    #: to copy), "reflink", "hardlink" or "copy"
+    content_store_link_mode: str = config_field(key="installation.content-store-link-mode", default="auto")
+    #: when enabled, the environments containing the build requirements of source distributions and projects are
+    #: pooled (under the pkm home) and reused by later builds that require the same requirements
+    build_environments_reuse: bool = config_field(key="build.reuse-environments", default=True)
+    #: the maximal number of pooled build environments, the least recently used ones are evicted
+    build_environments_max: int = config_field(key="build.max-environments", default=16)
+    #: the number of hours that a pooled build environment is reused for, after that, builds get a new environment with
+    #: the latest versions of their (unpinned) build requirements (0 disables the age limit)
+    build_environments_max_age_hours: int = config_field(key="build.environments-max-age-hours", default=24)
 
 
 class HasAttachedRepository(ABC):
@@ -59,9 +103,19 @@ class Pkm(HasAttachedRepository):
 
     def __init__(self, home: Path):
         self.threads = ThreadPoolExecutor()
-        self.processes = ProcessPoolExecutor()
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._processes_lock = Lock()
         self._home = home
 
+    @property
+    def processes(self) -> ProcessPoolExecutor:
+        # not a cached property, as the pool (and its warm workers) should outlive `clean_cache`
+        with self._processes_lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(
+                    min_workers=self.config.concurrency_warm_workers, preload_modules=_WORKER_PRELOADED_MODULES)
+            return self._processes
+
     @cached_property
     def config(self) -> PkmGeneralConfiguration:
         general_config = self.home / 'etc/pkm/general.toml'
@@ -75,7 +129,8 @@ class Pkm(HasAttachedRepository):
     @cached_property
     def installed_pythons(self) -> "InstalledPythonsLocator":
         from pkm.api.environments.installed_pythons_locator import InstalledPythonsLocator
-        return InstalledPythonsLocator(self.config.interpreters_search_paths)
+        return InstalledPythonsLocator(
+            self.config.interpreters_search_paths, self.home / 'interpreters-registry/registry.json')
 
     @cached_property
     def home(self) -> Path:
@@ -83,7 +138,9 @@ class Pkm(HasAttachedRepository):
 
     @cached_property
     def httpclient(self) -> HttpClient:
-        return HttpClient(self.home / 'resources/http')
+        return HttpClient(
+            self.home / 'resources/http', max_connections=self.config.http_max_connections,
+            max_connections_per_host=self.config.http_max_connections_per_host)
 
     @cached_property
     def repository_management(self) -> "RepositoryManagement":
@@ -95,6 +152,28 @@ class Pkm(HasAttachedRepository):
         from pkm.build.source_build_cache import SourceBuildCache
         return SourceBuildCache(self.home / 'build-cache')
 
+    @cached_property
+    def build_environments(self) -> "BuildEnvironments":
+        from pkm.build.build_environments import BuildEnvironments
+        return BuildEnvironments(
+            self.home / 'build-environments', self.config.build_environments_max,
+            self.config.build_environments_max_age_hours)
+
+    @cached_property
+    def resolution_cache(self) -> "ResolutionCache":
+        from pkm.resolution.resolution_cache import ResolutionCache
+        return ResolutionCache(self.home / 'resolution-cache')
+
+    @cached_property
+    def introspection_cache(self) -> "IntrospectionCache":
+        from pkm.api.environments.environment_introspection import IntrospectionCache
+        return IntrospectionCache(self.home / 'introspection-cache')
+
+    @cached_property
+    def content_store(self) -> "ContentStore":
+        from pkm.utils.content_store import ContentStore
+        return ContentStore(self.home / 'content-store', self.config.content_store_link_mode)
+
     @cached_property
     def repository_loader(self) -> "RepositoryLoader":
         from pkm.api.repositories.repository_loader import RepositoryLoader, REPOSITORIES_CONFIGURATION_PATH
@@ -119,7 +198,12 @@ class Pkm(HasAttachedRepository):
     def clean_cache(self):
         shutil.rmtree(self.repository_loader.workspace, ignore_errors=True)
         shutil.rmtree(self.source_build_cache.workspace, ignore_errors=True)
+        shutil.rmtree(self.build_environments.workspace, ignore_errors=True)
+        shutil.rmtree(self.resolution_cache.workspace, ignore_errors=True)
         shutil.rmtree(self.httpclient.workspace, ignore_errors=True)
+        shutil.rmtree(self.content_store.workspace, ignore_errors=True)
+        shutil.rmtree(self.introspection_cache.workspace, ignore_errors=True)
+        shutil.rmtree(self.home / 'interpreters-registry', ignore_errors=True)
 
         clear_cached_properties(self)
 
@@ -38,6 +38,18 @@ class Repository(Protocol):
         """
         return self.match(Dependency(package_name, AllowAllVersions), env)
 
+    # noinspection PyMethodMayBeStatic,PyUnusedLocal
+    def fingerprint(self, package_name: str, env: "Environment") -> Optional[str]:
+        """
+        computes a cheap (should not require network access) fingerprint of the answers that this repository will
+        give when matching packages named `package_name`, the fingerprint is used to validate persistent caches
+        (like the resolution cache) and should change whenever the matched packages may change
+        :param package_name: the package to compute fingerprint for
+        :param env: the environment that the matched packages should be compatible with
+        :return: the computed fingerprint or None if this repository cannot compute such fingerprint
+        """
+        return None
+
     @property
     @abstractmethod
     def publisher(self) -> Optional["RepositoryPublisher"]:
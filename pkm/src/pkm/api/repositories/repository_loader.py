@@ -178,6 +178,17 @@ class _CompositeRepository(AbstractRepository):
 
         return []
 
+    def fingerprint(self, package_name: str, env: Environment) -> Optional[str]:
+        if repo_name := self._package_binding.get(package_name):
+            repos = [it for it in self._package_search_list if it.name == repo_name]
+        else:
+            repos = [it for it in self._package_search_list if it.name not in self._binding_only_repositories]
+
+        fingerprints = [repo.fingerprint(package_name, env) for repo in repos]
+        if not fingerprints or None in fingerprints:
+            return None
+        return '|'.join(fingerprints)
+
     def accepted_url_protocols(self) -> Iterable[str]:
         return self._url_handlers.keys()
 
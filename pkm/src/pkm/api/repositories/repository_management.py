@@ -7,7 +7,7 @@ from typing import Dict, List, Optional, Tuple, Iterable, Union, Set
 from pkm.api.dependencies.dependency import Dependency
 from pkm.api.environments.environment import Environment
 from pkm.api.environments.environments_zoo import EnvironmentsZoo
-from pkm.api.packages.package import Package
+from pkm.api.packages.package import Package, PackageDescriptor
 from pkm.api.pkm import HasAttachedRepository, Pkm, pkm
 from pkm.api.projects.project import Project
 from pkm.api.projects.project_group import ProjectGroup
@@ -271,6 +271,20 @@ class ProjectsRepository(AbstractRepository):
             return self._base_repo.match(dependency, env)
         return []
 
+    def fingerprint(self, package_name: str, env: Environment) -> Optional[str]:
+        if matched_projects := self._packages.get(PackageDescriptor.package_name_key(package_name)):
+            fingerprints = []
+            for project in matched_projects:
+                if not project.path or not (pyproject := project.path / 'pyproject.toml').exists():
+                    return None
+                stat = pyproject.stat()
+                fingerprints.append(f"{project.version}:{stat.st_mtime_ns}:{stat.st_size}")
+            return '|'.join(fingerprints)
+
+        if self._base_repo:
+            return self._base_repo.fingerprint(package_name, env)
+        return None
+
     @classmethod
     def create(cls, name: str, projects: Iterable[Project], base: Optional[Repository] = None) -> ProjectsRepository:
         grouped_projects = groupby(projects, lambda it: it.name_key)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, replace
-from typing import Tuple, Optional, Literal
+from dataclasses import dataclass, replace, field
+from typing import Tuple, Optional, Literal, Any
 import re
 
 from pkm.utils.commons import UnsupportedOperationException
@@ -9,6 +9,11 @@ from pkm.utils.http.http_client import Url
 
 VERSION_URL_RX = re.compile(r"((?P<repo>\w+)\+)?(?P<url>.*)")
 
+_PRE_RELEASE_RANK = {'a': 0, 'b': 1, 'rc': 2}
+_NO_PRE_RELEASE = (len(_PRE_RELEASE_RANK), 0)
+_DEV_ONLY_RELEASE = (-1, 0)
+_INFINITY = float('inf')
+
 
 class Version(ABC):
     @abstractmethod
@@ -111,6 +116,15 @@ class StandardVersion(Version):
     dev_release: Optional[int] = None
     local_label: Optional[str] = None
 
+    # total order key (see `_sort_key_of`) and its hash, computed once as versions are compared and hashed a lot
+    _key: Tuple[Any, ...] = field(init=False, repr=False, compare=False)
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        key = _sort_key_of(self)
+        object.__setattr__(self, '_key', key)
+        object.__setattr__(self, '_hash', hash(key))
+
     def without_local(self) -> "StandardVersion":
         if self.is_local():
             return replace(self, local_label=None)
@@ -133,8 +147,7 @@ class StandardVersion(Version):
         return replace(self, release=release, post_release=post, dev_release=dev)
 
     def __hash__(self):
-        s = self.standartize()
-        return hash((s.release, s.epoch, s.dev_release, s.post_release, s.pre_release, s.local_label))
+        return self._hash
 
     def is_pre_or_dev_release(self) -> bool:
         return self.pre_release is not None or self.dev_release is not None
@@ -211,7 +224,14 @@ class StandardVersion(Version):
     def __repr__(self):
         return str(self)
 
+    def __lt__(self, other: Version) -> bool:
+        if isinstance(other, StandardVersion):
+            return self._key < other._key
+        return _less(self, other)
+
     def __le__(self, other):
+        if isinstance(other, StandardVersion):
+            return self._key <= other._key
         return other == self or self < other
 
     def equals_to(self, other, compare_locals: bool):
@@ -224,16 +244,12 @@ class StandardVersion(Version):
         if not isinstance(other, StandardVersion):
             return False
 
-        v1, v2 = StandardVersion.normalized(self, other)
-        return (v1.epoch or 0) == (other.epoch or 0) \
-               and v1.release == v2.release \
-               and v1.pre_release == v2.pre_release \
-               and v1.post_release == v2.post_release \
-               and v1.dev_release == v2.dev_release \
-               and (not compare_locals or self.local_label == other.local_label)  # noqa
+        if compare_locals:
+            return self._key == other._key
+        return self._key[:-1] == other._key[:-1]
 
     def __eq__(self, other):
-        return self.equals_to(other, True)
+        return self is other or (isinstance(other, StandardVersion) and self._key == other._key)
 
     @staticmethod
     def normalized(v1: "StandardVersion", v2: "StandardVersion") -> Tuple["StandardVersion", "StandardVersion"]:
@@ -250,10 +266,42 @@ class StandardVersion(Version):
 
     @classmethod
     def parse(cls, txt: str) -> "StandardVersion":
-        from pkm.api.versions.version_parser import VersionParser
+        from pkm.api.versions.version_parser import VersionParser, parse_version
+        if isinstance(version := parse_version(txt), StandardVersion):
+            return version
         return VersionParser(txt.lower()).read_version()
 
 
+def _sort_key_of(v: StandardVersion) -> Tuple[Any, ...]:
+    """
+    computes a tuple that orders standard versions according to pep 440, two versions are equal iff their keys are
+    equal. the last element of the key is the local label key, so that `key[:-1]` can be used to ignore it.
+    """
+
+    release = v.release
+    zeros = len(release)
+    while zeros > 1 and release[zeros - 1] == 0:
+        zeros -= 1
+    if zeros != len(release):
+        release = release[:zeros]
+
+    if v.pre_release is not None:
+        pre = (_PRE_RELEASE_RANK[v.pre_release[0]], v.pre_release[1])
+    elif v.post_release is None and v.dev_release is not None:
+        pre = _DEV_ONLY_RELEASE  # 1.0.dev0 < 1.0a0
+    else:
+        pre = _NO_PRE_RELEASE
+
+    post = -1 if v.post_release is None else v.post_release
+    dev = _INFINITY if v.dev_release is None else v.dev_release
+
+    local = () if v.local_label is None else tuple(
+        (1, int(segment), '') if segment.isdigit() else (0, 0, segment)
+        for segment in v.local_label.split('.'))
+
+    return v.epoch or 0, release, pre, post, dev, local
+
+
 def _less(v1: Version, v2: Version) -> bool:
     swap = False
 
@@ -279,51 +327,4 @@ def _less(v1: Version, v2: Version) -> bool:
     v1: StandardVersion
     v2: StandardVersion
 
-    if (v1.epoch or 0) != (v2.epoch or 0):
-        return (v1.epoch or 0) < (v2.epoch or 0)
-
-    v1, v2 = StandardVersion.normalized(v1, v2)
-    for s, o in zip(v1.release, v2.release):
-        if s == o:
-            continue
-        return s < o
-
-    if v1.dev_release != v2.dev_release:
-        if (v1.dev_release is None) ^ (v2.dev_release is None):
-            return v2.dev_release is None
-
-        if v1.dev_release != v2.dev_release:
-            return v1.dev_release < v2.dev_release
-
-    if v1.pre_release != v2.pre_release:
-        if (v1.pre_release is None) ^ (v2.pre_release is None):
-            return v2.pre_release is None
-
-        for s, o in zip(v1.pre_release, v2.pre_release):
-            if s == o: continue  # noqa
-            return s < o
-
-    if v1.post_release != v2.post_release:
-        if (v1.post_release is None) ^ (v2.post_release is None):
-            return v1.post_release is None
-
-        s, o = v1.post_release, v2.post_release
-        if s != o:
-            return s < o
-
-    my_local_segments = (v1.local_label or "").split('.')
-    other_local_segments = (v2.local_label or "").split('.')
-
-    for m, o in zip(my_local_segments, other_local_segments):
-        if m == o:
-            continue
-
-        m_num, o_num = m.isnumeric(), o.isnumeric()
-        if m_num and o_num:
-            return int(m_num) < int(o_num)
-        if m_num or o_num:
-            return o_num
-
-        return m < o
-
-    return len(my_local_segments) < len(other_local_segments)
+    return v1._key < v2._key  # noqa
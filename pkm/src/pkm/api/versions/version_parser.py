@@ -1,13 +1,27 @@
 from dataclasses import replace
 from pathlib import Path
-from typing import List
+from typing import List, Dict
 
 from pkm.api.versions.version import Version, NamedVersion, StandardVersion, UrlVersion
 from pkm.api.versions.version_specifiers import VersionSpecifier, AllowAllVersions, VersionMatch
 from pkm.utils.parsers import SimpleParser
 
+# versions and specifiers are immutable, so the same string is parsed once and the resulting instance is shared
+_INTERNED_VERSIONS: Dict[str, Version] = {}
+_MAX_INTERNED_VERSIONS = 64 * 1024
+_INTERNED_SPECIFIERS: Dict[str, VersionSpecifier] = {}
+_MAX_INTERNED_SPECIFIERS = 16 * 1024
+
 
 def parse_version(version_str: str) -> Version:
+    if (version := _INTERNED_VERSIONS.get(version_str)) is None:
+        if len(_INTERNED_VERSIONS) >= _MAX_INTERNED_VERSIONS:
+            _INTERNED_VERSIONS.clear()
+        version = _INTERNED_VERSIONS[version_str] = _parse_version(version_str)
+    return version
+
+
+def _parse_version(version_str: str) -> Version:
     try:
         lowered_vstr = version_str.lower()
         if '://' in lowered_vstr:
@@ -20,7 +34,11 @@ def parse_version(version_str: str) -> Version:
 
 
 def parse_specifier(specifier_str: str) -> VersionSpecifier:
-    return VersionParser(specifier_str.lower()).read_specifier()
+    if (specifier := _INTERNED_SPECIFIERS.get(specifier_str)) is None:
+        if len(_INTERNED_SPECIFIERS) >= _MAX_INTERNED_SPECIFIERS:
+            _INTERNED_SPECIFIERS.clear()
+        specifier = _INTERNED_SPECIFIERS[specifier_str] = VersionParser(specifier_str.lower()).read_specifier()
+    return specifier
 
 
 _PRE_RELEASE_TYPE_NORMALIZER = {
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
 from abc import abstractmethod, ABC
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List, Optional, Set
+from threading import Lock
+from typing import List, Optional, Set, Tuple, Generic, TypeVar, Callable, Iterable, Any, Hashable, Dict
+from weakref import WeakValueDictionary
 
 from pkm.api.versions.version import Version, StandardVersion, UrlVersion
 from pkm.utils.commons import UnsupportedOperationException
@@ -10,14 +14,35 @@ from pkm.utils.hashes import HashBuilder
 from pkm.utils.iterators import first_or_raise
 from pkm.utils.seqs import seq
 
+_T = TypeVar("_T")
+
+# (min, max, includes_min, includes_max) where a None min/max means unbounded
+_Interval = Tuple[Optional[StandardVersion], Optional[StandardVersion], bool, bool]
+_UNBOUNDED: _Interval = (None, None, False, False)
+
+_MAX_CACHED_OPERATIONS = 64 * 1024
+_MAX_CACHED_RANGES = 256
+
 
 class VersionSpecifier(ABC):
+    """
+    a set of versions. specifiers are immutable, their set operations (`intersect_with`, `union_with`, `inverse`,
+    `allows_all` and `allows_any`) are memoized by the canonical keys of their operands and the resulting specifiers
+    are hash-consed, so that the same (canonical) specifier is represented by a single object
+    """
 
     def allows_all(self, other: VersionSpecifier) -> bool:
-        return self.intersect_with(other) == other
+        if _is_trivial(other):
+            return other is RestrictAllVersions or self is AllowAllVersions
+        return _operations.compute(
+            ('<=', self.canonical_key, other.canonical_key), lambda: self.intersect_with(other) == other)
 
     def allows_any(self, other: VersionSpecifier) -> bool:
-        return self.intersect_with(other) is not RestrictAllVersions
+        if _is_trivial(other):
+            return other.allows_any(self)
+        return _operations.compute(
+            ('&?', self.canonical_key, other.canonical_key),
+            lambda: self.intersect_with(other) is not RestrictAllVersions)
 
     def allows_pre_or_dev_releases(self) -> bool:
         return False
@@ -26,21 +51,62 @@ class VersionSpecifier(ABC):
     def allows_version(self, version: Version) -> bool:
         ...
 
-    @abstractmethod
     def union_with(self, other: VersionSpecifier) -> VersionSpecifier:
-        ...
+        if _is_trivial(other):
+            return other.union_with(self)
+        return _operations.compute(
+            ('|', self.canonical_key, other.canonical_key), lambda: self._compute_union(other), True)
 
-    @abstractmethod
     def intersect_with(self, other: VersionSpecifier) -> VersionSpecifier:
-        ...
+        if _is_trivial(other):
+            return other.intersect_with(self)
+        return _operations.compute(
+            ('&', self.canonical_key, other.canonical_key), lambda: self._compute_intersection(other), True)
 
-    @abstractmethod
     def inverse(self) -> VersionSpecifier:
+        return _operations.compute(('~', self.canonical_key), self._compute_inverse, True)
+
+    def _compute_union(self, other: VersionSpecifier) -> VersionSpecifier:
+        raise UnsupportedOperationException()
+
+    def _compute_intersection(self, other: VersionSpecifier) -> VersionSpecifier:
+        raise UnsupportedOperationException()
+
+    def _compute_inverse(self) -> VersionSpecifier:
+        raise UnsupportedOperationException()
+
+    @property
+    def canonical_key(self) -> Hashable:
+        """
+        a key that identifies this specifier structurally: two specifiers have the same key iff they are of the same
+        type and hold the same versions, written the same way (unlike `==` that considers 1.0 and 1.0.0 to be equal)
+        """
+        if (key := self.__dict__.get('_canonical_key')) is None:
+            key = self.__dict__['_canonical_key'] = self._compute_canonical_key()
+        return key
+
+    @abstractmethod
+    def _compute_canonical_key(self) -> Hashable:
         ...
 
     def difference_from(self, other: VersionSpecifier) -> VersionSpecifier:
         return self.intersect_with(other.inverse())
 
+    @property
+    def standard_intervals(self) -> List[_Interval]:
+        """
+        the standard versions allowed by this specifier as a list of intervals (see `_Interval`), the intervals are
+        exact for versions that are not post releases and not local versions (see `SortedVersions`)
+        """
+        # specifiers are not modified after creation, so the intervals are computed once (racing is harmless)
+        if (intervals := self.__dict__.get('_standard_intervals')) is None:
+            intervals = self.__dict__['_standard_intervals'] = self._compute_standard_intervals()
+        return intervals
+
+    @abstractmethod
+    def _compute_standard_intervals(self) -> List[_Interval]:
+        ...
+
     @abstractmethod
     def __str__(self) -> str:
         ...
@@ -65,7 +131,7 @@ class VersionSpecifier(ABC):
     @classmethod
     def parse(cls, txt: str) -> VersionSpecifier:
         from pkm.api.versions.version_parser import parse_specifier
-        return parse_specifier(txt)
+        return _operations.intern(parse_specifier(txt))
 
     @classmethod
     def create_range(
@@ -112,6 +178,12 @@ class _RestrictAll(VersionSpecifier):
     def __str__(self):
         return "<none>"
 
+    def _compute_canonical_key(self) -> Hashable:
+        return '<none>',
+
+    def _compute_standard_intervals(self) -> List[_Interval]:
+        return []
+
     def union_with(self, other: VersionSpecifier) -> VersionSpecifier:
         return other
 
@@ -152,6 +224,12 @@ class _AllowAll(VersionSpecifier):
     def __str__(self):
         return "*"
 
+    def _compute_canonical_key(self) -> Hashable:
+        return '*',
+
+    def _compute_standard_intervals(self) -> List[_Interval]:
+        return [_UNBOUNDED]
+
     def union_with(self, other: VersionSpecifier) -> VersionSpecifier:
         return self
 
@@ -172,12 +250,17 @@ class VersionsUnion(VersionSpecifier):
         self.segments.sort()
 
     def __hash__(self):
-        return HashBuilder().ordered_seq(self.segments).build()
+        if (hash_ := self.__dict__.get('_hash')) is None:
+            hash_ = self.__dict__['_hash'] = HashBuilder().ordered_seq(self.segments).build()
+        return hash_
+
+    def _compute_canonical_key(self) -> Hashable:
+        return 'union', tuple(it.canonical_key for it in self.segments)
 
     def allows_pre_or_dev_releases(self) -> bool:
         return any(it.allows_pre_or_dev_releases() for it in self.segments)
 
-    def inverse(self) -> VersionSpecifier:
+    def _compute_inverse(self) -> VersionSpecifier:
         result = AllowAllVersions
         for segment in self.segments:
             result = result.intersect_with(segment.inverse())
@@ -186,6 +269,9 @@ class VersionsUnion(VersionSpecifier):
     def allows_version(self, version: Version) -> bool:
         return any(s.allows_version(version) for s in self.segments)
 
+    def _compute_standard_intervals(self) -> List[_Interval]:
+        return [interval for segment in self.segments for interval in segment.standard_intervals]
+
     def __lt__(self, other: VersionSpecifier):
         return self.segments[0] < other
 
@@ -202,7 +288,7 @@ class VersionsUnion(VersionSpecifier):
                     return f"!={s1.max}"
         return seq(segs).str_join('; ')
 
-    def union_with(self, other: VersionSpecifier) -> VersionSpecifier:
+    def _compute_union(self, other: VersionSpecifier) -> VersionSpecifier:
         if isinstance(other, (_AllowAll, _RestrictAll)):
             return other.union_with(self)
 
@@ -226,7 +312,7 @@ class VersionsUnion(VersionSpecifier):
 
         return VersionsUnion(new_segments)
 
-    def intersect_with(self, other: VersionSpecifier) -> VersionSpecifier:
+    def _compute_intersection(self, other: VersionSpecifier) -> VersionSpecifier:
         if isinstance(other, (_AllowAll, _RestrictAll)):
             return other.intersect_with(self)
 
@@ -250,7 +336,13 @@ class HetroVersionIntersection(VersionSpecifier):
                or any(it.is_pre_or_dev_release() for it in self.blacklist)
 
     def __hash__(self):
-        return HashBuilder().unordered_seq(self.blacklist).regular(self.standard_spec).build()
+        if (hash_ := self.__dict__.get('_hash')) is None:
+            hash_ = self.__dict__['_hash'] = \
+                HashBuilder().unordered_seq(self.blacklist).regular(self.standard_spec).build()
+        return hash_
+
+    def _compute_canonical_key(self) -> Hashable:
+        return 'hetro', frozenset(_version_key(it) for it in self.blacklist), self.standard_spec.canonical_key
 
     def allows_version(self, version: Version) -> bool:
         if version in self.blacklist:
@@ -258,7 +350,14 @@ class HetroVersionIntersection(VersionSpecifier):
 
         return not isinstance(version, StandardVersion) or self.standard_spec.allows_version(version)
 
-    def union_with(self, other: VersionSpecifier) -> VersionSpecifier:
+    def _compute_standard_intervals(self) -> List[_Interval]:
+        intervals = self.standard_spec.standard_intervals
+        for version in self.blacklist:
+            if isinstance(version, StandardVersion):
+                intervals = _exclude_from_intervals(intervals, version)
+        return intervals
+
+    def _compute_union(self, other: VersionSpecifier) -> VersionSpecifier:
         if isinstance(other, (_RestrictAll, _AllowAll, VersionsUnion)):
             return other.union_with(self)
 
@@ -287,7 +386,7 @@ class HetroVersionIntersection(VersionSpecifier):
 
         raise UnsupportedOperationException()
 
-    def intersect_with(self, other: VersionSpecifier) -> VersionSpecifier:
+    def _compute_intersection(self, other: VersionSpecifier) -> VersionSpecifier:
         if isinstance(other, (_RestrictAll, _AllowAll, VersionsUnion)):
             return other.intersect_with(self)
 
@@ -313,14 +412,14 @@ class HetroVersionIntersection(VersionSpecifier):
 
         raise UnsupportedOperationException()
 
-    def inverse(self) -> VersionSpecifier:
+    def _compute_inverse(self) -> VersionSpecifier:
         union = [*(VersionMatch(it) for it in self.blacklist)]
         if self.standard_spec is not AllowAllVersions:
             union.append(self.standard_spec.inverse())
         return VersionsUnion(union)
 
     def __str__(self) -> str:
-        result = ", ".join(f"!={it}" for it in self.blacklist)
+        result = ", ".join(f"!={it}" for it in sorted(self.blacklist))
         if self.standard_spec is not AllowAllVersions:
             result += f", {self.standard_spec}"
         return result
@@ -370,7 +469,7 @@ class VersionMatch(VersionSpecifier):
     def allows_pre_or_dev_releases(self) -> bool:
         return self.allow and self.version.is_pre_or_dev_release()
 
-    def inverse(self) -> VersionSpecifier:
+    def _compute_inverse(self) -> VersionSpecifier:
         return VersionMatch(self.version, not self.allow)
 
     def __lt__(self, other: VersionSpecifier):
@@ -406,6 +505,16 @@ class VersionMatch(VersionSpecifier):
             return self.version == version
         return self.version != version
 
+    def _compute_canonical_key(self) -> Hashable:
+        return 'match', _version_key(self.version), self.allow
+
+    def _compute_standard_intervals(self) -> List[_Interval]:
+        if not isinstance(self.version, StandardVersion):
+            return [] if self.allow else [_UNBOUNDED]
+        if self.allow:
+            return [(self.version, self.version, True, True)]
+        return _exclude_from_intervals([_UNBOUNDED], self.version)
+
     def __str__(self):
         v, a = self.version, self.allow
 
@@ -415,7 +524,7 @@ class VersionMatch(VersionSpecifier):
             return f'=={v}' if a else f'!={v}'
         return f'==={v}' if a else f'!=={v}'
 
-    def union_with(self, other: VersionSpecifier) -> VersionSpecifier:
+    def _compute_union(self, other: VersionSpecifier) -> VersionSpecifier:
         if isinstance(other, (_RestrictAll, _AllowAll, HetroVersionIntersection, VersionsUnion)):
             return other.union_with(self)
 
@@ -441,7 +550,7 @@ class VersionMatch(VersionSpecifier):
 
         return VersionsUnion([self, other])
 
-    def intersect_with(self, other: VersionSpecifier) -> VersionSpecifier:
+    def _compute_intersection(self, other: VersionSpecifier) -> VersionSpecifier:
         if isinstance(other, (_RestrictAll, _AllowAll, HetroVersionIntersection, VersionsUnion)):
             return other.intersect_with(self)
 
@@ -488,7 +597,7 @@ class StandardVersionRange(VersionSpecifier):
     def allows_pre_or_dev_releases(self) -> bool:
         return (self.min and self.min.is_pre_or_dev_release()) or (self.max and self.max.is_pre_or_dev_release())
 
-    def inverse(self) -> VersionSpecifier:
+    def _compute_inverse(self) -> VersionSpecifier:
         parts = []
         if self.min:
             parts.append(VersionSpecifier.create_range(None, self.min, False, self.min and not self.includes_min))
@@ -572,7 +681,7 @@ class StandardVersionRange(VersionSpecifier):
 
         return VersionSpecifier.create_range(self.min, other.max, imin, imax)
 
-    def union_with(self, other: VersionSpecifier) -> VersionSpecifier:
+    def _compute_union(self, other: VersionSpecifier) -> VersionSpecifier:
         if isinstance(other, (_RestrictAll, _AllowAll, VersionsUnion, HetroVersionIntersection, VersionMatch)):
             return other.union_with(self)
 
@@ -604,7 +713,7 @@ class StandardVersionRange(VersionSpecifier):
 
         return RestrictAllVersions
 
-    def intersect_with(self, other: VersionSpecifier) -> VersionSpecifier:
+    def _compute_intersection(self, other: VersionSpecifier) -> VersionSpecifier:
         if isinstance(other, (_RestrictAll, _AllowAll, VersionsUnion, HetroVersionIntersection, VersionMatch)):
             return other.intersect_with(self)
 
@@ -625,3 +734,211 @@ class StandardVersionRange(VersionSpecifier):
             return False
 
         return (min_ is None or min_ < version) and (max_ is None or version < max_)
+
+    def _compute_standard_intervals(self) -> List[_Interval]:
+        return [(self.min, self.max, self.includes_min, self.includes_max)]
+
+    def _compute_canonical_key(self) -> Hashable:
+        return 'range', self.min and _version_key(self.min), self.max and _version_key(self.max), \
+               self.includes_min, self.includes_max
+
+
+def _is_trivial(spec: VersionSpecifier) -> bool:
+    return spec is AllowAllVersions or spec is RestrictAllVersions
+
+
+def _version_key(version: Version) -> Hashable:
+    if isinstance(version, StandardVersion):
+        return version.epoch, version.release, version.pre_release, version.post_release, version.dev_release, \
+               version.local_label
+    return type(version).__name__, str(version)
+
+
+class _OperationsCache:
+    """
+    bounded lru cache for the results of specifier operations, keyed by the operation and the canonical keys of its
+    operands. resulting specifiers are hash-consed (see `intern`)
+    """
+
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._results: OrderedDict[Hashable, Any] = OrderedDict()
+        self._interned: WeakValueDictionary[Hashable, VersionSpecifier] = WeakValueDictionary()
+        self._lock = Lock()
+
+    def intern(self, spec: VersionSpecifier) -> VersionSpecifier:
+        """
+        :param spec: the specifier to intern
+        :return: the single (live) specifier object that has the same canonical key as `spec`
+        """
+        if _is_trivial(spec):
+            return spec
+
+        with self._lock:
+            return self._interned.setdefault(spec.canonical_key, spec)
+
+    def compute(self, key: Hashable, operation: Callable[[], Any], intern_result: bool = False) -> Any:
+        results = self._results
+        with self._lock:
+            if (result := results.get(key)) is not None:
+                results.move_to_end(key)
+                return result
+
+        # the lock is not held while computing as operations recursively use this cache
+        result = operation()
+        if intern_result:
+            result = self.intern(result)
+
+        with self._lock:
+            results[key] = result
+            if len(results) > self._max_size:
+                results.popitem(last=False)
+        return result
+
+
+_operations = _OperationsCache(_MAX_CACHED_OPERATIONS)
+
+
+def _exclude_from_intervals(intervals: List[_Interval], version: StandardVersion) -> List[_Interval]:
+    result = []
+    for interval in intervals:
+        min_, max_, includes_min, includes_max = interval
+        if (min_ is not None and (version < min_ or (version == min_ and not includes_min))) \
+                or (max_ is not None and (max_ < version or (version == max_ and not includes_max))):
+            result.append(interval)
+            continue
+
+        if min_ is None or min_ < version:
+            result.append((min_, version, includes_min, False))
+        if max_ is None or version < max_:
+            result.append((version, max_, False, includes_max))
+    return result
+
+
+class SortedVersions(Generic[_T]):
+    """
+    index over a sequence of items (e.g., versions or packages) by their versions. finding the items whose versions are
+    allowed by a version specifier is done by bisecting the sorted versions using the specifier's
+    `standard_intervals`, so that only the (usually few) post releases, local and non-standard versions have to be
+    checked one by one using `VersionSpecifier.allows_version`
+    """
+
+    def __init__(self, items: Iterable[_T], version_of: Callable[[_T], Version] = lambda it: it):
+        """
+        :param items: the items to index, in any order
+        :param version_of: function that extracts the version of an item
+        """
+        self.items: List[_T] = list(items)
+        self.versions: List[Version] = [version_of(it) for it in self.items]
+
+        # positions of the items (in `items`) ordered by their versions
+        self._order: List[int] = sorted(range(len(self.versions)), key=self.versions.__getitem__)
+        sorted_versions = [self.versions[i] for i in self._order]
+
+        # non-standard versions are ordered before all the standard ones
+        self._first_standard = next(
+            (i for i, v in enumerate(sorted_versions) if isinstance(v, StandardVersion)), len(sorted_versions))
+        self._keys = [v._key for v in sorted_versions[self._first_standard:]]  # noqa
+        self._irregular: List[int] = [
+            i for i, v in enumerate(sorted_versions)
+            if not isinstance(v, StandardVersion) or v.is_post_release() or v.is_local()]
+
+        n = len(self._order)
+        self._descending = self._order == list(range(n - 1, -1, -1))
+
+        # id(spec) -> (spec, ranges), the solver repeatedly matches the same (hash-consed) specifiers
+        self._ranges_cache: Dict[int, Tuple[VersionSpecifier, List[Tuple[int, int]]]] = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def matching_ranges(self, spec: VersionSpecifier) -> List[Tuple[int, int]]:
+        """
+        :param spec: the specifier to match
+        :return: sorted and disjoint [start, end) ranges of positions in the version-ordered (ascending) items, such that
+                 the items in these ranges are exactly those that are allowed by `spec`
+        """
+        return list(self._ranges_of(spec))
+
+    def _ranges_of(self, spec: VersionSpecifier) -> List[Tuple[int, int]]:
+        if (cached := self._ranges_cache.get(id(spec))) is not None:
+            return cached[1]
+
+        if len(self._ranges_cache) >= _MAX_CACHED_RANGES:
+            self._ranges_cache.clear()
+        ranges = self._compute_ranges(spec)
+        self._ranges_cache[id(spec)] = (spec, ranges)
+        return ranges
+
+    def _compute_ranges(self, spec: VersionSpecifier) -> List[Tuple[int, int]]:
+        offset, keys = self._first_standard, self._keys
+
+        ranges: List[Tuple[int, int]] = []
+        for min_, max_, includes_min, includes_max in spec.standard_intervals:
+            start = offset if min_ is None \
+                else offset + (bisect_left if includes_min else bisect_right)(keys, min_._key)  # noqa
+            end = offset + len(keys) if max_ is None \
+                else offset + (bisect_right if includes_max else bisect_left)(keys, max_._key)  # noqa
+            if start < end:
+                ranges.append((start, end))
+
+        ranges = _merge_ranges(ranges)
+        if not self._irregular:
+            return ranges
+
+        range_starts = [start for start, _ in ranges]
+        excluded, included = [], []
+        for i in self._irregular:
+            r = bisect_right(range_starts, i) - 1
+            inside = r >= 0 and i < ranges[r][1]
+            if inside != spec.allows_version(self.versions[self._order[i]]):
+                (excluded if inside else included).append(i)
+
+        if not excluded and not included:
+            return ranges
+
+        result = [(i, i + 1) for i in included]
+        for start, end in ranges:
+            for i in excluded[bisect_left(excluded, start):bisect_left(excluded, end)]:
+                if start < i:
+                    result.append((start, i))
+                start = i + 1
+            if start < end:
+                result.append((start, end))
+
+        return _merge_ranges(result)
+
+    def count_matching(self, spec: VersionSpecifier) -> int:
+        """
+        :param spec: the specifier to match
+        :return: the number of items whose versions are allowed by `spec`
+        """
+        return sum(end - start for start, end in self._ranges_of(spec))
+
+    def matching(self, spec: VersionSpecifier) -> List[_T]:
+        """
+        :param spec: the specifier to match
+        :return: the items whose versions are allowed by `spec`, in their original order
+        """
+        ranges, order, items = self._ranges_of(spec), self._order, self.items
+        if self._descending:
+            return [items[order[i]] for start, end in reversed(ranges) for i in range(end - 1, start - 1, -1)]
+
+        positions = [order[i] for start, end in ranges for i in range(start, end)]
+        positions.sort()
+        return [items[i] for i in positions]
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    if len(ranges) < 2:
+        return ranges
+
+    ranges.sort()
+    result = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = result[-1]
+        if start <= last_end:
+            result[-1] = (last_start, max(last_end, end))
+        else:
+            result.append((start, end))
+    return result
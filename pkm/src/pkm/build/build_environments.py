@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Callable, Optional, ContextManager, IO, Tuple
+
+from pkm.api.dependencies.dependency import Dependency
+from pkm.api.environments.environment import Environment
+
+if sys.platform != 'win32':
+    import fcntl
+else:
+    fcntl = None
+
+_READY_MARKER = 'ready'
+
+# builds hold a shared lock on this file (inside the pooled environment they use) for as long as they run
+_IN_USE_LOCK = 'in-use.lock'
+
+# where the in-use locks are not supported, environments that were used recently may still be in use by a build
+# running in another process
+_EVICTION_GRACE_SECONDS = 10 * 60
+
+
+class BuildEnvironments:
+    """
+    a pool of build environments, kept in the pkm home and shared by all the builds and processes.
+
+    each pooled (base) environment contains a set of build requirements, installed for a specific interpreter and is
+    keyed by them. builds do not use the base environments directly, instead each build gets its own (cheap to create)
+    environment that overlays a base environment: the base environment's site packages are appended to the build
+    environment's `sys.path` (processing their pth files) and the base environment's scripts are copied into the build
+    environment's scripts directory (so that build tools like `cython` or `cmake` are found on its path and execute using
+    its interpreter). this way anything installed into the build environment (e.g., the backend's extra requirements)
+    shadows the base environment content without modifying it.
+
+    the pool keeps up to `max_environments` base environments, evicting the least recently used ones that are not in
+    use. as build requirements are usually not pinned, a base environment is only reused for up to `max_age_hours`,
+    later builds get a new base environment with the (then) latest versions of the requirements
+    """
+
+    def __init__(self, workspace: Path, max_environments: int = 16, max_age_hours: int = 24):
+        self.workspace = workspace
+        self.max_environments = max_environments
+        self.max_age_hours = max_age_hours
+
+    @contextmanager
+    def create(self, env_path: Path, interpreter_path: Path, requirements: List[Dependency], repository_name: str,
+               install: Callable[[Environment, List[Dependency]], None]) -> ContextManager[Environment]:
+        """
+        creates a new build environment in the given `env_path` that overlays a pooled environment containing the given
+        build `requirements` (creating the pooled environment if needed), the pooled environment is kept in use (and
+        therefore, will not be evicted) until the returned context is exited
+        :param env_path: the path to create the build environment at
+        :param interpreter_path: the interpreter to use for the environment
+        :param requirements: the build requirements
+        :param repository_name: the name of the repository the requirements are installed from
+        :param install: the function to use when installing requirements into a newly pooled environment
+        :return: context manager for the created build environment
+        """
+        from pkm.api.environments.environment_builder import EnvironmentBuilder
+
+        base_env, in_use_lock = self._base_environment(interpreter_path, requirements, repository_name, install)
+        try:
+            build_env = EnvironmentBuilder.create(env_path, interpreter_path)
+            add_base_sites = '; '.join(f"site.addsitedir({str(it)!r})" for it in base_env.site_packages.all_sites())
+            build_env.install_link('pkm_build_environment', [], [f"site; {add_base_sites}"])
+            _relocate_scripts(_scripts_path(base_env), _scripts_path(build_env), base_env.path, build_env.path)
+            yield build_env
+        finally:
+            if in_use_lock:
+                in_use_lock.close()
+
+    def _base_environment(
+            self, interpreter_path: Path, requirements: List[Dependency], repository_name: str,
+            install: Callable[[Environment, List[Dependency]], None]) -> Tuple[Environment, Optional[IO]]:
+        from pkm.api.environments.environment_builder import EnvironmentBuilder
+        from pkm.api.pkm import pkm
+
+        interpreter_path = interpreter_path.absolute()
+        introspection = pkm.introspection_cache.get(interpreter_path)
+        # the generation changes every `max_age_hours`, so that unpinned requirements are installed again
+        generation = int(time.time() // (self.max_age_hours * 60 * 60)) if self.max_age_hours > 0 else 0
+        key_material = json.dumps([
+            str(interpreter_path.resolve()), introspection['sys']['implementation'],
+            introspection['sys']['version_info'], repository_name, sorted({str(it) for it in requirements}),
+            generation])
+        key = hashlib.sha256(key_material.encode()).hexdigest()[:32]
+        env_path = self.workspace / key
+        ready_marker = env_path / _READY_MARKER
+
+        while True:
+            if ready_marker.exists():
+                in_use_lock = _lock(env_path / _IN_USE_LOCK, exclusive=False)
+                if ready_marker.exists():  # otherwise, it was evicted while waiting for the lock
+                    os.utime(ready_marker)
+                    self._evict()
+                    return Environment(env_path), in_use_lock
+                if in_use_lock:
+                    in_use_lock.close()
+
+            # the environment is prepared aside and then moved into the pool, so that concurrent builds (in other
+            # processes) never observe a partially installed environment
+            self.workspace.mkdir(parents=True, exist_ok=True)
+            temp_path = self.workspace / f".{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                temp_env = EnvironmentBuilder.create(temp_path, interpreter_path)
+                install(temp_env, requirements)
+                # the installed scripts (e.g., their shabang lines) should reference the pooled location
+                temp_scripts = _scripts_path(temp_env)
+                _relocate_scripts(temp_scripts, temp_scripts, temp_path, env_path)
+                (temp_path / _IN_USE_LOCK).touch()
+                (temp_path / _READY_MARKER).touch()
+                try:
+                    temp_path.rename(env_path)
+                except OSError:
+                    if not ready_marker.exists():
+                        raise  # otherwise, another process already pooled an equivalent environment
+            finally:
+                shutil.rmtree(temp_path, ignore_errors=True)
+
+    def _evict(self):
+        def last_used(path: Path) -> Optional[float]:
+            try:
+                return (path / _READY_MARKER).stat().st_mtime
+            except OSError:
+                return None
+
+        pooled = [(used, path) for path in self.workspace.iterdir()
+                  if not path.name.startswith('.') and (used := last_used(path)) is not None]
+        if len(pooled) <= self.max_environments:
+            return
+
+        pooled.sort()
+        grace_start = time.time() - _EVICTION_GRACE_SECONDS
+        evicted = 0
+        for used, path in pooled:
+            if evicted >= len(pooled) - self.max_environments:
+                break
+
+            if fcntl is None:
+                if used < grace_start:
+                    shutil.rmtree(path, ignore_errors=True)
+                    evicted += 1
+            elif in_use_lock := _lock(path / _IN_USE_LOCK, exclusive=True, blocking=False):
+                # environments that are in use by running builds are skipped
+                try:
+                    (path / _READY_MARKER).unlink(missing_ok=True)
+                    shutil.rmtree(path, ignore_errors=True)
+                    evicted += 1
+                finally:
+                    in_use_lock.close()
+
+
+def _lock(lock_file: Path, exclusive: bool, blocking: bool = True) -> Optional[IO]:
+    """
+    locks the given `lock_file`, the lock is held until the returned file is closed (or the process exits)
+    :param lock_file: the file to lock
+    :param exclusive: if True, acquire an exclusive lock, otherwise a shared one
+    :param blocking: if False and the lock cannot be acquired immediately, None is returned
+    :return: the open lock file or None if the lock was not acquired (or, if locking is not supported)
+    """
+    if fcntl is None:
+        return None
+
+    try:
+        lock_fd = lock_file.open('ab')
+    except OSError:  # e.g., the environment was removed
+        return None
+
+    try:
+        fcntl.flock(lock_fd, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB))
+    except OSError:
+        lock_fd.close()
+        return None
+
+    return lock_fd
+
+def _scripts_path(env: Environment) -> Path:
+    return Path(env.installation_target.scripts)
+
+
+def _relocate_scripts(source: Path, target: Path, old_prefix: Path, new_prefix: Path):
+    """
+    copies the scripts in the `source` directory into the `target` directory, replacing references to `old_prefix`
+    (e.g., in their shabang lines) with `new_prefix`. scripts that already exist in the `target` directory (e.g., the
+    environment interpreter) are not overwritten, unless `source` and `target` are the same directory, in which case
+    the scripts are relocated in place
+    :param source: the scripts directory to copy from
+    :param target: the scripts directory to copy into
+    :param old_prefix: the path that the scripts reference (usually, the path of the environment they were created in)
+    :param new_prefix: the path that the copied scripts should reference instead
+    """
+
+    in_place = source == target
+    old, new = (str(it.absolute()).encode(sys.getfilesystemencoding()) for it in (old_prefix, new_prefix))
+
+    for script in source.iterdir():
+        target_script = target / script.name
+        if script.is_symlink() or not script.is_file() or (not in_place and target_script.exists()):
+            continue
+
+        content = script.read_bytes()
+        if in_place and old not in content:
+            continue
+
+        target_script.write_bytes(content.replace(old, new))
+        os.chmod(target_script, script.stat().st_mode)
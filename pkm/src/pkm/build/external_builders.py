@@ -1,8 +1,11 @@
 import json
+import os
+import secrets
+import subprocess
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from textwrap import dedent
-from typing import Optional, Literal, Any, List, TYPE_CHECKING
+from typing import Optional, Literal, Any, List, TYPE_CHECKING, Dict, ContextManager
 
 from pkm.api.dependencies.dependency import Dependency
 from pkm.api.distributions.build_monitors import BuildPackageMonitoredOp, BuildPackageHookExecutionEvent
@@ -10,10 +13,13 @@ from pkm.api.packages.package import PackageDescriptor
 from pkm.api.projects.pyproject_configuration import BuildSystemConfig
 from pkm.utils.dicts import put_if_absent
 from pkm.utils.files import temp_dir
+from pkm.utils.processes import ProcessExecutionMonitoredOp, ProcessExecutionOutputLineEvent, \
+    ProcessExecutionExitEvent
 
 if TYPE_CHECKING:
     from pkm.api.environments.environment import Environment
     from pkm.api.projects.project import Project
+    from pkm.api.repositories.repository import Repository
 
 _CURRENT_BUILD_PATH_ATTR = "_current_build_path"
 
@@ -35,7 +41,6 @@ def build_sdist(project: "Project", target_dir: Optional[Path] = None,
     :return: the path to the created archive
     """
 
-    from pkm.api.environments.environment_builder import EnvironmentBuilder
     target_dir = target_dir or (project.directories.dist / str(project.version))
     target_env = target_env or project.attached_environment
 
@@ -48,29 +53,28 @@ def build_sdist(project: "Project", target_dir: Optional[Path] = None,
         buildsys: BuildSystemConfig = pyproject.build_system
         build_packages_repo = project.attached_repository
 
-        build_env = EnvironmentBuilder.create(tdir / 'venv', target_env.interpreter_path)
-
-        if buildsys.requirements:
-            build_env.install(buildsys.requirements, build_packages_repo)
-        if buildsys.backend_path:
-            build_env.install_link('build_backend', [project.path / pth for pth in buildsys.backend_path])
+        with _create_build_environment(
+                tdir / 'venv', target_env.interpreter_path, buildsys, build_packages_repo) as build_env, \
+                _BuildHooksRunner(project, build_env, buildsys, tdir / 'hooks') as hooks:
+            if buildsys.backend_path:
+                build_env.install_link('build_backend', [project.path / pth for pth in buildsys.backend_path])
 
-        # start build life-cycle:
-        # 1. check for sdist extra requirements
-        command = 'get_requires_for_build_sdist'
-        mop.notify(BuildPackageHookExecutionEvent(project.descriptor, command))
+            # start build life-cycle:
+            # 1. check for sdist extra requirements
+            command = 'get_requires_for_build_sdist'
+            mop.notify(BuildPackageHookExecutionEvent(project.descriptor, command))
 
-        extra_requirements = _exec_build_cycle_script(project, build_env, buildsys, command, [None])
+            extra_requirements = hooks.call(command, [None])
 
-        if extra_requirements.status == 'success':
-            if requirements := [Dependency.parse(d) for d in extra_requirements.result]:
-                build_env.install(requirements, build_packages_repo)
+            if extra_requirements.status == 'success':
+                if requirements := [Dependency.parse(d) for d in extra_requirements.result]:
+                    hooks.stop()  # so that the backend will be imported again, with the extra requirements available
+                    build_env.install(requirements, build_packages_repo)
 
-        # 2. build the sdist
-        command = 'build_sdist'
-        mop.notify(BuildPackageHookExecutionEvent(project.descriptor, command))
-        sdist_output = _exec_build_cycle_script(
-            project, build_env, buildsys, command, [str(target_dir), None])
+            # 2. build the sdist
+            command = 'build_sdist'
+            mop.notify(BuildPackageHookExecutionEvent(project.descriptor, command))
+            sdist_output = hooks.call(command, [str(target_dir), None])
 
         if sdist_output.status == 'success':
             return target_dir / sdist_output.result
@@ -89,7 +93,6 @@ def build_wheel(project: "Project", target_dir: Optional[Path] = None, only_meta
     :return: path to the built artifact (directory if only_meta, wheel archive otherwise)
     """
 
-    from pkm.api.environments.environment_builder import EnvironmentBuilder
     target_dir = target_dir or (project.directories.dist / str(project.version))
 
     if not target_env or (current_build_path := getattr(target_env, _CURRENT_BUILD_PATH_ATTR, None)) is None:
@@ -113,107 +116,216 @@ def build_wheel(project: "Project", target_dir: Optional[Path] = None, only_meta
         buildsys: BuildSystemConfig = pyproject.build_system
         build_packages_repo = project.attached_repository
 
-        build_env = EnvironmentBuilder.create(tdir / 'venv', interpreter_path)
-        setattr(build_env, _CURRENT_BUILD_PATH_ATTR, current_build_path)
+        with _create_build_environment(
+                tdir / 'venv', interpreter_path, buildsys, build_packages_repo, current_build_path) as build_env, \
+                _BuildHooksRunner(project, build_env, buildsys, tdir / 'hooks') as hooks:
+            if buildsys.backend_path:
+                build_env.install_link('build_backend', [project.path / pth for pth in buildsys.backend_path])
 
-        if buildsys.requirements:
-            build_env.install(buildsys.requirements, build_packages_repo)
-        if buildsys.backend_path:
-            build_env.install_link('build_backend', [project.path / pth for pth in buildsys.backend_path])
-
-        # start build life-cycle:
-        # 1. check for wheel extra requirements
-        command = 'get_requires_for_build_editable' \
-            if editable else 'get_requires_for_build_wheel'
-        mop.notify(BuildPackageHookExecutionEvent(project.descriptor, command))
-
-        extra_requirements = _exec_build_cycle_script(project, build_env, buildsys, command, [None])
-
-        if extra_requirements.status == 'success':
-            build_env.install(
-                [Dependency.parse(d) for d in extra_requirements.result],
-                build_packages_repo)
-
-        if only_meta:
-            # 2. try to build metadata only
-            command = 'prepare_metadata_for_build_wheel'
+            # start build life-cycle:
+            # 1. check for wheel extra requirements
+            command = 'get_requires_for_build_editable' \
+                if editable else 'get_requires_for_build_wheel'
             mop.notify(BuildPackageHookExecutionEvent(project.descriptor, command))
-            dist_info_output = _exec_build_cycle_script(
-                project, build_env, buildsys, command,
-                [str(target_dir), None])
-            if dist_info_output.status == 'success':
-                return target_dir / dist_info_output.result
-            raise BuildError("build backend did not produced wheel metadata", True)
-
-        # 3. build the wheel
-        command = 'build_editable' if editable else 'build_wheel'
-        mop.notify(BuildPackageHookExecutionEvent(project.descriptor, command))
-        wheel_output = _exec_build_cycle_script(
-            project, build_env, buildsys, command, [str(target_dir), None, None])
+
+            extra_requirements = hooks.call(command, [None])
+
+            if extra_requirements.status == 'success':
+                if requirements := [Dependency.parse(d) for d in extra_requirements.result]:
+                    hooks.stop()  # so that the backend will be imported again, with the extra requirements available
+                    build_env.install(requirements, build_packages_repo)
+
+            if only_meta:
+                # 2. try to build metadata only
+                command = 'prepare_metadata_for_build_wheel'
+                mop.notify(BuildPackageHookExecutionEvent(project.descriptor, command))
+                dist_info_output = hooks.call(command, [str(target_dir), None])
+                if dist_info_output.status == 'success':
+                    return target_dir / dist_info_output.result
+                raise BuildError("build backend did not produced wheel metadata", True)
+
+            # 3. build the wheel
+            command = 'build_editable' if editable else 'build_wheel'
+            mop.notify(BuildPackageHookExecutionEvent(project.descriptor, command))
+            wheel_output = hooks.call(command, [str(target_dir), None, None])
 
         if wheel_output.status == 'success':
             return target_dir / wheel_output.result
         raise BuildError(f"build backend did not produced expected wheel (project={project.name} {project.version})")
 
 
+@contextmanager
+def _create_build_environment(
+        env_path: Path, interpreter_path: Path, buildsys: BuildSystemConfig, repository: "Repository",
+        current_build_path: Optional[Dict[PackageDescriptor, bool]] = None) -> ContextManager["Environment"]:
+    from pkm.api.environments.environment_builder import EnvironmentBuilder
+    from pkm.api.pkm import pkm
+
+    def install(env: "Environment", requirements: List[Dependency]):
+        if current_build_path is not None:
+            setattr(env, _CURRENT_BUILD_PATH_ATTR, current_build_path)
+        env.install(requirements, repository)
+
+    if buildsys.requirements and pkm.config.build_environments_reuse:
+        # the pooled environment is kept in use for the whole build
+        with pkm.build_environments.create(
+                env_path, interpreter_path, buildsys.requirements, repository.name, install) as build_env:
+            if current_build_path is not None:
+                setattr(build_env, _CURRENT_BUILD_PATH_ATTR, current_build_path)
+            yield build_env
+    else:
+        build_env = EnvironmentBuilder.create(env_path, interpreter_path)
+        if buildsys.requirements:
+            install(build_env, buildsys.requirements)
+
+        if current_build_path is not None:
+            setattr(build_env, _CURRENT_BUILD_PATH_ATTR, current_build_path)
+        yield build_env
+
+
 @dataclass
 class _BuildCycleResult:
     status: Literal['success', 'undefined_hook']
     result: Any
 
 
-def _exec_build_cycle_script(
-        project: "Project", env: "Environment", buildsys: BuildSystemConfig, hook: str,
-        arguments: List[Any]) -> _BuildCycleResult:
-    with temp_dir() as tdir_path:
+_HOOKS_RUNNER_SCRIPT = """
+import importlib
+import json
+import os
+import sys
+import traceback
+
+backend_import, backend_object, result_prefix = sys.argv[1:]
+protocol_out = sys.stdout
+cwd = os.getcwd()
+backend = None
+
+for request in sys.stdin:
+    hook, arguments = json.loads(request)
+    try:
+        if backend is None:
+            backend = importlib.import_module(backend_import)
+            for attr in backend_object.split('.') if backend_object else ():
+                backend = getattr(backend, attr)
+
+        if not hasattr(backend, hook):
+            response = {'status': 'undefined_hook', 'result': None}
+        else:
+            response = {'status': 'success', 'result': getattr(backend, hook)(*arguments)}
+    except Exception:
+        traceback.print_exc()
+        response = {'status': 'fail', 'result': traceback.format_exc()}
+
+    os.chdir(cwd)
+    sys.stderr.flush()
+    protocol_out.write(result_prefix + json.dumps(response) + '\\n')
+    protocol_out.flush()
+"""
+
+
+class _BuildHooksRunner:
+    """
+    executes the pep517 hooks of a project's build backend in a long-lived process that imports the backend once and
+    then serves the hook calls sent to it (one json line per call, through its stdin). the process output is forwarded,
+    line by line, to the monitors and the hook results are sent back marked by a random prefix.
+
+    the process is started lazily, on the first hook call, and ends when the runner is stopped (or exits)
+    """
+
+    def __init__(self, project: "Project", env: "Environment", buildsys: BuildSystemConfig, workspace: Path):
+        self._project = project
+        self._env = env
+        self._buildsys = buildsys
+        self._workspace = workspace
+
         build_backend_parts = buildsys.build_backend.split(":")
-        build_backend_import = build_backend_parts[0]
-        build_backend = 'build_backend' + (f".{build_backend_parts[1]}" if len(build_backend_parts) > 1 else "")
-        output_path = tdir_path / 'output'
-        output_path_str = str(output_path.absolute()).replace('\\', '\\\\')
-
-        script = f"""
-            import json
-
-            def ret(status, result):
-                out = open('{output_path_str}', 'w+')
-                out.write(json.dumps({{'status': status, 'result': result}}))
-                out.close()
-                exit(0)
-
-            try:
-                import {build_backend_import} as build_backend
-                if not hasattr({build_backend}, '{hook}'):
-                    ret('undefined_hook', None)
-                else:
-                    result = {build_backend}.{hook}({', '.join(repr(arg) for arg in arguments)})
-                    ret('success', result)
-            except Exception:
-                import traceback
-                traceback.print_exc()
-                ret('fail', traceback.format_exc())
+        self._backend_import = build_backend_parts[0]
+        self._backend_object = build_backend_parts[1] if len(build_backend_parts) > 1 else ""
+        self._result_prefix = f"pkm-hook-result-{secrets.token_hex(8)}:"
+
+        self._proc: Optional[subprocess.Popen] = None
+        self._mop: Optional[ProcessExecutionMonitoredOp] = None
+
+    def call(self, hook: str, arguments: List[Any]) -> "_BuildCycleResult":
+        """
+        execute the given `hook` of the build backend
+        :param hook: the name of the hook to execute
+        :param arguments: the (json serializable) arguments to pass to the hook
+        :return: the result of the hook execution, raises `BuildError` if the hook failed
+        """
+        proc = self._proc or self._start()
+        proc.stdin.write(json.dumps([hook, arguments]) + '\n')
+        proc.stdin.flush()
+
+        while line := proc.stdout.readline():
+            # the hook output may not end with a newline, in which case the result is written on the same line
+            if (result_start := line.find(self._result_prefix)) >= 0:
+                if output := line[:result_start]:
+                    ProcessExecutionOutputLineEvent(output).notify(self._mop)
+
+                result = _BuildCycleResult(**json.loads(line[result_start + len(self._result_prefix):]))
+                if result.status == 'fail':
+                    raise BuildError(
+                        f"PEP517 build cycle execution failed, see lines below for description.\n"
+                        f"Project: {self._project.name} {self._project.version}\n"
+                        f"Build backend: {self._buildsys.build_backend}\n"
+                        f"Hook: {hook}\n"
+                        f"Resulted in exception:\n{result.result}", False)
+                return result
+
+            ProcessExecutionOutputLineEvent(line.rstrip()).notify(self._mop)
+
+        return_code = self.stop()
+        raise BuildError(
+            f"PEP517 build cycle execution failed.\n"
+            f"Project: {self._project.name} {self._project.version}\n"
+            f"Build backend: {self._buildsys.build_backend}\n"
+            f"Hook: {hook}\n"
+            f"Resulted in exit code: {return_code}", False)
+
+    def stop(self) -> Optional[int]:
         """
+        stops the hooks runner process (if it was started), a later hook call will start a new one
+        :return: the exit code of the stopped process
+        """
+        if not (proc := self._proc):
+            return None
+
+        self._proc = None
+        proc.stdin.close()
+        for line in proc.stdout:
+            ProcessExecutionOutputLineEvent(line.rstrip()).notify(self._mop)
+        return_code = proc.wait()
+        proc.stdout.close()
+
+        ProcessExecutionExitEvent(return_code).notify(self._mop)
+        self._mop.__exit__(None, None, None)
+        return return_code
+
+    def _start(self) -> subprocess.Popen:
+        self._workspace.mkdir(parents=True, exist_ok=True)
+        script_path = self._workspace / 'hooks_runner.py'
+        script_path.write_text(_HOOKS_RUNNER_SCRIPT)
+
+        cmd = [str(self._env.interpreter_path), '-u', str(script_path), self._backend_import, self._backend_object,
+               self._result_prefix]
+        self._mop = ProcessExecutionMonitoredOp(cmd[0], cmd).__enter__()
+
+        proc_env = dict(os.environ)
+        with self._env.activate(proc_env):
+            self._proc = subprocess.Popen(
+                cmd, cwd=self._project.path, env=proc_env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='replace')
+
+        return self._proc
+
+    def __enter__(self) -> "_BuildHooksRunner":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
 
-        script_path = tdir_path / 'execution.py'
-        script_path.write_text(dedent(script))
-        process_results = env.run_proc([str(env.interpreter_path), str(script_path)], cwd=project.path)
-        if process_results.returncode != 0:
-            raise BuildError(
-                f"PEP517 build cycle execution failed.\n"
-                f"Project: {project.name} {project.version}\n"
-                f"Build backend: {build_backend}\n"
-                f"Hook: {hook}\n"
-                f"Resulted in exit code: {process_results.returncode}", False)
-
-        result = _BuildCycleResult(**json.loads((tdir_path / 'output').read_text()))
-        if result.status == 'fail':
-            raise BuildError(
-                f"PEP517 build cycle execution failed, see lines below for description.\n"
-                f"Project: {project.name} {project.version}\n"
-                f"Build backend: {build_backend}\n"
-                f"Hook: {hook}\n"
-                f"Resulted in exception:\n{result.result}", False)
-        return result
 
 # class _FilteringRepository(AbstractRepository):
 #     def __init__(self, repo: Repository, filtered_packages: Set[PackageDescriptor]):
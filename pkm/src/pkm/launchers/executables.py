@@ -23,19 +23,24 @@ class Executables:
         :param interpreter_path: the interpreter which the patched script should be executeable with
         """
         with source.open('rb') as script_fd, target.open('wb+') as target_fd:
-            first_line = script_fd.readline()
-            if first_line.startswith(b"#!python"):
-                w = 'w' if first_line.startswith(b"#!pythonw") else ''
-                target_fd.write(
-                    f"#!{interpreter_path.absolute()}{w}{os.linesep}".encode(sys.getfilesystemencoding()))
-            else:
-                target_fd.write(first_line)
-
+            target_fd.write(Executables.patch_shabang_line(script_fd.readline(), interpreter_path))
             target_fd.write(script_fd.read())
 
         st = os.stat(source)
         os.chmod(target, st.st_mode | stat.S_IEXEC)
 
+    @staticmethod
+    def patch_shabang_line(first_line: bytes, interpreter_path: Path) -> bytes:
+        """
+        :param first_line: the first line of a script (including its line ending)
+        :param interpreter_path: the interpreter which the patched script should be executeable with
+        :return: the line that should replace `first_line`, patched if it is a `#!python` shabang line
+        """
+        if first_line.startswith(b"#!python"):
+            w = 'w' if first_line.startswith(b"#!pythonw") else ''
+            return f"#!{interpreter_path.absolute()}{w}{os.linesep}".encode(sys.getfilesystemencoding())
+        return first_line
+
     @staticmethod
     def generate(env: "Environment", target_dir: Path, file_name: str, script: str, is_gui: bool = False):
         """
@@ -1,9 +1,12 @@
 import hashlib
+import json
+import os
+import threading
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 
 from pkm.api.dependencies.dependency import Dependency
-from pkm.api.distributions.wheel_distribution import InstallationException
+from pkm.api.distributions.wheel_distribution import InstallationException, WheelDistribution
 from pkm.api.environments.environment import Environment
 from pkm.api.packages.package import Package, PackageDescriptor
 from pkm.api.packages.package_metadata import PackageMetadata
@@ -15,12 +18,14 @@ from pkm.api.versions.version import Version
 from pkm.api.versions.version_specifiers import VersionSpecifier
 from pkm.utils.http.auth import BasicAuthentication
 from pkm.utils.http.cache_directive import CacheDirective
-from pkm.utils.http.http_client import HttpClient, HttpException
+from pkm.utils.http.http_client import HttpClient, HttpException, FetchedResource
 from pkm.utils.http.mfd_payload import FormField, MultipartFormDataPayload
 from pkm.utils.io_streams import chunks
+from pkm.utils.json_streams import JsonStreamReader
 from pkm.utils.types import Serializable
 from pkm.utils.iterators import first_or_none
 from pkm.utils.properties import cached_property
+from pkm.utils.promises import Promise
 
 
 class PyPiRepository(AbstractRepository, Serializable):
@@ -43,36 +48,54 @@ class PyPiRepository(AbstractRepository, Serializable):
             return PyPiPublisher(self.name, self._http, self._publish_url)
         return None
 
+    def fingerprint(self, package_name: str, env: Environment) -> Optional[str]:
+        if resource := self._http.cached_resource(f'{self._fetch_url}/{package_name}/json'):
+            fetch_info = resource.fetch_info_data
+            return fetch_info.etag or fetch_info.fetch_time
+        return None
+
     def _do_match(self, dependency: Dependency, env: Environment) -> List[Package]:
         try:
-            json: Dict[str, Any] = self._http \
+            resource = self._http \
                 .fetch_resource(f'{self._fetch_url}/{dependency.package_name}/json',
                                 cache=CacheDirective.ask_for_update(),
-                                resource_name=f"matching packages for {dependency}") \
-                .read_data_as_json()
+                                resource_name=f"matching packages for {dependency}")
+            index = _compact_index_of(resource)
         except HttpException as e:
             raise InstallationException(
                 f"package: '{dependency.package_name}' could not be retrieved from repository: '{self.name}'") from e
 
-        package_info: Dict[str, Any] = {k.replace('_', '-').title(): v for k, v in json['info'].items()}
-
-        packages: List[PypiPackage] = []
-        releases: Dict[str, Any] = json['releases']
-        for version_str, release in releases.items():
-
-            relevant_artifacts = []
-            for a in release:
-                if not a.get('yanked') and a.get("packagetype") in ("sdist", "bdist_wheel"):
-                    if sa := _create_artifact_from_pypi_release(a):
-                        relevant_artifacts.append(sa)
-
-            if relevant_artifacts:
-                version = Version.parse(version_str)
-                if dependency.version_spec.allows_version(version):
-                    packages.append(PypiPackage(
-                        PackageDescriptor(dependency.package_name, version),
-                        relevant_artifacts, self, PackageMetadata.from_config(package_info)
-                    ))
+        matched_releases: List[Tuple[Version, List[PackageArtifact]]] = []
+        package_info: Dict[str, Any] = {}
+        env_interpreter = env.interpreter_version
+
+        # the compact index is streamed so that only the releases that match the dependency are kept in memory
+        with index.open('r') as index_fd:
+            reader = JsonStreamReader(index_fd)
+            for key in reader.iter_object():
+                if key == 'info':
+                    package_info = {k.replace('_', '-').title(): v for k, v in reader.read_value().items()}
+                elif key == 'releases':
+                    for version_str in reader.iter_object():
+                        version = Version.parse(version_str)
+                        if not dependency.version_spec.allows_version(version):
+                            reader.skip_value()
+                            continue
+
+                        relevant_artifacts = [
+                            sa for a in reader.read_value()
+                            if (sa := _create_artifact_from_pypi_release(a))]
+
+                        if any(_may_support_interpreter(a, env_interpreter) for a in relevant_artifacts):
+                            matched_releases.append((version, relevant_artifacts))
+                else:
+                    reader.skip_value()
+
+        packages: List[PypiPackage] = [
+            PypiPackage(
+                PackageDescriptor(dependency.package_name, version),
+                relevant_artifacts, self, PackageMetadata.from_config(package_info))
+            for version, relevant_artifacts in matched_releases]
 
         return self._sorted_by_version(packages)
 
@@ -97,7 +120,8 @@ class PypiPackage(AbstractPackage, Serializable):
         if not url:
             raise KeyError(f'could not find url in given artifact info: {artifact}')
 
-        resource = self._repo._http.fetch_resource(url, resource_name=f"{self.name} {self.version}")
+        resource = self._repo._http.fetch_resource(
+            url, resource_name=f"{self.name} {self.version}", hashes=artifact.other_info.get('digests'))
         if not resource:
             raise FileNotFoundError(f'cannot find requested artifact: {artifact.file_name}')
 
@@ -112,6 +136,18 @@ class PypiPackage(AbstractPackage, Serializable):
 
         return resource.data
 
+    def _prefetch_artifact(self, artifact: PackageArtifact) -> Optional[Promise]:
+        if url := artifact.other_info.get('url'):
+            return self._repo._http.fetch_resource_async(
+                url, resource_name=f"{self.name} {self.version}", hashes=artifact.other_info.get('digests'))
+        return None
+
+    def _retrieve_artifact_metadata(self, artifact: PackageArtifact) -> Optional[PackageMetadata]:
+        if url := artifact.other_info.get('url'):
+            return WheelDistribution.fetch_remote_metadata(
+                self._repo._http, url, resource_name=f"metadata for {self.name} {self.version}")
+        return None
+
     def _unfiltered_dependencies(self, environment: Environment) -> List["Dependency"]:
         json: Dict[str, Any] = self._repo._http \
             .fetch_resource(f'{self._repo._fetch_url}/{self.name}/{self.version}/json',
@@ -137,6 +173,74 @@ def _create_artifact_from_pypi_release(release: Dict[str, Any]) -> Optional[Pack
     )
 
 
+def _may_support_interpreter(artifact: PackageArtifact, interpreter: Version) -> bool:
+    try:
+        return not artifact.requires_python or artifact.requires_python.allows_version(interpreter)
+    except ValueError:
+        return True  # will be reported and skipped when the package will search for its best artifact
+
+
+_COMPACT_INDEX_FILE_FIELDS = ('filename', 'requires_python', 'url', 'digests')
+
+
+def _compact_index_of(resource: FetchedResource) -> Path:
+    """
+    the pypi project json contains a lot of information that is not required for matching packages,
+    this method creates (if needed) a compact index next to the fetched project json which only contains
+    the project info and the relevant (non-yanked, sdist and wheel) release files with the fields required
+    for creating artifacts. both the project json and the compact index are read in a streaming fashion.
+
+    :param resource: the fetched project json resource
+    :return: path to the compact index
+    """
+
+    data_stat = resource.data.stat()
+    source = f"{data_stat.st_mtime_ns}:{data_stat.st_size}"
+    index = resource.data.with_name(f"{resource.data.name}.index.json")
+
+    if index.exists():
+        with index.open('r') as index_fd:
+            reader = JsonStreamReader(index_fd, chunk_size=4096)
+            if next(reader.iter_object(), None) == 'source' and reader.read_value() == source:
+                return index
+
+    # the same project index may be built concurrently (e.g., when matching `foo` and `foo[extra]`)
+    tmp_index = index.with_name(f"{index.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        _write_compact_index(resource, source, tmp_index)
+        tmp_index.replace(index)
+    finally:
+        tmp_index.unlink(missing_ok=True)
+
+    return index
+
+
+def _write_compact_index(resource: FetchedResource, source: str, tmp_index: Path):
+    with resource.data.open('r') as data_fd, tmp_index.open('w') as index_fd:
+        reader = JsonStreamReader(data_fd)
+        index_fd.write(f'{{"source": {json.dumps(source)}')
+
+        for key in reader.iter_object():
+            if key == 'info':
+                index_fd.write(f', "info": {json.dumps(reader.read_value())}')
+            elif key == 'releases':
+                index_fd.write(', "releases": {')
+                separator = ''
+                for version_str in reader.iter_object():
+                    files = [
+                        {k: f.get(k) for k in _COMPACT_INDEX_FILE_FIELDS}
+                        for f in reader.read_value()
+                        if not f.get('yanked') and f.get("packagetype") in ("sdist", "bdist_wheel")]
+
+                    index_fd.write(f'{separator}{json.dumps(version_str)}: {json.dumps(files)}')
+                    separator = ', '
+                index_fd.write('}')
+            else:
+                reader.skip_value()
+
+        index_fd.write('}')
+
+
 # https://warehouse.pypa.io/api-reference/legacy.html
 class PyPiPublisher(RepositoryPublisher):
 
@@ -203,14 +307,31 @@ class PypiRepositoryBuilder(RepositoryBuilder):
         super().__init__('pypi')
 
     # noinspection PyMethodMayBeStatic
-    def build(self, name: str, url: str, publish_url: Optional[str] = None) -> Repository:
+    def build(self, name: str, url: str, publish_url: Optional[str] = None, api: str = 'json') -> Repository:
+        """
+        :param name: the name of the repository
+        :param url: the fetch url of the repository or 'main'/'test' for the main/test pypi instances
+        :param publish_url: the url to publish packages into
+        :param api: the api to use for fetching packages - 'json' for the pypi json api or 'simple' for the
+                    simple repository api (using pep 691 json responses and pep 658 metadata files when available)
+        :return: the built repository
+        """
+
+        if api not in ('json', 'simple'):
+            raise ValueError(f"unsupported pypi api: '{api}', expecting 'json' or 'simple'")
+
         if url == 'main':
-            fetch_url = "https://pypi.org/pypi"
+            fetch_url = f"https://pypi.org/{'pypi' if api == 'json' else 'simple'}"
             publish_url = "https://upload.pypi.org/legacy"
         elif url == 'test':
-            fetch_url = "https://test.pypi.org/pypi"
+            fetch_url = f"https://test.pypi.org/{'pypi' if api == 'json' else 'simple'}"
             publish_url = "https://test.pypi.org/legacy"
         else:
             fetch_url = url.rstrip('/')
 
+        if api == 'simple':
+            from pkm.repositories.simple_repository import SimpleRepository
+            publisher = PyPiPublisher(name, pkm.httpclient, publish_url) if publish_url else None
+            return SimpleRepository(name, fetch_url, publisher)
+
         return PyPiRepository(name, fetch_url, publish_url)
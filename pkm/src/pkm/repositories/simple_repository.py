@@ -1,42 +1,70 @@
 from html.parser import HTMLParser
 from pathlib import Path
-from typing import List, Union, Tuple, Dict, Optional, Callable
+from typing import List, Union, Tuple, Dict, Optional, Callable, Any
+from urllib.parse import urljoin, urldefrag
 
 from pkm.api.dependencies.dependency import Dependency
-from pkm.api.distributions.wheel_distribution import InstallationException
+from pkm.api.distributions.wheel_distribution import InstallationException, WheelDistribution
 from pkm.api.environments.environment import Environment
 from pkm.api.packages.package import Package, PackageDescriptor
+from pkm.api.packages.package_metadata import PackageMetadata
 from pkm.api.packages.standard_package import PackageArtifact, AbstractPackage
 from pkm.api.pkm import pkm
-from pkm.api.repositories.repository import Repository, RepositoryBuilder, AbstractRepository
+from pkm.api.repositories.repository import Repository, RepositoryBuilder, AbstractRepository, RepositoryPublisher
 from pkm.api.versions.version import Version
-from pkm.api.versions.version_specifiers import VersionSpecifier
+from pkm.api.versions.version_specifiers import VersionSpecifier, SortedVersions
 from pkm.utils.http.cache_directive import CacheDirective
-from pkm.utils.http.http_client import Url
+from pkm.utils.http.http_client import FetchedResource
+from pkm.utils.promises import Promise
 from pkm.utils.types import Serializable
-from pkm.utils.iterators import groupby
+from pkm.utils.iterators import groupby, first_or_none
 from pkm.utils.strings import endswith_any, without_suffix
 
+# pep 691 content negotiation, prefer the json api but accept the html one (pep 503) from servers that does not support
+# it, note that the pep requires a server to fall back to html if it does not understand the accept header
+_SIMPLE_JSON_CONTENT_TYPE = "application/vnd.pypi.simple.v1+json"
+_SIMPLE_ACCEPT_HEADER = \
+    f"{_SIMPLE_JSON_CONTENT_TYPE}, application/vnd.pypi.simple.v1+html;q=0.2, text/html;q=0.01"
+
+# since this metadata version, source distributions may publish dependencies that are not dynamic (see pep 643)
+_STATIC_SDIST_METADATA_VERSION = Version.parse('2.2')
+
 
 class SimpleRepository(AbstractRepository):
     """
-    implementation of pep503 simple repository
+    implementation of pep503 simple repository, the json based api (pep 691) is used when the server supports it
+    and package dependencies are read from the core metadata files that the server exposes (pep 658) when
+    available, which avoids downloading distributions only for the sake of reading their dependencies
     """
 
-    def __init__(self, name: str, url: str):
+    def __init__(self, name: str, url: str, publisher: Optional[RepositoryPublisher] = None):
         super().__init__(name)
         self._url = url
-        self._base_url = Url.parse(url).connection_part()
-        self._packages: Dict[str, Dict[str, Package]] = {}  # name -> version -> package
+        self._publisher = publisher
+        self._packages: Dict[str, SortedVersions[Package]] = {}  # name -> packages (newest first)
+
+    @property
+    def publisher(self) -> Optional[RepositoryPublisher]:
+        return self._publisher
+
+    def _project_url(self, package_name: str) -> str:
+        return f"{self._url}/{package_name}/"
+
+    def fingerprint(self, package_name: str, env: Environment) -> Optional[str]:
+        if resource := pkm.httpclient.cached_resource(self._project_url(package_name)):
+            fetch_info = resource.fetch_info_data
+            return fetch_info.etag or fetch_info.fetch_time
+        return None
 
     def _do_match(self, dependency: Dependency, env: Environment) -> List[Package]:
         # monitor.on_dependency_match(dependency)
-        if not (version_to_package := self._packages.get(dependency.package_name)):
-            data = pkm.httpclient.fetch_resource(f"{self._url}/{dependency.package_name}").data
-            extractor = _HtmlArtifactsExtractor(self._base_url)
-            extractor.feed(data.read_text())
+        if not (packages := self._packages.get(dependency.package_name)):
+            project_url = self._project_url(dependency.package_name)
+            resource = pkm.httpclient.fetch_resource(
+                project_url, CacheDirective.ask_for_update(), resource_name=f"matching packages for {dependency}",
+                headers={'accept': _SIMPLE_ACCEPT_HEADER})
 
-            all_artifacts = extractor.artifacts
+            all_artifacts = _extract_artifacts(resource, project_url)
             grouped_by_version: Dict[str, List[PackageArtifact]] = groupby(
                 all_artifacts, lambda a: _extract_version(a.file_name))
 
@@ -47,10 +75,10 @@ class SimpleRepository(AbstractRepository):
 
                 for version_str, version_artifacts in grouped_by_version.items()
             }
-            self._packages[dependency.package_name] = version_to_package
+            packages = self._packages[dependency.package_name] = SortedVersions(
+                self._sorted_by_version(list(version_to_package.values())), lambda p: p.version)
 
-        packages = [p for p in version_to_package.values() if dependency.version_spec.allows_version(p.version)]
-        return self._sorted_by_version(packages)
+        return packages.matching(dependency.version_spec)
 
 
 _DISTRIBUTION_EXTENSIONS = (".whl", ".tar.gz", ".zip")
@@ -64,6 +92,60 @@ def _extract_version(filename: str) -> str:
         return result.split("-")[-1]
 
 
+def _extract_artifacts(resource: FetchedResource, project_url: str) -> List[PackageArtifact]:
+    content_type = resource.fetch_info_data.content_type or ''
+    if content_type.startswith(_SIMPLE_JSON_CONTENT_TYPE):
+        return _extract_json_artifacts(resource.read_data_as_json(), project_url)
+
+    extractor = _HtmlArtifactsExtractor(project_url)
+    extractor.feed(resource.data.read_text())
+    return extractor.artifacts
+
+
+def _create_artifact(
+        file_name: str, url: str, requires_python: Optional[str], hashes: Optional[Dict[str, str]],
+        metadata: Union[bool, Dict[str, str], None]) -> PackageArtifact:
+    """
+    :param file_name: the artifact file name
+    :param url: the artifact url, may contain a hash fragment (in which case it is used if `hashes` is not given)
+    :param requires_python: the value of the requires-python attribute of the artifact if available
+    :param hashes: the hashes of the artifact file
+    :param metadata: the value of the (pep 658) core-metadata attribute of the artifact (true or hashes dict)
+    :return: the created artifact
+    """
+
+    url, fragment = urldefrag(url)
+    if not hashes and fragment:
+        hash_function, _, hash_value = fragment.partition("=")
+        hashes = {hash_function: hash_value} if hash_function and hash_value else None
+
+    return PackageArtifact(
+        file_name, VersionSpecifier.parse(requires_python) if requires_python else None,
+        {'url': url, 'hashes': hashes or {}, 'metadata': metadata or None})
+
+
+def _extract_json_artifacts(project: Dict[str, Any], project_url: str) -> List[PackageArtifact]:
+    artifacts: List[PackageArtifact] = []
+    for file in project.get('files', []):
+        file_name: str = file.get('filename')
+        if not file_name or file.get('yanked') or not endswith_any(file_name, _DISTRIBUTION_EXTENSIONS):
+            continue
+
+        metadata = file.get('core-metadata', file.get('dist-info-metadata'))
+        artifacts.append(_create_artifact(
+            file_name, urljoin(project_url, file['url']), file.get('requires-python'), file.get('hashes'), metadata))
+
+    return artifacts
+
+
+def _parse_html_metadata_attr(value: Optional[str]) -> Union[bool, Dict[str, str], None]:
+    if value is None or value == 'false':
+        return None
+
+    hash_function, _, hash_value = value.partition("=")
+    return {hash_function: hash_value} if hash_value else True
+
+
 class _HtmlArtifactsExtractor(HTMLParser):
 
     def __init__(self, base_url: str, *, convert_charrefs: bool = ...) -> None:
@@ -82,21 +164,18 @@ class _HtmlArtifactsExtractor(HTMLParser):
 
     def handle_starttag(self, tag: str, attrs: List[Tuple[str, Union[str, None]]]) -> None:
         self._text_handler = \
-            lambda txt: self.handle_element(tag, {kv[0]: kv[1] for kv in attrs if kv[1] is not None}, txt)
+            lambda txt: self.handle_element(tag, {k: v if v is not None else '' for k, v in attrs}, txt)
 
     def handle_element(self, tag: str, attrs: Dict[str, str], text: str):
         self._text_handler = None
-        if tag == 'a' and 'href' in attrs:
-            requires_python = None
-            if requires_python_str := attrs.get('data-requires-python'):
-                requires_python = VersionSpecifier.parse(requires_python_str)
-
-            url = attrs.get('href')
-            if not url.startswith('http'):
-                url = f"{self._base_url}/{url.lstrip('/')}"
-
+        if tag == 'a' and 'href' in attrs and 'data-yanked' not in attrs:
             if endswith_any(text, _DISTRIBUTION_EXTENSIONS):
-                self.artifacts.append(PackageArtifact(text, requires_python, {'url': url}))
+                metadata = _parse_html_metadata_attr(
+                    attrs.get('data-core-metadata', attrs.get('data-dist-info-metadata')))
+
+                self.artifacts.append(_create_artifact(
+                    text, urljoin(self._base_url, attrs['href']), attrs.get('data-requires-python'), None,
+                    metadata))
 
 
 class _SimplePackage(AbstractPackage, Serializable):
@@ -113,16 +192,64 @@ class _SimplePackage(AbstractPackage, Serializable):
     def _retrieve_artifact(self, artifact: PackageArtifact) -> Path:
         url = artifact.other_info['url']
         resource = pkm.httpclient.fetch_resource(url, CacheDirective.allways(),
-                                                 resource_name=f"{self.name} {self.version}")
-
-        fragment = Url.parse(url).fragment
-        if fragment:
-            hash_function, _, hash_value = fragment.partition("=")
-            if hash_function and hash_value and not resource.is_hash_valid(hash_function, hash_value):
-                raise InstallationException(f"Invalid hash for a resource received from {url}")
+                                                 resource_name=f"{self.name} {self.version}",
+                                                 hashes=artifact.other_info.get('hashes'))
 
+        _validate_hashes(resource, artifact.other_info.get('hashes'), url)
         return resource.data
 
+    def _prefetch_artifact(self, artifact: PackageArtifact) -> Optional[Promise]:
+        return pkm.httpclient.fetch_resource_async(
+            artifact.other_info['url'], CacheDirective.allways(), resource_name=f"{self.name} {self.version}",
+            hashes=artifact.other_info.get('hashes'))
+
+    def _retrieve_artifact_metadata(self, artifact: PackageArtifact) -> Optional[PackageMetadata]:
+        return WheelDistribution.fetch_remote_metadata(
+            pkm.httpclient, artifact.other_info['url'], resource_name=f"metadata for {self.name} {self.version}")
+
+    def _unfiltered_dependencies(self, environment: Environment) -> List[Dependency]:
+        artifact = self.best_artifact_for(environment)
+        if not artifact or not (metadata := artifact.other_info.get('metadata')):
+            return super()._unfiltered_dependencies(environment)
+
+        if (deps := self._dependencies_per_artifact_id.get(id(artifact))) is None:
+            url = f"{artifact.other_info['url']}.metadata"
+            resource = pkm.httpclient.fetch_resource(url, CacheDirective.allways(),
+                                                     resource_name=f"metadata for {self.name} {self.version}")
+
+            _validate_hashes(resource, metadata if isinstance(metadata, dict) else None, url)
+            metadata = PackageMetadata.load(resource.data)
+            if not artifact.is_binary() and not _has_static_dependencies(metadata):
+                # the dependencies of this source distribution may only be known by building it
+                return super()._unfiltered_dependencies(environment)
+
+            deps = self._dependencies_per_artifact_id[id(artifact)] = metadata.dependencies
+
+        return deps
+
+
+def _has_static_dependencies(metadata: PackageMetadata) -> bool:
+    """
+    :param metadata: the metadata of a source distribution
+    :return: True if the dependencies in the given `metadata` are the ones that a build of the source distribution
+             will produce, this is only guaranteed since metadata version 2.2, for fields that are not marked as
+             dynamic (see pep 643)
+    """
+    if not metadata.metadata_version or metadata.metadata_version < _STATIC_SDIST_METADATA_VERSION:
+        return False
+
+    dynamic = (metadata.leftovers or {}).get('Dynamic') or []
+    return all(field.strip().lower() != 'requires-dist' for field in dynamic)
+
+
+def _validate_hashes(resource: FetchedResource, hashes: Optional[Dict[str, str]], url: str):
+    if not hashes:
+        return
+
+    hash_function = 'sha256' if 'sha256' in hashes else first_or_none(hashes.keys())
+    if not resource.is_hash_valid(hash_function, hashes[hash_function]):
+        raise InstallationException(f"Invalid hash for a resource received from {url}")
+
 
 class SimpleRepositoryBuilder(RepositoryBuilder):
     def __init__(self):
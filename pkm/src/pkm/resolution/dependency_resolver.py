@@ -1,23 +1,40 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, replace
-from typing import List, Dict, Optional, TYPE_CHECKING, cast
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import List, Dict, Optional, TYPE_CHECKING, cast, Set, Tuple
 
 from pkm.api.dependencies.dependency import Dependency
 from pkm.api.packages.package import PackageDescriptor, Package
 from pkm.api.versions.version import Version, UrlVersion, StandardVersion
-from pkm.api.versions.version_specifiers import VersionMatch
+from pkm.api.versions.version_specifiers import VersionMatch, VersionSpecifier
 from pkm.build.external_builders import BuildError
 from pkm.resolution.pubgrub import Problem, MalformedPackageException, Term, Solver
 from pkm.utils.dicts import get_or_put
 from pkm.utils.hashes import HashBuilder
-from pkm.utils.promises import Promise
+from pkm.utils.promises import Promise, await_all_promises
 from pkm.utils.sequences import single_or_raise
 
 if TYPE_CHECKING:
     from pkm.api.packages.package_installation import PackageInstallationTarget
     from pkm.api.repositories.repository import Repository
 
+# speculative dependency fetches may build source distributions, which resolves (and waits on) their build
+# requirements using `pkm.threads`, so they get their own (bounded) executor in order not to starve it
+_MAX_SPECULATION_THREADS = 4
+_speculation_threads: Optional[ThreadPoolExecutor] = None
+_speculation_threads_lock = Lock()
+
+
+def _speculation_executor() -> ThreadPoolExecutor:
+    global _speculation_threads
+    with _speculation_threads_lock:
+        if _speculation_threads is None:
+            _speculation_threads = ThreadPoolExecutor(_MAX_SPECULATION_THREADS, thread_name_prefix='pkm-speculation')
+        return _speculation_threads
+
 
 def resolve_dependencies(root: Dependency, target: "PackageInstallationTarget", repo: "Repository",
                          dependency_overrides: Optional[Dict[str, Dependency]] = None) -> List[Package]:
@@ -33,9 +50,19 @@ def resolve_dependencies(root: Dependency, target: "PackageInstallationTarget",
     :return: the list of packages that are required to be installed so that the `root` dependency works correctly
     """
 
+    from pkm.api.pkm import pkm
+
+    cache = pkm.resolution_cache if pkm.config.resolution_cache else None
+    request_key = cache and cache.request_key(root, target.env, repo, dependency_overrides or {})
+    if request_key and (cached := cache.load(request_key, target.env, repo)) is not None:
+        return cached
+
     problem = _PkmPackageInstallationProblem(target, repo, root, dependency_overrides)
     solver = Solver(problem, _Pkg.of(root))
-    solution: Dict[_Pkg, Version] = solver.solve()
+    try:
+        solution: Dict[_Pkg, Version] = solver.solve()
+    finally:
+        problem.close()
 
     result: List[Package] = []
 
@@ -45,6 +72,9 @@ def resolve_dependencies(root: Dependency, target: "PackageInstallationTarget",
 
         result.append(problem.opened_packages[PackageDescriptor(pkg.name, version)])
 
+    if request_key:
+        cache.store(request_key, target.env, repo, problem.consulted_packages(), result)
+
     return result
 
 
@@ -59,14 +89,96 @@ class _PkmPackageInstallationProblem(Problem):
 
         from pkm.api.pkm import pkm
         self._threads = pkm.threads
+        self._speculated_versions = pkm.config.resolution_prefetch_versions
 
         self.opened_packages: Dict[PackageDescriptor, Package] = {}
         self._prefetched_packages: Dict[_Pkg, Promise[List[Package]]] = {}
 
+        # speculative dependencies prefetching - see `prefetch`
+        self._speculation_lock = Lock()
+        self._speculated_dependencies: Dict[Tuple[_Pkg, Version], Promise[List[Dependency]]] = {}
+        self._speculations_by_package: Dict[_Pkg, List[Tuple[_Pkg, Version]]] = {}
+
     def _prefetch(self, package: _Pkg) -> Promise[List[Package]]:
         return get_or_put(self._prefetched_packages, package,
                           lambda: Promise.execute(self._threads, self._repo.list, package.name, self._target.env))
 
+    def prefetch(self, package: _Pkg, constraint: VersionSpecifier):
+        # speculatively fetch the dependencies of the top candidate versions of the package, the solver will most
+        # likely pick one of them and then ask for its dependencies in `get_dependencies`
+
+        if self._speculated_versions <= 0 or package in self._speculations_by_package:
+            return
+
+        with self._speculation_lock:
+            self._speculations_by_package[package] = []
+
+        def speculate(packages_promise: Promise[List[Package]]):
+            if not packages_promise.is_succeeded():
+                return
+
+            # only versions that the solver may pick (see `get_versions`) are worth speculating on
+            env = self._target.env
+            candidates = list(islice((
+                p for p in packages_promise.result()
+                if isinstance(p.version, StandardVersion) and constraint.allows_version(p.version)
+                and p.is_compatible_with(env)), self._speculated_versions))
+
+            with self._speculation_lock:
+                if (speculations := self._speculations_by_package.get(package)) is None:
+                    return  # canceled while the versions were being fetched
+
+                for candidate in candidates:
+                    key = (package, candidate.version)
+                    if key not in self._speculated_dependencies:
+                        self._speculated_dependencies[key] = Promise.execute(
+                            _speculation_executor(), candidate.dependencies, self._target, package.extras)
+                        speculations.append(key)
+
+        self._prefetch(package).when_completed(speculate)
+
+    def cancel_prefetch(self, package: _Pkg):
+        with self._speculation_lock:
+            for key in self._speculations_by_package.pop(package, ()):
+                if (promise := self._speculated_dependencies.get(key)) and promise.request_cancel():
+                    del self._speculated_dependencies[key]
+
+    def close(self):
+        """
+        cancels the speculative prefetches that did not start yet and waits for the ones that did, so that no
+        speculative work (e.g., building the metadata of a dropped candidate) outlives the resolution
+        """
+        with self._speculation_lock:
+            packages = list(self._speculations_by_package)
+
+        # also makes speculations whose versions are still being fetched to be ignored (see `prefetch`)
+        for package in packages:
+            self.cancel_prefetch(package)
+
+        with self._speculation_lock:
+            started = list(self._speculated_dependencies.values())
+            self._speculated_dependencies.clear()
+
+        await_all_promises(started, ignore_error=True)
+
+    def _await_speculation(self, package: _Pkg, version: Version):
+        with self._speculation_lock:
+            promise = self._speculated_dependencies.get((package, version))
+            if promise and promise.request_cancel():
+                # the speculation did not start yet, waiting for it may wait for the speculations queued before it
+                del self._speculated_dependencies[(package, version)]
+                return
+
+        if promise:
+            # the speculative fetch only warms up the package, failures are reported by the actual fetch
+            await_all_promises([promise], ignore_error=True)
+
+    def consulted_packages(self) -> Set[str]:
+        """
+        :return: the names of all the packages that were matched against the repository in order to solve this problem
+        """
+        return {self._root.package_name, *(p.name for p in self._prefetched_packages)}
+
     def get_dependencies(self, package: _Pkg, version: Version) -> List[Term]:
         descriptor = PackageDescriptor(package.name, version)
 
@@ -75,6 +187,7 @@ class _PkmPackageInstallationProblem(Problem):
                 self.opened_packages[descriptor] = single_or_raise(
                     self._repo.match(f"{package} @ {version}", self._target.env))
 
+            self._await_speculation(package, version)
             dependencies = self.opened_packages[descriptor].dependencies(self._target, package.extras)
 
             for d in dependencies:
@@ -146,6 +146,12 @@ class LockPrioritizingRepository(AbstractRepository):
     def _do_match(self, dependency: Dependency, env: Environment) -> List[Package]:
         return self._lock.sort_packages_by_lock_preference(env, self._base_repo.match(dependency, env))
 
+    def fingerprint(self, package_name: str, env: Environment) -> Optional[str]:
+        if (base_fingerprint := self._base_repo.fingerprint(package_name, env)) is None:
+            return None
+        locked = ','.join(str(it.version) for it in self._lock.locked_versions(env, package_name))
+        return f"{base_fingerprint}|locked:{locked}"
+
     def accepted_url_protocols(self) -> Iterable[str]:
         return self._base_repo.accepted_url_protocols()
 
@@ -9,7 +9,7 @@ from typing import List, Dict, Iterable, Tuple, Optional, cast, DefaultDict, Uni
 
 from pkm.api.versions.version import Version, StandardVersion
 from pkm.api.versions.version_specifiers import VersionSpecifier, VersionMatch, AllowAllVersions, \
-    RestrictAllVersions
+    RestrictAllVersions, SortedVersions
 from pkm.resolution.resolution_monitor import DependencyResolutionIterationEvent, \
     DependencyResolutionConclusionEvent, DependencyResolutionMonitoredOp
 from pkm.utils.iterators import find_first
@@ -28,6 +28,27 @@ class PKG(Protocol):
 
 PKG_T = TypeVar('PKG_T', bound=PKG)
 
+_MAX_CACHED_INTERSECTIONS = 64 * 1024
+
+# (id(c1), id(c2)) -> (c1, c2, c1 ∩ c2), the operands are kept so that their ids cannot be reused while cached
+_intersections: Dict[Tuple[int, int], Tuple[VersionSpecifier, VersionSpecifier, VersionSpecifier]] = {}
+
+
+def _intersect(c1: VersionSpecifier, c2: VersionSpecifier) -> VersionSpecifier:
+    """
+    :return: c1 ∩ c2, cached by the identity of the given constraints as the solver intersects the same constraint
+             objects over and over (e.g., after backtracking)
+    """
+    key = (id(c1), id(c2))
+    if (cached := _intersections.get(key)) is not None:
+        return cached[2]
+
+    if len(_intersections) >= _MAX_CACHED_INTERSECTIONS:
+        _intersections.clear()
+    result = c1.intersect_with(c2)
+    _intersections[key] = (c1, c2, result)
+    return result
+
 
 class UnsolvableProblemException(Exception):
     def __init__(self, incompatibility: "Incompatibility"):
@@ -49,7 +70,7 @@ class Term:
 
     def intersect(self, other: "Term") -> "Term":
         assert self.package == other.package, 'cannot intersect terms of different packages'
-        return Term(self.package, self.constraint.intersect_with(other.constraint))
+        return Term(self.package, _intersect(self.constraint, other.constraint))
 
     def satisfies(self, constraint: VersionSpecifier) -> bool:
         """self ⊆ term"""
@@ -71,7 +92,7 @@ class Term:
         constraint = first_term.constraint
 
         while next_term is not None:
-            constraint = constraint.intersect_with(next_term.constraint)
+            constraint = _intersect(constraint, next_term.constraint)
             next_term = next(terms_iter, None)
 
         return cls(package, constraint)
@@ -100,12 +121,20 @@ class Assignment:
 
 
 class PartialSolution:
+    """
+    the partial solution is kept as a trail - assignments (and required packages) are only ever appended in
+    non-decreasing decision level order, so backtracking is done by popping from the tail of the trail,
+    undoing only the assignments that were made after the target decision level
+    """
+
     def __init__(self, root_package: PKG = 'root'):
         self._root_package = root_package
         self._assignments_by_order: List[Assignment] = []
         self.assignments_by_package: DefaultDict[PKG, List[Assignment]] = defaultdict(list)
         self._required_packages: Dict[PKG, int] = {}
+        self._required_packages_trail: List[PKG] = []
         self._decisions: Dict[PKG, Assignment] = {}
+        self._decisions_by_level: Dict[int, Assignment] = {}
 
     def notify_state(self, current_package: PKG, monitor: DependencyResolutionMonitoredOp):
         # noinspection PyTypeChecker
@@ -129,42 +158,74 @@ class PartialSolution:
 
     def requiering_decision(self, package: PKG):
         decision_level = self._required_packages[package]
-        result = next((acc for acc in self._decisions.values() if acc.decision_level == decision_level), None)
+        result = self._decisions_by_level.get(decision_level)
         assert result, f"requiring decision could not be found for package {package} " \
                        f"- no decider for level {decision_level}"
         return result
 
-    def backtrack(self, decision_level: int):
+    def backtrack(self, decision_level: int) -> List[PKG]:
+        """
+        undo all the assignments (and requirements) that were made after the given `decision_level`
+        :param decision_level: the decision level to backtrack to
+        :return: the packages that are no longer required as a result of this backtracking
+        """
         # print(f"backtrack to decision_level: {decision_level}")
 
-        def filtered(lst: List[Assignment]) -> Iterable[Assignment]:
-            return (ass for ass in lst if ass.decision_level <= decision_level)
+        assignments_by_order = self._assignments_by_order
+        assignments_by_package = self.assignments_by_package
+        while assignments_by_order and assignments_by_order[-1].decision_level > decision_level:
+            assignment = assignments_by_order.pop()
+            package = assignment.term.package
+            package_assignments = assignments_by_package[package]
+            assert package_assignments[-1] is assignment, "partial solution trail is out of order"
+            package_assignments.pop()
 
-        self._assignments_by_order = list(filtered(self._assignments_by_order))
+            if assignment.is_decision():
+                del self._decisions[package]
+                del self._decisions_by_level[assignment.decision_level]
 
-        assignments_by_package = defaultdict(list)
-        for package, assignments in self.assignments_by_package.items():
-            assignments_by_package[package].extend(filtered(assignments))
+        required_packages = self._required_packages
+        required_packages_trail = self._required_packages_trail
+        unrequired: List[PKG] = []
+        while required_packages_trail and required_packages[required_packages_trail[-1]] > decision_level:
+            unrequired.append(package := required_packages_trail.pop())
+            del required_packages[package]
 
-        self.assignments_by_package = assignments_by_package
+        return unrequired
 
-        self._required_packages = {
-            package: req_decision_level
-            for package, req_decision_level in self._required_packages.items()
-            if req_decision_level <= decision_level
-        }
+    def satisfies(self, term: Term) -> bool:
+        """
+        :param term: the term to check
+        :return: True if the current assignments of the term's package are contained in the term (or are
+                 contradicting, in which case the term is trivially satisfied), False otherwise
+        """
+        if package_assignments := self.assignments_by_package.get(term.package):
+            return term.constraint.allows_all(package_assignments[-1].accumulated)
+        return False
 
-        self._decisions = {
-            package: decision
-            for package, decision in self._decisions.items()
-            if decision.decision_level <= decision_level
-        }
+    def satisfier_order(self, term: Term) -> int:
+        """
+        :param term: a term that is satisfied by this solution
+        :return: the order index of the assignment that satisfies the given `term`
+        """
+        satisfier = IncompatibilitySatisfaction.find_satisfier(self, term)
+        return satisfier.order_index if satisfier else len(self._assignments_by_order)
 
-    def require(self, packages: Iterable[PKG]):
+    def require(self, packages: Iterable[PKG]) -> List[PKG]:
+        """
+        mark the given `packages` as required in the current decision level
+        :param packages: the packages to require
+        :return: the packages that were not required before this call
+        """
         required_packages = self._required_packages
+        newly_required: List[PKG] = []
         for package in packages:
             if package not in required_packages:
                 required_packages[package] = self._decision_level
+                self._required_packages_trail.append(package)
+                newly_required.append(package)
+
+        return newly_required
 
     def requires(self, package: PKG) -> bool:
         return package in self._required_packages
@@ -174,7 +235,7 @@ class PartialSolution:
 
         accumulated_constraint = assignment_value.constraint
         if package_assignments:
-            accumulated_constraint = package_assignments[-1].accumulated.intersect_with(accumulated_constraint)
+            accumulated_constraint = _intersect(package_assignments[-1].accumulated, accumulated_constraint)
 
         dlevel = self._decision_level
 
@@ -193,6 +254,7 @@ class PartialSolution:
         if assignment.is_decision():
             # print(f"decided: {assignment}")
             self._decisions[assignment.term.package] = assignment
+            self._decisions_by_level[assignment.decision_level] = assignment
         else:
             # print(f"derrived: {assignment}")
             ...
@@ -237,7 +299,7 @@ class IncompatibilitySatisfaction:
 
                     acc = assignment.accumulated
                     if next_satisfier:
-                        if term.constraint.allows_all(acc.intersect_with(next_satisfier.term.constraint)):
+                        if term.constraint.allows_all(_intersect(acc, next_satisfier.term.constraint)):
                             return assignment
                     elif term.constraint.allows_all(acc):
                         return assignment
@@ -282,6 +344,9 @@ class Incompatibility:
         self.internal_cause = internal_cause
         self.external_cause = external_cause
 
+        # the packages of the (at most two) terms watched by the solver for this incompatibility
+        self.watched: List[PKG] = []
+
     def is_simple(self):
         if self.internal_cause:
             ic1, ic2 = self.internal_cause
@@ -556,6 +621,21 @@ class Problem(ABC):
         :return: True if the given package and version pair could be found, False otherwise
         """
 
+    def prefetch(self, package: PKG, constraint: VersionSpecifier):
+        """
+        hint that the given `package` became required with the given `constraint`, implementations may use this hint
+        to speculatively start fetching the information that will be requested for this package
+        :param package: the package that became required
+        :param constraint: the constraint that the package was required with
+        """
+
+    def cancel_prefetch(self, package: PKG):
+        """
+        hint that the given `package` is no longer required (as a result of backtracking),
+        implementations may use this hint to cancel their speculative fetching for this package
+        :param package: the package that is no longer required
+        """
+
 
 class Solver(Generic[PKG_T]):
 
@@ -564,26 +644,86 @@ class Solver(Generic[PKG_T]):
         self._problem = problem
         self._solution = PartialSolution(root_package)
         self._package_versions: Dict[PKG, List[_PackageVersion]] = {}
+        self._package_versions_index: Dict[PKG, SortedVersions[_PackageVersion]] = {}
         self._package_availability_incompatibilities: Dict[PKG, Incompatibility] = {}
         self._package_trouble_level: Counter[PKG] = Counter()
 
         # incompatibilities by package
         self._incompatibilities: DefaultDict[PKG, List[Incompatibility]] = defaultdict(list)
+        # incompatibilities by the packages of their watched terms
+        self._watchers: DefaultDict[PKG, List[Incompatibility]] = defaultdict(list)
+        self._mop = DependencyResolutionMonitoredOp()
 
     def _add_incompatibility(self, incompatibility: Incompatibility):
         if isinstance(incompatibility, DependencyIncompatibility):
             if incompatibility.added:
+                self._watch(incompatibility)  # its terms may have been updated since it was added
                 return True
             incompatibility.added = True
 
         # print(f'adding incompatibility: {incompatibility}')
+        added = False
         for term in incompatibility.terms:
             term_incompatibilities = self._incompatibilities[term.package]
             if incompatibility not in term_incompatibilities:
                 term_incompatibilities.append(incompatibility)
+                added = True
+
+        if added:
+            self._watch(incompatibility)
+
+    def _watch(self, incompatibility: Incompatibility):
+        """
+        (re)select the terms watched for the given `incompatibility`. unsatisfied terms are preferred, when there are
+        not enough of them, the satisfied terms with the latest satisfiers are selected so that any backtracking that
+        un-satisfies a non-watched term also un-satisfies a watched one.
+        """
+
+        solution = self._solution
+        unsatisfied = [term for term in incompatibility.terms if not solution.satisfies(term)]
+        if len(unsatisfied) < 2:
+            satisfied = sorted(
+                (term for term in incompatibility.terms if solution.satisfies(term)),
+                key=solution.satisfier_order, reverse=True)
+            unsatisfied.extend(satisfied[:2 - len(unsatisfied)])
+
+        watchers = self._watchers
+        for package in incompatibility.watched:
+            _remove_identity(watchers[package], incompatibility)
+
+        incompatibility.watched = [term.package for term in unsatisfied[:2]]
+        for package in incompatibility.watched:
+            watchers[package].append(incompatibility)
+
+    def _should_check(self, incompatibility: Incompatibility, package: PKG) -> bool:
+        """
+        called when `package`, which is watched by the given `incompatibility`, was changed. if the watched term
+        of `package` is satisfied, attempts to move the watch into an unsatisfied term.
+        :return: True if the incompatibility may have become (almost) satisfied and therefore should be checked
+        """
+
+        solution = self._solution
+        term = incompatibility.term_for(package)
+        watched = incompatibility.watched
+        if not solution.satisfies(term):
+            # the incompatibility is (almost) satisfied only when all its other terms are satisfied, by the watching
+            # invariant, if the other watched term is satisfied so are all the non-watched ones
+            other = next((it for it in watched if it != package), None)
+            return other is None or solution.satisfies(incompatibility.term_for(other))
+
+        for other in incompatibility.terms:
+            if other.package not in watched and not solution.satisfies(other):
+                watched[watched.index(package)] = other.package
+                _remove_identity(self._watchers[package], incompatibility)
+                self._watchers[other.package].append(incompatibility)
+                self._mop.watches_moved += 1
+                return False
+
+        return True
 
     def solve(self) -> Dict[PKG_T, Version]:
         with DependencyResolutionMonitoredOp() as mop:
+            self._mop = mop
             root_term = self.package_versions(self._root_package)[0].term
             self._add_incompatibility(
                 Incompatibility.create([root_term.negate()], external_cause='Root Project'))
@@ -604,23 +744,35 @@ class Solver(Generic[PKG_T]):
     def _propagate(self, next_package: PKG):
 
         # print("#### unit propagation ####")
+        mop = self._mop
         changed = {next_package}
 
         while changed:
             package = changed.pop()
 
-            for incompatibility in list(reversed(self._incompatibilities[package])):
+            for incompatibility in list(reversed(self._watchers[package])):
+                mop.incompatibilities_visited += 1
+                if not self._should_check(incompatibility, package):
+                    continue
+
+                mop.incompatibilities_checked += 1
                 satisfaction: IncompatibilitySatisfaction = incompatibility.check_satisfaction(self._solution)
                 if satisfaction.is_full():
                     # print(f"incompatibility: {incompatibility} satisfied, entering conflict resolution")
+                    mop.conflicts += 1
                     changed.add(self._resolve_conflict(incompatibility, satisfaction))
 
                 elif satisfaction.is_almost_full():
                     term = satisfaction.undecided_term
                     # print(f"incompatibility {incompatibility} is almost full, undecided_term is {term}")
+                    mop.derivations += 1
                     self._solution.assign(term.negate(), incompatibility)
                     changed.add(term.package)
 
+    def _backtrack(self, decision_level: int):
+        for package in self._solution.backtrack(decision_level):
+            self._problem.cancel_prefetch(package)
+
     def _is_tautology(self, incompatibility: Incompatibility) -> bool:
         return not (terms := incompatibility.terms) or \
                (len(terms) == 1 and terms[0].package == self._root_package)
@@ -647,7 +799,7 @@ class Solver(Generic[PKG_T]):
             # print(f"satisfier: {satisfier}, prev_satisfier: {prev_satisfier}")
 
             if satisfier.is_decision() or prev_satisfier_level < satisfier.decision_level:
-                self._solution.backtrack(prev_satisfier_level)
+                self._backtrack(prev_satisfier_level)
                 if incompatibility is not original_incompatibility:
                     self._add_incompatibility(incompatibility)
 
@@ -676,7 +828,7 @@ class Solver(Generic[PKG_T]):
                 list(prior_cause_terms), internal_cause=(satisfier.cause, incompatibility))
 
             if len(prior_cause_terms) == 0:
-                self._solution.backtrack(0)
+                self._backtrack(0)
                 self._solution.assign(Term(term.package, RestrictAllVersions), cause=incompatibility)
                 return term.package
 
@@ -713,8 +865,14 @@ class Solver(Generic[PKG_T]):
                 sorted_versions[-1].effective_constraint_range = VersionSpecifier.create_range(
                     min_=cast(StandardVersion, sorted_versions[-2].version))
 
+            self._package_versions_index[package] = SortedVersions(versions, lambda v: v.version)
+
         return versions
 
+    def _matching_versions_index(self, package: PKG) -> SortedVersions[_PackageVersion]:
+        self.package_versions(package)
+        return self._package_versions_index[package]
+
     def _attempt_minor_adjustments(self, package: PKG, conflicts: List[Incompatibility]) -> bool:
         # attempt the minor adjustment heuristic: the idea is that if this package cannot be selected
         # because we previously chose incompatible version of one of its dependencies then we check
@@ -742,7 +900,7 @@ class Solver(Generic[PKG_T]):
         if minor_adjustment_dlevel >= 0 \
                 and self._solution.requirement_decision_level(package) <= minor_adjustment_dlevel:
             print(f"applying minor adjusments heuristic - backtracking to {minor_adjustment_dlevel}")
-            self._solution.backtrack(minor_adjustment_dlevel)
+            self._backtrack(minor_adjustment_dlevel)
             return True
 
         return False
@@ -754,7 +912,10 @@ class Solver(Generic[PKG_T]):
             return None
 
         # print(f"undecided packages: {undecided_packages}")
+        # the matching versions are only counted (by bisection) for choosing the package, and then listed just for
+        # the chosen one
         package_matching_versions: Dict[PKG, List[_PackageVersion]] = {}
+        matching_versions_count: Dict[PKG, int] = {}
         for package in undecided_packages:
             acc_assignment = self._solution.assignments_by_package[package][-1].accumulated
 
@@ -766,17 +927,20 @@ class Solver(Generic[PKG_T]):
                         _PackageVersion(Term(package, acc_assignment), acc_assignment)]
                 else:
                     package_matching_versions[package] = []
+                matching_versions_count[package] = len(package_matching_versions[package])
             else:
-                versions = self.package_versions(package)
-                package_matching_versions[package] = [pver for pver in versions if
-                                                      acc_assignment.allows_version(pver.version)]
+                matching_versions_count[package] = \
+                    self._matching_versions_index(package).count_matching(acc_assignment)
 
         package = min(undecided_packages,
-                      key=lambda pack: (-self._package_trouble_level[pack], len(package_matching_versions[pack])))
+                      key=lambda pack: (-self._package_trouble_level[pack], matching_versions_count[pack]))
 
         # print(f"choosing to try and assign {package} with constraint: ", end='')
         # print(f"{self._solution.assignments_by_package[package][-1].accumulated}")
-        versions = list(package_matching_versions[package])  # defensive copy because we might change it
+        if (versions := package_matching_versions.get(package)) is None:
+            versions = self._matching_versions_index(package).matching(
+                self._solution.assignments_by_package[package][-1].accumulated)
+        versions = list(versions)  # defensive copy because we might change it
 
         while True:
             if not versions:
@@ -822,7 +986,8 @@ class Solver(Generic[PKG_T]):
         if not conflicts:
             # print("we can!")
             self._solution.assign(assignment)
-            self._solution.require(version.dependencies.keys())
+            for dependency in self._solution.require(version.dependencies.keys()):
+                self._problem.prefetch(dependency, version.dependencies[dependency].term.constraint)
         else:
             # print(f"we cant.. ({conflicts})")
             ...
@@ -835,3 +1000,10 @@ class Solver(Generic[PKG_T]):
             self._add_incompatibility(incompatibility)
 
         return incompatibilities
+
+
+def _remove_identity(incompatibilities: List[Incompatibility], incompatibility: Incompatibility):
+    for i in range(len(incompatibilities) - 1, -1, -1):
+        if incompatibilities[i] is incompatibility:
+            del incompatibilities[i]
+            return
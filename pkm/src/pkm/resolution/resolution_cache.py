@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable, TYPE_CHECKING
+
+from pkm.api.dependencies.dependency import Dependency
+from pkm.api.packages.package import Package, PackageDescriptor
+from pkm.api.versions.version import StandardVersion
+from pkm.api.versions.version_specifiers import VersionMatch
+from pkm.utils.iterators import first_or_none
+
+if TYPE_CHECKING:
+    from pkm.api.environments.environment import Environment
+    from pkm.api.repositories.repository import Repository
+
+
+class ResolutionCache:
+    """
+    persistent cache for dependency resolution results.
+
+    entries are content addressed by the resolution request (the root dependency and its dependencies, the dependency
+    overrides, the environment markers hash and its compatibility tags fingerprint), each entry stores the resolved
+    packages together with the repository fingerprints of all the packages that were consulted during the resolution,
+    an entry is only used if all of these fingerprints are still valid (see `Repository.fingerprint`)
+    """
+
+    def __init__(self, workspace: Path):
+        self.workspace = workspace
+        workspace.mkdir(parents=True, exist_ok=True)
+
+    def request_key(self, root: Dependency, env: "Environment", repo: "Repository",
+                    dependency_overrides: Dict[str, Dependency]) -> Optional[str]:
+        """
+        :param root: the root dependency of the resolution request
+        :param env: the environment that the resolution is performed for
+        :param repo: the repository that is used for the resolution
+        :param dependency_overrides: the dependency overrides used in the resolution
+        :return: the key of the given resolution request, or None if the request cannot be cached
+        """
+
+        if (root_fingerprint := repo.fingerprint(root.package_name, env)) is None:
+            return None
+
+        request = {
+            'root': str(root),
+            'root-fingerprint': root_fingerprint,
+            'overrides': sorted(str(d) for d in dependency_overrides.values()),
+            'env': env.markers_hash,
+            # environments with the same markers may still differ in the artifacts (and dependencies) they select
+            'compatibility': env.compatibility_fingerprint,
+            'repo': repo.name,
+        }
+
+        return hashlib.blake2s(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+    def _entry_file(self, request_key: str) -> Path:
+        return self.workspace / request_key[:2] / f"{request_key}.json"
+
+    def load(self, request_key: str, env: "Environment", repo: "Repository") -> Optional[List[Package]]:
+        """
+        load the resolution result stored for the given request
+        :param request_key: the request key (as returned from `request_key`)
+        :param env: the environment that the resolution is performed for
+        :param repo: the repository that is used for the resolution
+        :return: the resolved packages if a valid entry exists for the given request, None otherwise
+        """
+
+        entry_file = self._entry_file(request_key)
+        if not entry_file.exists():
+            return None
+
+        try:
+            entry = json.loads(entry_file.read_text())
+            fingerprints: Dict[str, str] = entry['fingerprints']
+            descriptors = [PackageDescriptor.read(it) for it in entry['packages']]
+        except (ValueError, KeyError):
+            entry_file.unlink(missing_ok=True)
+            return None
+
+        # first validate using only the local information and only then re-match the packages
+        # (which may refresh the repositories) and validate the fingerprints again
+        if not self._is_valid(fingerprints, env, repo):
+            return None
+
+        result: List[Package] = []
+        for descriptor in descriptors:
+            matched = repo.match(Dependency(descriptor.name, VersionMatch(descriptor.version)), env)
+            if not (package := first_or_none(p for p in matched if p.version == descriptor.version)):
+                return None
+            result.append(package)
+
+        if not self._is_valid(fingerprints, env, repo):
+            return None
+
+        return result
+
+    def store(self, request_key: str, env: "Environment", repo: "Repository", consulted_packages: Iterable[str],
+              packages: List[Package]):
+        """
+        store the result of a resolution
+        :param request_key: the request key (as returned from `request_key`)
+        :param env: the environment that the resolution was performed for
+        :param repo: the repository that was used for the resolution
+        :param consulted_packages: the names of all the packages that the resolution process matched
+        :param packages: the resolved packages
+        """
+
+        if not all(isinstance(p.version, StandardVersion) for p in packages):
+            return
+
+        fingerprints: Dict[str, str] = {}
+        for package_name in consulted_packages:
+            if (fingerprint := repo.fingerprint(package_name, env)) is None:
+                return
+            fingerprints[package_name] = fingerprint
+
+        entry = {
+            'fingerprints': fingerprints,
+            'packages': [p.descriptor.write() for p in packages],
+        }
+
+        entry_file = self._entry_file(request_key)
+        entry_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = entry_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_file.write_text(json.dumps(entry))
+        tmp_file.replace(entry_file)
+
+    @staticmethod
+    def _is_valid(fingerprints: Dict[str, str], env: "Environment", repo: "Repository") -> bool:
+        return all(repo.fingerprint(package_name, env) == fingerprint
+                   for package_name, fingerprint in fingerprints.items())
@@ -10,7 +10,12 @@ from pkm.utils.types import MeasuredIterable
 
 @dataclass
 class DependencyResolutionMonitoredOp(MonitoredOperation):
-    ...
+    # propagation counters, updated by the solver while the operation is running
+    incompatibilities_visited: int = 0  # incompatibilities visited due to a change in one of their watched terms
+    incompatibilities_checked: int = 0  # incompatibilities that required a full satisfaction check
+    watches_moved: int = 0  # times a watch was moved from a satisfied term into an unsatisfied one
+    derivations: int = 0  # assignments derived by unit propagation
+    conflicts: int = 0  # fully satisfied incompatibilities that entered conflict resolution
 
 
 @dataclass
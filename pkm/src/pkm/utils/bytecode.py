@@ -0,0 +1,48 @@
+import compileall
+import importlib.util
+import threading
+import warnings
+from contextlib import contextmanager
+from typing import List, Sequence, ContextManager
+
+_deferred_compilation = threading.local()
+
+
+def compile_sources(sources: Sequence[str], optimization_levels: Sequence[int] = (0,)) -> List[str]:
+    """
+    compile the given python source files into bytecode (pyc) files, placed in their `__pycache__` directories
+    :param sources: paths to the source files to compile
+    :param optimization_levels: the optimization levels to compile each source with (see `compileall.compile_file`),
+        -1 means the optimization level of the running interpreter
+    :return: paths to the created bytecode files (sources that failed to compile are skipped)
+    """
+    result: List[str] = []
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore')
+        for source in sources:
+            for level in optimization_levels:
+                if compileall.compile_file(source, force=True, quiet=2, optimize=level):
+                    result.append(importlib.util.cache_from_source(
+                        source, optimization=None if level < 0 else (level or '')))
+    return result
+
+
+@contextmanager
+def deferred_compilation() -> ContextManager[None]:
+    """
+    marks the installations performed by the current thread, inside this context, as ones whose bytecode is compiled
+    later on, in a separate (batched) compilation phase
+    """
+    outer = is_compilation_deferred()
+    _deferred_compilation.active = True
+    try:
+        yield
+    finally:
+        _deferred_compilation.active = outer
+
+
+def is_compilation_deferred() -> bool:
+    """
+    :return: True if the current thread is inside a `deferred_compilation` context
+    """
+    return getattr(_deferred_compilation, 'active', False)
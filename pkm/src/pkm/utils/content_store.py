@@ -0,0 +1,137 @@
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+from typing import Optional, Callable, Dict
+
+_FICLONE: Optional[int] = None
+if sys.platform.startswith('linux'):
+    import fcntl
+
+    _FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+
+def _reflink(source: Path, target: Path) -> bool:
+    if _FICLONE is None:
+        return False
+
+    try:
+        with source.open('rb') as source_fd, target.open('wb') as target_fd:
+            fcntl.ioctl(target_fd.fileno(), _FICLONE, source_fd.fileno())
+        return True
+    except OSError:
+        target.unlink(missing_ok=True)
+        return False
+
+
+def _hardlink(source: Path, target: Path) -> bool:
+    try:
+        os.link(source, target)
+        return True
+    except OSError:
+        return False
+
+
+def _copy(source: Path, target: Path) -> bool:
+    shutil.copyfile(source, target)
+    return True
+
+
+_LINKERS: Dict[str, Callable[[Path, Path], bool]] = {'reflink': _reflink, 'hardlink': _hardlink, 'copy': _copy}
+_LINK_MODES = {
+    'auto': ('reflink', 'hardlink', 'copy'),
+    'reflink': ('reflink', 'copy'),
+    'hardlink': ('hardlink', 'copy'),
+    'copy': ('copy',)}
+
+
+class ContentStore:
+    """
+    a content addressed store of files, keyed by the (hex encoded) sha256 of their content.
+
+    files are materialized from the store as reflinks (copy-on-write clones, where supported by the file system),
+    hardlinks or plain copies, in the order of preference defined by the store's `link_mode`.
+    the store does not keep an explicit references table, hardlinks are its references: an object whose link count
+    dropped to 1 is not used by any installation and will be removed by `collect_garbage`
+    (reflinked and copied files do not share their storage with the object, so they do not reference it)
+    """
+
+    def __init__(self, workspace: Path, link_mode: str = "auto"):
+        if link_mode not in _LINK_MODES:
+            raise ValueError(f"unknown link mode: {link_mode}, expecting one of: {', '.join(_LINK_MODES)}")
+
+        self.workspace = workspace
+        self._linkers = [_LINKERS[it] for it in _LINK_MODES[link_mode]]
+
+    def object_path(self, sha256: str) -> Path:
+        """
+        :param sha256: the hex encoded sha256 of the content
+        :return: the path in which the object with the given content hash is (or would be) stored
+        """
+        return self.workspace / sha256[:2] / sha256[2:]
+
+    def contains(self, sha256: str) -> bool:
+        return self.object_path(sha256).exists()
+
+    def materialize(self, sha256: str, target: Path) -> bool:
+        """
+        create the file at `target` (which must not exist) with the content of the object with the given hash
+        :param sha256: the hex encoded sha256 of the content
+        :param target: the path of the file to create
+        :return: True if the file was created, False if the object is not in the store
+        """
+        source = self.object_path(sha256)
+        try:
+            return self._link(source, target)
+        except FileNotFoundError:
+            return False
+
+    def insert(self, sha256: str, source: Path):
+        """
+        add the content of the file at `source` into the store (if the store does not contain it already),
+        the caller is responsible for the given `sha256` to match the content of the file
+        :param sha256: the hex encoded sha256 of the content
+        :param source: the file to add
+        """
+        if (object_path := self.object_path(sha256)).exists():
+            return
+
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = object_path.with_name(f".{object_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self._link(source, temp_path)
+            os.replace(temp_path, object_path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+    def collect_garbage(self) -> int:
+        """
+        remove the objects that are not referenced (hardlinked) by any installation
+        :return: the number of bytes freed
+        """
+        freed = 0
+        if not self.workspace.exists():
+            return freed
+
+        for prefix_dir in self.workspace.iterdir():
+            if not prefix_dir.is_dir():
+                continue
+
+            for object_path in prefix_dir.iterdir():
+                if object_path.name.startswith('.'):
+                    continue  # in-progress insertion
+                if (st := object_path.stat()).st_nlink <= 1:
+                    object_path.unlink(missing_ok=True)
+                    freed += st.st_size
+
+            if next(prefix_dir.iterdir(), None) is None:
+                prefix_dir.rmdir()
+
+        return freed
+
+    def _link(self, source: Path, target: Path) -> bool:
+        if not source.exists():
+            raise FileNotFoundError(source)
+
+        return any(linker(source, target) for linker in self._linkers)
@@ -48,6 +48,10 @@ def delegate_all(*reqs: Tuple[Type[_T], str]) -> Callable[[Type[_U]], Type[Union
             if attr_m := method_to_attr.get(method):
 
                 def _create(attr, method): # noqa
+                    if isinstance(getattr(cls, method, None), property):
+                        new_dict[method] = property(lambda self: getattr(getattr(self, attr), method))
+                        return
+
                     def do_delegation(self, *args, **kwargs):
                         return getattr(getattr(self, attr), method)(*args, **kwargs)
 
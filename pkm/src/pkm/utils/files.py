@@ -5,7 +5,7 @@ import shutil
 from contextlib import contextmanager
 from pathlib import Path
 from tempfile import mkdtemp
-from typing import Optional, Callable, ContextManager, Iterator, List, Set
+from typing import Optional, Callable, ContextManager, Iterator, List, Set, BinaryIO
 
 from pkm.utils.commons import UnsupportedOperationException
 
@@ -51,6 +51,12 @@ def path_to(source: Path, destination: Path) -> Path:
     source = source.absolute()
     destination = destination.absolute()
 
+    try:  # common case, `destination` resides in `source`
+        if (relative := destination.relative_to(source)).parts:
+            return relative
+    except ValueError:
+        pass
+
     destination_parents = set(destination.parents)
     p = source
     back = 0
@@ -195,6 +201,30 @@ class CopyTransaction:
 
         self._copied_files.add(target)
 
+    def open_for_write(self, target: Path) -> BinaryIO:
+        """
+        opens the `target` path for (binary) writing as part of this transaction, if the `target` already exists,
+        overwrite it (rollback supported)
+        :param target: the path to open
+        :return: the opened file, the caller is responsible to close it
+        """
+        return self.prepare(target).open('wb')
+
+    def prepare(self, target: Path) -> Path:
+        """
+        prepares the `target` path to be created by the caller as part of this transaction: if the `target` already
+        exists, it is removed (rollback supported) otherwise, its parent directories are created
+        :param target: the path to prepare
+        :return: `target` to be used with chaining
+        """
+        if target.exists():
+            self.rm(target)
+        elif not target.parent.exists():
+            self.mkdir(target.parent)
+
+        self._copied_files.add(target)
+        return target
+
     @property
     def copied_files(self) -> Iterator[Path]:
         """
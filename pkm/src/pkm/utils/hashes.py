@@ -2,7 +2,7 @@ from __future__ import annotations
 import hashlib
 import io
 import re
-from base64 import urlsafe_b64encode
+from base64 import urlsafe_b64encode, urlsafe_b64decode
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Protocol, IO, Union, Iterable, TypeVar, Callable, Mapping
@@ -129,13 +129,31 @@ class HashSignature:
         return type(self).encode_hash(hashd)
 
     def validate_against(self, file: Path) -> bool:
+        hash_computer = self.create_digester()
+        stream(hash_computer, file)
+        return self.validate_digest(hash_computer)
+
+    def create_digester(self) -> HashDigester:
+        """
+        :return: a new hash digester of this signature's hash type, can be used with `validate_digest` to validate
+                 content that is streamed (e.g., while it is being written)
+        """
         if not hasattr(hashlib, self.hash_type):
             raise KeyError(f"Cannot validate archive, Unsupported Hash {self.hash_type}")
+        return getattr(hashlib, self.hash_type)()
 
-        hash_computer = getattr(hashlib, self.hash_type)()
-        stream(hash_computer, file)
-        computed_hash = self._encode_hash(hash_computer)
-        return computed_hash == self.hash_value
+    def validate_digest(self, hashd: HashDigester) -> bool:
+        """
+        :param hashd: a digester (see `create_digester`) that was updated with the content to validate
+        :return: True if the digested content matches this signature
+        """
+        return self._encode_hash(hashd) == self.hash_value
+
+    def hex_value(self) -> str:
+        """
+        :return: the hash value of this signature, hex encoded (regardless of the encoding of this signature)
+        """
+        return self.hash_value
 
     def __str__(self):
         return f"{self.hash_type}={self.hash_value}"
@@ -191,3 +209,6 @@ class _UrlsafeBase64NopadHashSignature(HashSignature):
     @classmethod
     def encode_hash(cls, hashd: HashDigester):
         return urlsafe_b64encode(hashd.digest()).decode("latin1").rstrip("=")
+
+    def hex_value(self) -> str:
+        return urlsafe_b64decode(self.hash_value + '=' * (-len(self.hash_value) % 4)).hex()
@@ -0,0 +1,271 @@
+import asyncio
+import os
+import ssl
+import threading
+import zlib
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from email.parser import Parser
+from http.client import HTTPMessage
+from typing import Dict, Optional, Callable, BinaryIO, Deque, Tuple, Coroutine, Any
+from urllib.parse import urljoin
+
+from pkm.utils.commons import Closeable
+from pkm.utils.http.http_client import Url
+
+_READ_CHUNK_SIZE = 256 * 1024
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+_Stream = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+@dataclass
+class AsyncResponse:
+    url: str
+    status: int
+    reason: str
+    headers: HTTPMessage
+
+
+class AsyncHttpEngine(Closeable):
+    """
+    asyncio based http/1.1 download engine, the engine runs its own event loop in a (single) background thread, so that
+    any number of concurrent downloads can be in flight without dedicating a thread to each of them.
+    the number of concurrently open connections is limited both globally and per host, and idle connections are kept
+    in a shared pool for reuse.
+    """
+
+    def __init__(self, max_connections: int = 16, max_connections_per_host: int = 8, connect_timeout: float = 10):
+        """
+        :param max_connections: the maximal number of concurrent requests (across all hosts)
+        :param max_connections_per_host: the maximal number of concurrent requests to a single host
+        :param connect_timeout: timeout (in seconds) for establishing a new connection and for each read operation
+        """
+        self.max_connections = max(1, max_connections)
+        self.max_connections_per_host = max(1, min(max_connections_per_host, self.max_connections))
+        self._timeout = connect_timeout
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._owner_pid: Optional[int] = None
+        self._global_limit: Optional[asyncio.Semaphore] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._idle: Dict[str, Deque[_Stream]] = defaultdict(deque)
+        self._ssl_context: Optional[ssl.SSLContext] = None
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # the engine may be inherited by a forked process, in which case its loop thread does not exist there
+            if self._loop is None or self._owner_pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="pkm-http-engine", daemon=True).start()
+
+                self._loop, self._owner_pid = loop, os.getpid()
+                self._global_limit = None
+                self._host_limits.clear()
+                self._idle.clear()
+
+            return self._loop
+
+    def submit(self, coroutine: Coroutine[Any, Any, Any]) -> Future:
+        """
+        run the given coroutine inside the engine event loop
+        :param coroutine: the coroutine to run
+        :return: future that will be completed with the result of the coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._event_loop())
+
+    def download(
+            self, url: str, headers: Dict[str, str],
+            open_sink: Callable[[AsyncResponse], Optional[BinaryIO]], max_redirects: int = 3) -> Future:
+        """
+        perform a get request, streaming the response body into the sink returned by `open_sink`
+        :param url: the url to request
+        :param headers: the request headers
+        :param open_sink: called (in the engine thread) once the final (non redirect) response headers are received,
+                          should return a binary file like object to write the (decoded) response body into or None
+                          to discard the body. the sink is written from a worker thread (sequentially, in order) and
+                          is not closed by the engine.
+        :param max_redirects: the maximal number of redirects to follow
+        :return: future that will be completed with the final `AsyncResponse` once the body was fully written
+        """
+        return self.submit(self.get(url, headers, open_sink, max_redirects))
+
+    async def get(
+            self, url: str, headers: Dict[str, str], open_sink: Callable[[AsyncResponse], Optional[BinaryIO]],
+            max_redirects: int = 3) -> AsyncResponse:
+        """
+        coroutine version of `download`, must be awaited from within the engine event loop (see `submit`)
+        """
+
+        for _ in range(max_redirects + 1):
+            response = await self._request(url, headers, open_sink)
+            if response.status not in _REDIRECT_STATUSES:
+                return response
+
+            if not (location := response.headers.get('location')):
+                raise ConnectionError("server responded with redirect but without supplying a new location")
+            url = urljoin(url, location)
+
+        raise ConnectionError("max redirects reached")
+
+    async def _request(
+            self, url: str, headers: Dict[str, str],
+            open_sink: Callable[[AsyncResponse], Optional[BinaryIO]]) -> AsyncResponse:
+
+        parsed_url = Url.parse(url)
+        host_key = parsed_url.connection_part()
+
+        if self._global_limit is None:
+            self._global_limit = asyncio.Semaphore(self.max_connections)
+        host_limit = self._host_limits.get(host_key)
+        if host_limit is None:
+            host_limit = self._host_limits[host_key] = asyncio.Semaphore(self.max_connections_per_host)
+
+        async with host_limit, self._global_limit:
+            # a pooled connection may have been closed by the server while idle - retry once with a fresh connection
+            for attempt in range(2):
+                reused = bool(self._idle[host_key])
+                reader, writer = await self._acquire(parsed_url, host_key)
+                try:
+                    response, reusable = await self._exchange(parsed_url, headers, reader, writer, open_sink)
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    writer.close()
+                    if reused and attempt == 0 and not getattr(e, 'response_started', False):
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+
+                if reusable:
+                    self._idle[host_key].append((reader, writer))
+                else:
+                    writer.close()
+                return response
+
+    async def _acquire(self, url: Url, host_key: str) -> _Stream:
+        idle = self._idle[host_key]
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+
+        ssl_context = None
+        if url.scheme == 'https':
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            ssl_context = self._ssl_context
+
+        return await asyncio.wait_for(
+            asyncio.open_connection(url.host, url.port, ssl=ssl_context), self._timeout)
+
+    async def _exchange(
+            self, url: Url, headers: Dict[str, str], reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+            open_sink: Callable[[AsyncResponse], Optional[BinaryIO]]) -> Tuple[AsyncResponse, bool]:
+
+        default_port = (url.scheme == 'https' and url.port == 443) or (url.scheme == 'http' and url.port == 80)
+        request_headers = {'host': url.host if default_port else f"{url.host}:{url.port}"}
+        request_headers.update({k.lower(): v for k, v in headers.items()})
+        resource = f"{url.path or '/'}{'?' + url.query_string if url.query_string else ''}"
+
+        request = f"GET {resource} HTTP/1.1\r\n" + ''.join(f"{k}: {v}\r\n" for k, v in request_headers.items())
+        writer.write(f"{request}\r\n".encode('latin-1'))
+        await writer.drain()
+
+        status_line = (await self._read(reader.readline())).decode('latin-1')
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+
+        version, status, reason = (status_line.strip().split(' ', 2) + [''])[:3]
+        header_lines = []
+        while (line := await self._read(reader.readline())) not in (b'\r\n', b'\n', b''):
+            header_lines.append(line.decode('latin-1'))
+        response_headers: HTTPMessage = Parser(_class=HTTPMessage).parsestr(''.join(header_lines))
+        response = AsyncResponse(str(url), int(status), reason, response_headers)
+
+        sink = None if response.status in _REDIRECT_STATUSES else open_sink(response)
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) \
+            if response_headers.get('content-encoding') == 'gzip' else None
+
+        # writing into the sink (and whatever it does with the data, e.g., hashing) is done in a worker thread so that
+        # a large download or a slow disk does not stall the other transfers, one write is kept in flight (in order)
+        # while the next chunk is read from the connection
+        loop = asyncio.get_running_loop()
+        pending_write: Optional[asyncio.Future] = None
+
+        async def write(data: bytes, flush: bool = False):
+            nonlocal pending_write
+            if sink is not None:
+                if pending_write is not None:
+                    await pending_write
+                pending_write = loop.run_in_executor(None, _write_to_sink, sink, decoder, data, flush)
+
+        reusable = version == 'HTTP/1.1' and response_headers.get('connection', '').lower() != 'close'
+        try:
+            if response.status in (204, 304) or 100 <= response.status < 200:
+                pass
+            elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+                while chunk_size := int((await self._read(reader.readline())).split(b';')[0].strip() or b'0', 16):
+                    while chunk_size > 0:
+                        data = await self._read(reader.read(min(chunk_size, _READ_CHUNK_SIZE)))
+                        if not data:
+                            raise asyncio.IncompleteReadError(b'', chunk_size)
+                        await write(data)
+                        chunk_size -= len(data)
+                    await self._read(reader.readline())
+                while await self._read(reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass  # trailers
+            elif (content_length := response_headers.get('content-length')) is not None:
+                remaining = int(content_length)
+                while remaining > 0:
+                    data = await self._read(reader.read(min(remaining, _READ_CHUNK_SIZE)))
+                    if not data:
+                        raise asyncio.IncompleteReadError(b'', remaining)
+                    await write(data)
+                    remaining -= len(data)
+            else:
+                reusable = False
+                while data := await self._read(reader.read(_READ_CHUNK_SIZE)):
+                    await write(data)
+
+            if decoder is not None:
+                await write(b'', flush=True)
+            if pending_write is not None:
+                await pending_write
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            e.response_started = True
+            raise
+        finally:
+            # the sink may be closed by the caller once the response is done, wait for the write that is still running
+            if pending_write is not None and not pending_write.done():
+                await asyncio.wait({pending_write})
+
+        return response, reusable
+
+    async def _read(self, operation: Coroutine[Any, Any, bytes]) -> bytes:
+        return await asyncio.wait_for(operation, self._timeout)
+
+    def close(self):
+        with self._lock:
+            if (loop := self._loop) is None or self._owner_pid != os.getpid():
+                return
+
+            def _close_all():
+                for idle in self._idle.values():
+                    for _, writer in idle:
+                        writer.close()
+                self._idle.clear()
+                loop.stop()
+
+            loop.call_soon_threadsafe(_close_all)
+            self._loop = None
+
+
+def _write_to_sink(sink: BinaryIO, decoder: Optional[Any], data: bytes, flush: bool):
+    if decoder is not None:
+        data = decoder.decompress(data) + decoder.flush() if flush else decoder.decompress(data)
+    if data:
+        sink.write(data)
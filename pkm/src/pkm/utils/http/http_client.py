@@ -1,20 +1,25 @@
+import asyncio
 import email.utils as eu
 import hashlib
 import json
+import os
 import shutil
 import socket
 from collections import deque
+from concurrent.futures import Future
 from contextlib import contextmanager
 from dataclasses import dataclass, replace
 from datetime import datetime
 from datetime import timezone
 from gzip import GzipFile
-from http.client import HTTPSConnection, HTTPConnection, HTTPResponse
+from http.client import HTTPSConnection, HTTPConnection, HTTPResponse, HTTPMessage
 from pathlib import Path
 from socket import AddressFamily
 from threading import Lock
-from typing import Deque, Dict, Type, Optional, cast, Any, ContextManager, IO, Union, Iterable
+from typing import Deque, Dict, Type, Optional, cast, Any, ContextManager, IO, Union, Iterable, Pattern, \
+    BinaryIO, TYPE_CHECKING, Tuple
 from urllib.parse import urlsplit
+from zipfile import ZipFile
 
 from pkm.config.configclass import ConfigFile, config, config_field
 from pkm.config.configfiles import TomlConfigIO
@@ -26,8 +31,15 @@ from pkm.utils.http.http_monitors import FetchResourceMonitoredOp, FetchResource
 from pkm.utils.promises import Promise, Deferred
 from pkm.utils.properties import clear_cached_properties, cached_property
 
+if TYPE_CHECKING:
+    from pkm.utils.http.async_engine import AsyncHttpEngine, AsyncResponse
+
 HTTPConnection.debuglevel = 0
 
+_LAZY_ZIP_TAIL_SIZE = 16 * 1024
+_STREAM_BUFFER_SIZE = 1024 * 1024
+_MAX_BACKOFF_SECONDS = 30.0
+
 # this sad hack is made because for some reason,
 # many services still has problem with ipv6 (like cloudfront occasionally have)
 # and some are just slower to accept connections (like pypi)
@@ -46,7 +58,7 @@ socket.getaddrinfo = get_addr_info_prefer_ipv4
 
 class HttpException(IOError):
 
-    def __init__(self, msg: str, response: Optional[HTTPResponse] = None) -> None:
+    def __init__(self, msg: str, response: Union[HTTPResponse, "AsyncResponse", None] = None) -> None:
         super().__init__(msg)
         self.response = response
 
@@ -187,6 +199,7 @@ class _ConnectionPool(Closeable):
 class FetchInfoConfig(ConfigFile):
     etag: str = None
     fetch_time: str = config_field(key="fetch-time")
+    content_type: str = config_field(key="content-type")
     hash: Dict[str, str] = config_field(default_factory=dict)
     other_fields = config_field(leftover=True)
 
@@ -197,9 +210,24 @@ class FetchedResource:
     data: Path
     _root: Path
 
+    @property
+    def partial(self) -> Path:
+        """
+        :return: the file that the data of this resource is downloaded into before it is complete
+        """
+        return self.data.with_name(f"{self.data.name}.partial")
+
+    @property
+    def partial_info(self) -> Path:
+        """
+        :return: the file that stores the information required for resuming the download of the `partial` file
+        """
+        return self.data.with_name(f"{self.data.name}.partial.toml")
+
     def delete(self):
         self.fetch_info.unlink(missing_ok=True)
         self.data.unlink(missing_ok=True)
+        self.discard_partial()
 
         p = self.fetch_info.parent
         while p != self._root:
@@ -223,6 +251,12 @@ class FetchedResource:
         return FetchInfoConfig.load(self.fetch_info)
 
     def is_hash_valid(self, hash_function: str, hash_hex_value: str):
+        """
+        :param hash_function: the name of the hash function (as accepted by `hashlib.new`)
+        :param hash_hex_value: the expected hex digest of the resource data
+        :return: True if the data of this resource matches the expected digest, digests that were computed while the
+                 resource was downloaded are used as is, the data is only read (once) for digests that were not
+        """
 
         fetch_info = self.fetch_info_data
         fetch_hash = fetch_info.hash.get(hash_function)
@@ -230,10 +264,7 @@ class FetchedResource:
         if not fetch_hash:
             hash_ = hashlib.new(hash_function)
             with open(self.data, 'rb') as f:
-                while True:
-                    next_ = f.read(8192)
-                    if not next_:
-                        break
+                while next_ := f.read(_STREAM_BUFFER_SIZE):
                     hash_.update(next_)
 
             fetch_hash = hash_.hexdigest()
@@ -242,30 +273,39 @@ class FetchedResource:
 
         return fetch_hash == hash_hex_value
 
-    def save(self, response: HTTPResponse):
-        self.data.parent.mkdir(exist_ok=True, parents=True)
-        if self.fetch_info.exists():
-            self.fetch_info.unlink()
-
-        try:
-            with open(self.data, 'wb') as df:
-                shutil.copyfileobj(response, df)
+    def discard_partial(self):
+        """
+        delete the partially downloaded data of this resource (if exists)
+        """
+        self.partial.unlink(missing_ok=True)
+        self.partial_info.unlink(missing_ok=True)
+
+    def commit_partial(self, response_headers: HTTPMessage, hashes: Optional[Dict[str, str]] = None):
+        """
+        make the (completely downloaded) partial data file the data of this resource
+        :param response_headers: the headers of the response that the data was received with
+        :param hashes: hash function name -> hex digest of the data, that were computed while downloading it
+        """
+        self.fetch_info.unlink(missing_ok=True)
+        self.partial.replace(self.data)
+        self.partial_info.unlink(missing_ok=True)
+        self._write_fetch_info(response_headers, hashes)
 
-            rheaders = response.headers
-            last_modified = rheaders.get('last-modified', rheaders.get('date'))
+    def _write_fetch_info(self, response_headers: HTTPMessage, hashes: Optional[Dict[str, str]] = None):
+        rheaders = response_headers
+        last_modified = rheaders.get('last-modified', rheaders.get('date'))
 
-            # noinspection PyPropertyAccess
-            fetch_info = self.fetch_info_data = FetchInfoConfig()
-            fetch_info.path = self.fetch_info
+        # noinspection PyPropertyAccess
+        fetch_info = self.fetch_info_data = FetchInfoConfig()
+        fetch_info.path = self.fetch_info
 
-            # fetch_info.fetch_time = last_modified or datetime.utcnow().strftime(TF_HTTP)
-            fetch_info.fetch_time = last_modified or eu.format_datetime(datetime.now().astimezone(timezone.utc), True)
-            fetch_info.etag = rheaders.get("etag") or ''
+        # fetch_info.fetch_time = last_modified or datetime.utcnow().strftime(TF_HTTP)
+        fetch_info.fetch_time = last_modified or eu.format_datetime(datetime.now().astimezone(timezone.utc), True)
+        fetch_info.etag = rheaders.get("etag") or ''
+        fetch_info.content_type = rheaders.get("content-type")
+        fetch_info.hash.update(hashes or {})
 
-            fetch_info.save()
-        except:  # noqa
-            self.delete()
-            raise
+        fetch_info.save()
 
 
 class _GzipResponseWrapper:
@@ -283,24 +323,234 @@ class _GzipResponseWrapper:
         return getattr(self._response, item)
 
 
+class _ResumableDownload:
+    """
+    downloads a resource into its partial file (see `FetchedResource.partial`), the download is resumed (using range
+    requests, validated with if-range) after mid-stream failures, retried with exponential backoff on server errors
+    (5xx and 429) and the data is hashed (sha256 and any of the expected hashes) while it is written so that it can be
+    verified without reading it again
+    """
+
+    def __init__(self, engine: "AsyncHttpEngine", url: str, headers: Dict[str, str], resource: FetchedResource,
+                 hashes: Optional[Dict[str, str]], mop: FetchResourceMonitoredOp, max_redirects: int,
+                 max_retries: int, backoff_base: float):
+        self._engine = engine
+        self._url = url
+        self._headers = headers
+        self._resource = resource
+        self._hashes = hashes or {}
+        self._expected_hash = _preferred_hash(hashes)
+        self._mop = mop
+        self._max_redirects = max_redirects
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+
+        self._hasher = _StreamHasher(self._hashes.keys())
+        self._offset = 0
+        self._validator: Optional[str] = None
+        self._fd: Optional[BinaryIO] = None
+        self._download_started = False
+        self._range_mismatch = False
+
+    def _reset(self, discard_partial: bool = True):
+        if discard_partial:
+            self._resource.discard_partial()
+        self._offset, self._validator = 0, None
+        self._hasher = _StreamHasher(self._hashes.keys())
+
+    def _load_partial(self):
+        self._reset(discard_partial=False)
+        resource = self._resource
+        if resource.partial.exists() and resource.partial_info.exists():
+            partial_info = FetchInfoConfig.load(resource.partial_info)
+            if validator := partial_info.etag or partial_info.fetch_time:
+                # the data that was downloaded in a previous run must be hashed once to continue the hashing
+                with resource.partial.open('rb') as partial_fd:
+                    while chunk := partial_fd.read(_STREAM_BUFFER_SIZE):
+                        self._hasher.update(chunk)
+                        self._offset += len(chunk)
+                self._validator = validator
+
+        if not self._offset or not self._validator:
+            self._reset()  # nothing to resume from
+
+    def _open_sink(self, response: "AsyncResponse") -> Optional[BinaryIO]:
+        if response.status not in (200, 206):
+            return None
+
+        resource = self._resource
+        if response.status == 206 and not _content_range_starts_at(response.headers, self._offset):
+            self._range_mismatch = True
+            return None
+
+        if response.status == 200 or not self._offset:
+            self._reset()
+            resource.partial.parent.mkdir(parents=True, exist_ok=True)
+
+            # ranges refer to the encoded content so only unencoded responses can be resumed
+            rheaders = response.headers
+            if 'bytes' in rheaders.get('accept-ranges', '') and not rheaders.get('content-encoding'):
+                if validator := rheaders.get('etag') or rheaders.get('last-modified'):
+                    partial_info = FetchInfoConfig()
+                    partial_info.etag = rheaders.get('etag')
+                    partial_info.fetch_time = rheaders.get('last-modified')
+                    partial_info.path = resource.partial_info
+                    partial_info.save()
+                    self._validator = validator
+
+        if not self._download_started:
+            self._download_started = True
+            clength = int(response.headers.get('content-length', '-1'))
+            self._mop.notify(FetchResourceDownloadStartEvent(
+                clength + self._offset if clength >= 0 else clength, resource.partial))
+
+        self._fd = resource.partial.open('ab' if self._offset else 'wb')
+        return cast(BinaryIO, self)
+
+    def write(self, data: bytes):
+        self._fd.write(data)
+        self._hasher.update(data)
+        self._offset += len(data)
+
+    def _close_sink(self):
+        if self._fd:
+            self._fd.close()
+            self._fd = None
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), _MAX_BACKOFF_SECONDS)
+        return min(self._backoff_base * (2 ** (attempt - 1)), _MAX_BACKOFF_SECONDS)
+
+    async def run(self) -> "AsyncResponse":
+        """
+        :return: the final response received for the download, if it is successful (200/206), the downloaded data
+                 was already verified and committed into the resource data file.
+        """
+        self._load_partial()
+        attempt = 0
+        while True:
+            headers = dict(self._headers)
+            resuming = bool(self._offset and self._validator)
+            if resuming:
+                headers['range'] = f"bytes={self._offset}-"
+                headers['if-range'] = self._validator
+            elif self._offset:
+                self._reset()
+
+            try:
+                response = await self._engine.get(self._url, headers, self._open_sink, self._max_redirects)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                attempt += 1
+                if attempt > self._max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            finally:
+                self._close_sink()
+
+            status = response.status
+            if self._range_mismatch or status == 429 or 500 <= status < 600 or status == 416:
+                attempt += 1
+                range_mismatch, self._range_mismatch = self._range_mismatch, False
+                if status == 416 or range_mismatch:
+                    self._reset()  # the partial data does not match the resource anymore
+                if attempt > self._max_retries:
+                    if range_mismatch:
+                        raise HttpException(f"could not resume the download of {self._url}", response)
+                    return response
+                await asyncio.sleep(self._backoff(attempt, response.headers.get('retry-after')))
+                continue
+
+            if status in (200, 206):
+                if self._expected_hash:
+                    hash_function, hash_value = self._expected_hash
+                    if self._hasher.hexdigest(hash_function) != hash_value:
+                        self._reset()
+                        if resuming and attempt < self._max_retries:
+                            attempt += 1
+                            continue  # the data may have been corrupted while resuming, retry from scratch
+                        raise HttpException(f"invalid hash for resource downloaded from {self._url}", response)
+
+                self._resource.commit_partial(response.headers, self._hasher.hexdigests())
+
+            return response
+
+
+class _StreamHasher:
+    """
+    computes the digests of streamed data (sha256 and any other of the requested, available, hash functions)
+    while it is written, so that the data does not have to be read again in order to verify it
+    """
+
+    def __init__(self, hash_functions: Iterable[str] = ()):
+        self._hashers = {
+            name: hashlib.new(name)
+            for name in dict.fromkeys(('sha256', *hash_functions))
+            if name in hashlib.algorithms_available}
+
+    def update(self, data: bytes):
+        for hasher in self._hashers.values():
+            hasher.update(data)
+
+    def hexdigest(self, hash_function: str) -> str:
+        return self._hashers[hash_function].hexdigest()
+
+    def hexdigests(self) -> Dict[str, str]:
+        """
+        :return: hash function name -> hex digest of the data that was streamed so far
+        """
+        return {name: hasher.hexdigest() for name, hasher in self._hashers.items()}
+
+
+def _content_range_starts_at(headers: HTTPMessage, offset: int) -> bool:
+    # content-range: bytes <first>-<last>/<total>
+    content_range = headers.get('content-range', '')
+    unit, _, byte_range = content_range.partition(' ')
+    first = byte_range.partition('-')[0]
+    return unit.strip() == 'bytes' and first.isdigit() and int(first) == offset
+
+
+def _preferred_hash(hashes: Optional[Dict[str, str]]) -> Optional[Tuple[str, str]]:
+    if not hashes:
+        return None
+
+    for hash_function in ('sha256', *hashes.keys()):
+        if hash_function in hashes and hash_function in hashlib.algorithms_available:
+            return hash_function, hashes[hash_function]
+    return None
+
+
 def _add_standard_headers(headers: Dict[str, str]):
     headers['user-agent'] = f'pkm'
-    headers['accept-encoding'] = 'gzip'
+    headers.setdefault('accept-encoding', 'gzip')
     headers['connection'] = 'keep-alive'
 
 
 class HttpClient:
 
-    def __init__(self, workspace: Path, max_redirects: int = 3, max_connection_retries: int = 2):
+    def __init__(self, workspace: Path, max_redirects: int = 3, max_connection_retries: int = 2,
+                 max_connections: int = 16, max_connections_per_host: int = 8, max_download_retries: int = 5,
+                 backoff_base: float = 0.5):
         self.workspace = workspace
         workspace.mkdir(exist_ok=True, parents=True)
 
+        self._max_download_retries = max_download_retries
+        self._backoff_base = backoff_base
+
         self._pool = _ConnectionPool()
+        self._max_connections = max_connections
+        self._max_connections_per_host = max_connections_per_host
         self._fetch_inprogress: Dict[str, Promise[FetchedResource]] = {}
         self._fetch_lock = Lock()
         self._max_redirects = max_redirects
         self._max_connection_retries = max_connection_retries
 
+    @cached_property
+    def _engine(self) -> "AsyncHttpEngine":
+        from pkm.utils.http.async_engine import AsyncHttpEngine
+        return AsyncHttpEngine(self._max_connections, self._max_connections_per_host)
+
     def _resource_files_of(self, url: Url) -> FetchedResource:
         url_hash = hashlib.md5(str(url).encode('ascii')).hexdigest()
         url_path = Path(url.path.lstrip('/'))
@@ -380,84 +630,197 @@ class HttpClient:
         with self._request("GET", url, headers, max_redirects=max_redirects) as response:
             yield response
 
+    @contextmanager
+    def head(self, url: str, headers: Optional[Dict[str, str]] = None, *,
+             max_redirects: int = -1) -> ContextManager[HTTPResponse]:
+
+        headers = headers or {}
+        url = Url.parse(url)
+        _add_standard_headers(headers)
+
+        with self._request("HEAD", url, headers, max_redirects=max_redirects) as response:
+            yield response
+
+    def fetch_zip_member(
+            self, url: str, member: Pattern[str], resource_name: Optional[str] = None) -> Optional[Path]:
+        """
+        fetch a single member of a remote zip file (e.g., the metadata file of a wheel) without downloading the whole
+        zip. if the zip itself was already fetched, the member is read from it, otherwise, http range requests are used
+        to read only the zip central directory and the requested member.
+
+        :param url: the url of the zip file
+        :param member: pattern that matches (fully) the name of the member to fetch, the first matching member is used
+        :param resource_name: human readable name of the resource, used for monitoring
+        :return: path to the content of the fetched member or None if no matching member exists in the zip,
+                 raises `RangeRequestsNotSupported` if the zip is not cached and the server does not support range
+                 requests
+        """
+
+        from pkm.utils.http.lazy_zip import LazyRemoteFile, RangeRequestsNotSupported
+
+        parsed_url = Url.parse(url)
+        resource_name = resource_name or parsed_url.path.split("/")[-1]
+        zip_files = self._resource_files_of(parsed_url)
+        member_hash = hashlib.md5(member.pattern.encode()).hexdigest()
+        member_file = zip_files.data.with_name(f"{zip_files.data.name}.{member_hash}.member")
+
+        with FetchResourceMonitoredOp(resource_name, url) as mop:
+            if member_file.exists():
+                mop.notify(FetchResourceCacheHitEvent())
+                return member_file
+
+            if zip_files.exists():
+                mop.notify(FetchResourceCacheHitEvent())
+                zip_source = zip_files.data
+            else:
+                # servers may compress responses, in which case the ranges will refer to the compressed content
+                range_headers = {'accept-encoding': 'identity'}
+                with self.head(url, dict(range_headers)) as response:
+                    content_length = int(response.headers.get('content-length', '-1'))
+                    if response.status != 200 or content_length < 0 \
+                            or 'bytes' not in response.headers.get('accept-ranges', ''):
+                        raise RangeRequestsNotSupported(f"range requests are not supported for {url}", response)
+
+                def read_range(start: int, end: int) -> bytes:
+                    with self.get(url, {**range_headers, 'range': f"bytes={start}-{end - 1}"}) as range_response:
+                        data = range_response.read()
+                        if range_response.status != 206:
+                            raise RangeRequestsNotSupported(
+                                f"server responded with {range_response.status} to a range request for {url}",
+                                range_response)
+                        return data
+
+                zip_source = LazyRemoteFile(content_length, read_range)
+                # the central directory and the dist-info files of wheels are usually at the end of the archive
+                zip_source.prefetch(content_length - _LAZY_ZIP_TAIL_SIZE, content_length)
+
+            with ZipFile(zip_source) as zipf:
+                if not (name := next((n for n in zipf.namelist() if member.fullmatch(n)), None)):
+                    return None
+
+                info = zipf.getinfo(name)
+                mop.notify(FetchResourceDownloadStartEvent(info.file_size, member_file))
+                tmp_file = member_file.with_name(f"{member_file.name}.{os.getpid()}.tmp")
+                tmp_file.parent.mkdir(parents=True, exist_ok=True)
+                with zipf.open(info) as member_fd, tmp_file.open('wb') as tmp_fd:
+                    shutil.copyfileobj(member_fd, tmp_fd)
+                tmp_file.replace(member_file)
+
+            return member_file
+
+    def cached_resource(self, url: str) -> Optional[FetchedResource]:
+        """
+        :param url: the url of the resource to look for
+        :return: the resource that was previously fetched from the given `url` if it exists in the cache,
+                 this method never access the network
+        """
+        resource = self._resource_files_of(Url.parse(url))
+        return resource if resource.exists() else None
+
     def fetch_resource(
             self, url: str, cache: Optional[CacheDirective] = None,
-            resource_name: Optional[str] = None) -> Optional[FetchedResource]:
+            resource_name: Optional[str] = None, headers: Optional[Dict[str, str]] = None,
+            hashes: Optional[Dict[str, str]] = None) -> Optional[FetchedResource]:
+        """
+        fetch the resource at the given `url` into the local cache.
+        the resource is downloaded into a partial file which is resumed after mid-stream failures and server errors
+        (5xx and 429) are retried with exponential backoff.
+        :param url: the url of the resource to fetch
+        :param cache: cache directive that decides if a cached version of the resource can be used
+        :param resource_name: human readable name of the resource, used for monitoring
+        :param headers: additional request headers (e.g., for content negotiation), note that the resource is cached
+                        by its url, so the same headers should be used whenever fetching a specific url
+        :param hashes: the expected hashes of the resource (hash function name -> hex digest), if given, a downloaded
+                       resource is verified (while it is being downloaded) against one of them (sha256 if available).
+                       the digests of all the given hash functions (and sha256) are computed during the download and
+                       stored with the resource so that `FetchedResource.is_hash_valid` does not read it again
+        :return: the fetched resource
+        """
+        return self.fetch_resource_async(url, cache, resource_name, headers, hashes).result()
+
+    def fetch_resource_async(
+            self, url: str, cache: Optional[CacheDirective] = None,
+            resource_name: Optional[str] = None, headers: Optional[Dict[str, str]] = None,
+            hashes: Optional[Dict[str, str]] = None) -> Promise[FetchedResource]:
+        """
+        same as `fetch_resource` but returns immediately, the download itself is performed by the http engine, which
+        does not occupy a thread per download and respects the configured (global and per host) connection limits
+        :param url: the url of the resource to fetch
+        :param cache: cache directive that decides if a cached version of the resource can be used
+        :param resource_name: human readable name of the resource, used for monitoring
+        :param headers: additional request headers (see `fetch_resource`)
+        :param hashes: the expected hashes of the resource (see `fetch_resource`)
+        :return: promise for the fetched resource
+        """
 
         parsed_url = Url.parse(url)
         resource_name = resource_name or parsed_url.path.split("/")[-1]
+        cache = cache or CacheDirective.allways()
+        mop = FetchResourceMonitoredOp(resource_name, url)
 
-        with FetchResourceMonitoredOp(resource_name, url) as mop:
-            if not cache:
-                cache = CacheDirective.allways()
+        with self._fetch_lock:
+            # If I am already requesting this url - no need to actually do it twice, note that
+            # this may pose a problem if one of the recipients will delete the files, if it revealed to be a problem
+            # we can fix it by adding a ref-counting delete operation for the FetchedResource for example
+            if inprogress := self._fetch_inprogress.get(url):
+                def notify_cache_hit(promise_: Promise[FetchedResource]) -> FetchedResource:
+                    mop.notify(FetchResourceCacheHitEvent())
+                    return promise_.result(False)
 
-            cached = True
-            with self._fetch_lock:
+                return mop.with_async(inprogress.when_completed(notify_cache_hit))
 
-                # If I am already requesting this url - no need to actually do it twice, note that
-                # this may pose a problem if one of the recipients will delete the files, if it revealed to be a problem
-                # we can fix it by adding a ref-counting delete operation for the FetchedResource for example
-                promise = self._fetch_inprogress.get(url)
+            deferred: Deferred[FetchedResource] = Deferred()
+            self._fetch_inprogress[url] = deferred.promise()
 
-                if not promise:
-                    cached = False
+        result = mop.with_async(deferred.promise())
 
-                    def _fetch() -> Optional[FetchedResource]:
-                        headers = {}
-                        cache_files = self._resource_files_of(parsed_url)
-                        fetch_info = FetchInfoConfig.load(
-                            cache_files.fetch_info)  # TODO: maybe add the response headers
-                        _add_standard_headers(headers)
+        def complete(resource: Optional[FetchedResource] = None, error: Optional[BaseException] = None):
+            with self._fetch_lock:
+                del self._fetch_inprogress[url]
 
-                        use_cached_data = cache_files.exists() and cache.is_cache_valid(fetch_info)
-                        if use_cached_data:
-                            mop.notify(FetchResourceCacheHitEvent())
-                        else:
-                            # console.log(f"[Start]: GET {url}...")
-                            response: Optional[HTTPResponse] = None
-
-                            # noinspection PyShadowingNames
-                            try:
-                                cache.add_headers(fetch_info, headers)
-                                with self._request("GET", parsed_url, headers=headers) as response:
-                                    clength = int(response.headers.get('content-length', '-1'))
-                                    mop.notify(FetchResourceDownloadStartEvent(clength, cache_files.data))
-
-                                    # print(f"[MID] GET {url} resulted with status code: {response.status}...")
-
-                                    if response.status == 200:
-                                        cache_files.save(response)
-                                    elif response.status != 304:
-                                        raise HttpException(
-                                            f"request to {url} ended with unexpected status code:"
-                                            f" {response.status} ({response.msg})", response)
-                            except Exception as e:
-                                if isinstance(e, HttpException):
-                                    raise
-                                else:
-                                    raise HttpException(str(e), response) from e
-                            finally:
-                                # print(f"thread: {threading.current_thread().ident} attempting to release task")
-                                with self._fetch_lock:
-                                    del self._fetch_inprogress[url]
-                                # print(f"thread: {threading.current_thread().ident} succss to release task")
-
-                        # print(f"[END] GET {url} resulted with cache files: {cache_files}")
-                        return cache_files
-
-                    deffered: Deferred[Optional[FetchedResource]] = Deferred()
-                    promise = self._fetch_inprogress[url] = deffered.promise()
-
-            if cached:
+            if error is None:
+                deferred.complete(resource)
+            elif isinstance(error, HttpException):
+                deferred.fail(error)
+            else:
+                http_error = HttpException(str(error))
+                http_error.__cause__ = error
+                deferred.fail(http_error)
+
+        try:
+            cache_files = self._resource_files_of(parsed_url)
+            fetch_info = FetchInfoConfig.load(cache_files.fetch_info)  # TODO: maybe add the response headers
+
+            if cache_files.exists() and cache.is_cache_valid(fetch_info):
                 mop.notify(FetchResourceCacheHitEvent())
-                return promise.result()
+                complete(cache_files)
+                return result
 
-            try:
-                deffered.complete(_fetch())
-            except Exception as e:
-                deffered.fail(e)
+            request_headers = dict(headers or {})
+            _add_standard_headers(request_headers)
+            cache.add_headers(fetch_info, request_headers)
+        except BaseException as e:
+            complete(error=e)
+            return result
+
+        download = _ResumableDownload(
+            self._engine, url, request_headers, cache_files, hashes, mop, self._max_redirects,
+            self._max_download_retries, self._backoff_base)
 
-            return promise.result()
+        def on_response(future: Future):
+            try:
+                response: AsyncResponse = future.result()
+                if response.status not in (200, 206, 304):
+                    raise HttpException(
+                        f"request to {url} ended with unexpected status code: {response.status} ({response.reason})",
+                        response)
+
+                complete(cache_files)
+            except BaseException as e:
+                complete(error=e)
+
+        self._engine.submit(download.run()).add_done_callback(on_response)
+        return result
 
     def clear_resources(self):
         shutil.rmtree(self.workspace)
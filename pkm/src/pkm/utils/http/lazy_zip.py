@@ -0,0 +1,94 @@
+import io
+from typing import Callable, Dict, Optional
+
+from pkm.utils.http.http_client import HttpException
+
+
+class RangeRequestsNotSupported(HttpException):
+    """
+    raised when attempting to lazily read a remote resource from a server that does not support range requests
+    """
+
+
+class LazyRemoteFile(io.RawIOBase):
+    """
+    a read-only, seekable file object over a remote resource, data is fetched on demand (using `read_range`) in blocks
+    of at least `min_fetch_size` bytes and kept in memory so the same region will not be fetched twice.
+
+    this allows libraries like `zipfile` to read a single member of a large remote zip file (e.g., the metadata file
+    of a wheel) while transferring only the zip central directory and the member itself
+    """
+
+    def __init__(self, size: int, read_range: Callable[[int, int], bytes], min_fetch_size: int = 16 * 1024):
+        """
+        :param size: the size of the remote resource
+        :param read_range: function that receives (start, end) and returns the bytes of the remote resource in the
+                           range [start, end)
+        :param min_fetch_size: minimal amount of bytes to fetch in a single `read_range` call
+        """
+        super().__init__()
+        self._size = size
+        self._read_range = read_range
+        self._min_fetch_size = min_fetch_size
+        self._blocks: Dict[int, bytes] = {}  # block start -> block data
+        self._pos = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self._size + offset
+        else:
+            raise ValueError(f"unsupported whence: {whence}")
+
+        if self._pos < 0:
+            raise ValueError("negative seek position")
+        return self._pos
+
+    def prefetch(self, start: int, end: int):
+        """
+        fetch the given range [start, end) (clipped to the file size) so that later reads from it will not require
+        additional requests
+        :param start: the range start
+        :param end: the range end
+        """
+        start, end = max(0, start), min(end, self._size)
+        if start < end and self._find_block(start, end) is None:
+            self._blocks[start] = self._read_range(start, end)
+
+    def _find_block(self, start: int, end: int) -> Optional[int]:
+        for block_start, block in self._blocks.items():
+            if block_start <= start and end <= block_start + len(block):
+                return block_start
+        return None
+
+    def readinto(self, buffer) -> int:
+        end = min(self._pos + len(buffer), self._size)
+        if end <= self._pos:
+            return 0
+
+        if (block_start := self._find_block(self._pos, end)) is None:
+            self.prefetch(self._pos, max(end, self._pos + self._min_fetch_size))
+            block_start = self._pos
+
+        block = self._blocks[block_start]
+        amount = end - self._pos
+        offset = self._pos - block_start
+        buffer[:amount] = block[offset:offset + amount]
+        self._pos = end
+        return amount
@@ -0,0 +1,104 @@
+import json
+from typing import TextIO, Any, Iterator
+
+_WHITESPACES = ' \t\n\r'
+
+
+class JsonStreamReader:
+    """
+    incremental reader for (potentially huge) json documents, only the values that are explicitly read are kept in
+    memory - the memory requirements are bounded by the size of the largest value read (or skipped) + `chunk_size`.
+
+    usage example:
+    >>> reader = JsonStreamReader(stream)
+    >>> for key in reader.iter_object():
+    ...     if key == 'interesting':
+    ...         value = reader.read_value()
+    ...     else:
+    ...         reader.skip_value()
+
+    note that after each key yielded by `iter_object`, its value must be consumed (by `read_value`, `skip_value` or a
+    nested `iter_object`) before continuing the iteration
+    """
+
+    def __init__(self, stream: TextIO, chunk_size: int = 1 << 20):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            buf, pos = self._buf, self._pos
+            while pos < len(buf) and buf[pos] in _WHITESPACES:
+                pos += 1
+            self._pos = pos
+
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                raise json.JSONDecodeError("unexpected end of document", self._buf, self._pos)
+
+    def _expect(self, char: str):
+        if (actual := self._peek()) != char:
+            raise json.JSONDecodeError(f"expecting '{char}' but found '{actual}'", self._buf, self._pos)
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        """
+        :return: the next json value in the stream
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # a number that ends at the end of the buffer may continue in the next chunk
+                if end < len(self._buf) or not self._fill():
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+    def skip_value(self):
+        """
+        skips the next json value in the stream
+        """
+        self.read_value()
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        iterate over the keys of the next json value in the stream, which is expected to be an object
+        :return: iterator over the object's keys
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise json.JSONDecodeError("expecting object key", self._buf, self._pos)
+            self._expect(':')
+            yield key
+
+            if self._peek() == '}':
+                self._pos += 1
+                return
+            self._expect(',')
@@ -1,4 +1,5 @@
 import inspect
+from abc import ABC, abstractmethod
 from contextlib import contextmanager
 from dataclasses import dataclass
 from typing import Any, Callable, Type, Dict, Optional, Generator
@@ -112,12 +113,44 @@ class _Monitor:
             cb and cb.leave_method and cb.leave_method(context)
 
     def notify(self, event: Any):
+        _forwarder and _forwarder.notified(self, event)
         (cb := self._callbacks.get(type(event))) and cb.enter_method(event)
 
 
 Monitor = _Monitor()
 
 
+class MonitorForwarder(ABC):
+    """
+    receives all the monitored operations and events (regardless of the registered listeners), used to forward the
+    monitoring of operations that are executed in a worker process to its parent process
+    """
+
+    @abstractmethod
+    def entered(self, op: "MonitoredOperation", parent: _Monitor):
+        ...
+
+    @abstractmethod
+    def left(self, op: "MonitoredOperation", err: Optional[BaseException]):
+        ...
+
+    @abstractmethod
+    def notified(self, monitor: _Monitor, event: Any):
+        ...
+
+
+_forwarder: Optional[MonitorForwarder] = None
+
+
+def forward_monitoring(forwarder: Optional[MonitorForwarder]):
+    """
+    set the forwarder that will receive all the monitored operations and events of this process
+    :param forwarder: the forwarder to set or None to stop forwarding
+    """
+    global _forwarder
+    _forwarder = forwarder
+
+
 class MonitoredEvent:
     def notify(self, monitor: _Monitor = Monitor):
         monitor.notify(self)
@@ -133,6 +166,7 @@ class MonitoredOperation(_Monitor):
 
         cb = self._callback = parent._callbacks.get(type(self))
 
+        _forwarder and _forwarder.entered(self, parent)
         cb and cb.enter_method and cb.enter_method(self)
 
         return self
@@ -144,6 +178,7 @@ class MonitoredOperation(_Monitor):
             cb and cb.fail_method and cb.fail_method(self, exc_val)
 
         cb and cb.leave_method and cb.leave_method(self)
+        _forwarder and _forwarder.left(self, exc_val)
 
     def with_async(self, promise: Promise) -> Promise:
         self.__enter__()
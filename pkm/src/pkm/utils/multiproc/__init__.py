@@ -2,21 +2,23 @@ from __future__ import annotations
 
 import multiprocessing
 import os
-import pickle
 import sys
+import time
 import traceback
 import typing
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, is_dataclass, fields
 from io import StringIO
 from pathlib import Path
 from queue import Queue, Empty
 from subprocess import Popen, PIPE
-from threading import Lock, Thread
+from threading import Lock, Thread, Condition
 from types import FunctionType
-from typing import BinaryIO, Optional, Any, Callable, TypeVar, List, Dict, cast
+from typing import BinaryIO, Optional, Any, Callable, TypeVar, List, Dict, cast, Sequence, Type, Tuple
 
 from pkm.utils.commons import Closeable
+from pkm.utils.monitors import MonitorForwarder, MonitoredOperation, Monitor, forward_monitoring, _Monitor
+from pkm.utils.multiproc.transport import read_message, write_message, encode_message, write_frame
 from pkm.utils.promises import Promise, Deferred
 from pkm.utils.types import ParamSpec
 
@@ -30,6 +32,32 @@ class _StdWrite:
     stream_id: int
 
 
+@dataclass
+class _MonitoredOpEntered:
+    op_id: int
+    parent_id: Optional[int]  # None if the parent is the global monitor
+    op_type: Type[MonitoredOperation]
+    op_fields: Dict[str, Any]
+
+
+@dataclass
+class _MonitoredOpLeft:
+    op_id: int
+    failure: Optional[str]
+
+
+@dataclass
+class _MonitoredEventNotified:
+    monitor_id: Optional[int]  # None if the event was sent to the global monitor
+    event_type: Type
+    event_fields: Dict[str, Any]
+
+
+def _snapshot(obj: Any) -> Tuple[Type, Dict[str, Any]]:
+    # monitored operations and events are (mostly) dataclasses, their replicas are created using their fields
+    return type(obj), ({f.name: getattr(obj, f.name) for f in fields(obj)} if is_dataclass(obj) else {})
+
+
 class WorkerException(Exception):
     def __init__(self, msg, workerstrace: str):
         super().__init__(msg)
@@ -37,17 +65,14 @@ class WorkerException(Exception):
 
 
 class _StandardStreamPipe(StringIO):
-    def __init__(self, target_stream: BinaryIO, stream_id: int, stream_lock: Lock):
+    def __init__(self, worker: _Worker, stream_id: int):
         super(_StandardStreamPipe, self).__init__()
-        self.target_stream = target_stream
+        self.worker = worker
         self.stream_id = stream_id
-        self.stream_lock = stream_lock
 
     def write(self, __s: str) -> int:
         if __s:
-            with self.stream_lock:
-                pickle.dump(_StdWrite(__s, self.stream_id), self.target_stream)
-                self.target_stream.flush()
+            self.worker.send_event(_StdWrite(__s, self.stream_id))
         return len(__s)
 
 
@@ -61,37 +86,73 @@ class _Command(ABC):
 class _CommandResult:
     result: Any = None
     err_strace: Optional[str] = None
+    events_sent: int = 0  # the number of events the worker sent before this result
 
 
-class _Worker:
+class _Worker(MonitorForwarder):
+    """
+    the worker process side of the pool, the worker's standard streams are used as its channels (all the messages are
+    framed, see `pkm.utils.multiproc.transport`):
+     - stdin: commands in
+     - stderr: command results out
+     - stdout: events out - the output written to the worker's stdout/stderr and its forwarded monitoring
+    """
 
     def __init__(self):
-        self._stdout: Optional[BinaryIO] = None  # use for logs (multiplexed)
+        self._stdout: Optional[BinaryIO] = None  # use for events (multiplexed)
         self._stderr: Optional[BinaryIO] = None  # use for commands out
         self._stdin: Optional[BinaryIO] = None  # use for commands in
         self._stdout_lock = Lock()
+        self._events_sent = 0
 
     def _attach_to_process(self):
         self._stdout = sys.stdout.buffer
         self._stderr = sys.stderr.buffer
         self._stdin = sys.stdin.buffer
 
-        sys.stdout = _StandardStreamPipe(self._stdout, 0, self._stdout_lock)
-        sys.stderr = _StandardStreamPipe(self._stdout, 1, self._stdout_lock)
+        sys.stdout = _StandardStreamPipe(self, 0)
+        sys.stderr = _StandardStreamPipe(self, 1)
+        forward_monitoring(self)
+
+    def send_event(self, event: Any):
+        frame = encode_message(event)  # encoded outside the lock, which only serializes the writes
+        with self._stdout_lock:
+            write_frame(self._stdout, frame)
+            self._events_sent += 1
+
+    def entered(self, op: MonitoredOperation, parent: _Monitor):
+        parent_id = id(parent) if isinstance(parent, MonitoredOperation) else None
+        self._forward(_MonitoredOpEntered(id(op), parent_id, *_snapshot(op)))
+
+    def left(self, op: MonitoredOperation, err: Optional[BaseException]):
+        self._forward(_MonitoredOpLeft(id(op), repr(err) if err else None))
+
+    def notified(self, monitor: _Monitor, event: Any):
+        monitor_id = id(monitor) if isinstance(monitor, MonitoredOperation) else None
+        self._forward(_MonitoredEventNotified(monitor_id, *_snapshot(event)))
+
+    def _forward(self, message: Any):
+        try:
+            self.send_event(message)
+        except Exception:  # noqa
+            pass  # monitoring is best effort, e.g., an operation with fields that cannot be pickled is not forwarded
 
     def run(self):
         self._attach_to_process()
+
+        # report that the worker is ready (the preloaded modules were already imported)
+        write_message(self._stderr, _CommandResult())
+
         while True:
-            cmd: _Command = pickle.load(self._stdin)
+            cmd: _Command = read_message(self._stdin)
             try:
                 result = cmd.execute()
-                pickle.dump(_CommandResult(result), self._stderr)
-                self._stderr.flush()
+                write_message(self._stderr, _CommandResult(result, events_sent=self._events_sent))
             except Exception as e:  # noqa
                 err_strace = StringIO()
                 traceback.print_exc(file=err_strace)
-                pickle.dump(_CommandResult(err_strace=err_strace.getvalue()), self._stderr)
-                self._stderr.flush()
+                write_message(self._stderr, _CommandResult(err_strace=err_strace.getvalue(),
+                                                           events_sent=self._events_sent))
 
 
 class _WorkerHandler:
@@ -99,27 +160,83 @@ class _WorkerHandler:
         self._pool = pool
         self._proc: Optional[Popen] = None
         self._threads: Optional[List[Thread]] = None
+        self._spawn_time = 0.0
+        self._events_condition = Condition()
+        self._events_received = 0
+        self._events_closed = False
+        self._replicas: Dict[int, MonitoredOperation] = {}  # worker operation id -> its replica in this process
         self.name = name
+        self.startup_seconds: Optional[float] = None
 
     def _execute_worker(self):
         executable = sys.executable
+        self._spawn_time = time.perf_counter()
         self._proc = Popen(
-            args=[executable, "-u", str(Path(__file__).parent / "worker.py")],
+            args=[executable, "-u", str(Path(__file__).parent / "worker.py"), *self._pool.preload_modules],
             stderr=PIPE, stdout=PIPE, stdin=PIPE, bufsize=0,
             env=os.environ
         )
 
+    def _await_ready(self):
+        read_message(self._proc.stderr)
+        self.startup_seconds = time.perf_counter() - self._spawn_time
+        # noinspection PyProtectedMember
+        self._pool._worker_started(self)
+
     def _should_terminate(self):
         return self._pool.is_closed() or self._proc.poll() is not None
 
-    def _handle_log(self):
+    def _handle_events(self):
         try:
             stream = [sys.stdout, sys.stderr]
             while not self._should_terminate():
-                write: _StdWrite = pickle.load(self._proc.stdout)
-                stream[write.stream_id].write(write.msg)
+                event = read_message(self._proc.stdout)
+                if isinstance(event, _StdWrite):
+                    stream[event.stream_id].write(event.msg)
+                else:
+                    self._replay_monitoring(event)
+
+                with self._events_condition:
+                    self._events_received += 1
+                    self._events_condition.notify_all()
         except EOFError:
             pass
+        finally:
+            for replica in self._replicas.values():
+                err = WorkerException("worker terminated during the operation", "")
+                replica.__exit__(type(err), err, None)
+            self._replicas.clear()
+
+            with self._events_condition:
+                self._events_closed = True
+                self._events_condition.notify_all()
+
+    def _replay_monitoring(self, event: Any):
+        try:
+            if isinstance(event, _MonitoredOpEntered):
+                parent = Monitor
+                if event.parent_id is not None and (parent := self._replicas.get(event.parent_id)) is None:
+                    return  # the parent operation was not forwarded
+
+                replica = event.op_type(**event.op_fields)
+                replica._parent_monitor = parent
+                self._replicas[event.op_id] = replica.__enter__()
+
+            elif isinstance(event, _MonitoredOpLeft):
+                if replica := self._replicas.pop(event.op_id, None):
+                    err = WorkerException(event.failure, "") if event.failure else None
+                    replica.__exit__(type(err) if err else None, err, None)
+
+            elif isinstance(event, _MonitoredEventNotified):
+                monitor = Monitor if event.monitor_id is None else self._replicas.get(event.monitor_id)
+                monitor and monitor.notify(event.event_type(**event.event_fields))
+        except Exception:  # noqa
+            traceback.print_exc()
+
+    def _await_events(self, events_sent: int):
+        # the events that the worker sent before a result are handled before the result is delivered
+        with self._events_condition:
+            self._events_condition.wait_for(lambda: self._events_received >= events_sent or self._events_closed)
 
     def __del__(self):
         if self._proc.poll() is not None:
@@ -128,11 +245,15 @@ class _WorkerHandler:
     def _handle_work(self):
         q = self._pool._task_queue  # noqa
         try:
+            self._await_ready()
             while not self._should_terminate():
 
                 try:
                     next_task: _Task = q.get(block=True, timeout=self._pool.max_inactivity_seconds)
                 except Empty:
+                    # noinspection PyProtectedMember
+                    if not self._pool._retire_idle_worker(self):
+                        continue
                     self.kill()
                     self._proc.wait()
                     return
@@ -142,10 +263,10 @@ class _WorkerHandler:
 
                 try:
                     if task_result.attach_worker(self):
-                        pickle.dump(next_task, self._proc.stdin)
-                        self._proc.stdin.flush()
+                        write_message(self._proc.stdin, next_task)
 
-                        proc_result: _CommandResult = pickle.load(self._proc.stderr)
+                        proc_result: _CommandResult = read_message(self._proc.stderr)
+                        self._await_events(proc_result.events_sent)
 
                         if proc_result.err_strace:
                             task_result.deferred.fail(
@@ -157,6 +278,8 @@ class _WorkerHandler:
                     task_result.deferred.fail(e)
                 finally:
                     q.task_done()
+        except EOFError:
+            pass  # the worker process died
         finally:
             # noinspection PyProtectedMember
             self._pool._removed_worker(self)
@@ -171,10 +294,10 @@ class _WorkerHandler:
 
     def start(self):
         self._execute_worker()
-        log_thread = Thread(target=self._handle_log, daemon=True)
+        events_thread = Thread(target=self._handle_events, daemon=True)
         work_thread = Thread(target=self._handle_work, daemon=True)
-        self._threads = [log_thread, work_thread]
-        log_thread.start()
+        self._threads = [events_thread, work_thread]
+        events_thread.start()
         work_thread.start()
 
 
@@ -215,17 +338,27 @@ class _TaskResult:
 
 
 class ProcessPoolExecutor(Closeable):
+    """
+    executes functions in a pool of worker processes, workers are spawned on demand (or ahead of time, see `warm_up`)
+    and are retired after being idle for `max_inactivity_seconds`, except for the first `min_workers` that are kept
+    warm. a worker imports the `preload_modules` before it reports being ready, so the modules that the tasks need (and
+    the process level caches they populate, e.g., the http client) are loaded once per worker and not once per task
+    """
 
     def __init__(
             self, max_workers: int = multiprocessing.cpu_count(), task_queue: Optional[Queue] = None,
-            max_inactivity_seconds: int = 15):
+            max_inactivity_seconds: int = 15, min_workers: int = 0, preload_modules: Sequence[str] = ()):
         self._closed = False
         self._task_queue: Queue[_Task] = task_queue or Queue()
         self._workers_lock = Lock()
         self._next_worker_id = 0
         self._workers: Dict[str, _WorkerHandler] = {}
         self._max_workers = max_workers
+        self._startup_seconds_total = 0.0
+        self._started_workers = 0
         self.max_inactivity_seconds = max_inactivity_seconds
+        self.min_workers = min_workers
+        self.preload_modules = list(preload_modules)
 
     def execute(self, execution: Callable[_PARAMS, _T],
                 *args: _PARAMS.args, **kwargs: _PARAMS.kwargs) -> Promise[_T]:
@@ -241,9 +374,48 @@ class ProcessPoolExecutor(Closeable):
 
         return result.deferred.promise()
 
+    def warm_up(self, n_workers: Optional[int] = None):
+        """
+        spawn workers ahead of time, so that their startup (spawning the interpreter and importing the preloaded
+        modules) overlaps other work instead of delaying the tasks that will be executed later
+        :param n_workers: the number of workers that should be available, bounded by the pool's max workers,
+                          if not given, spawns up to the pool's max workers
+        """
+        n_workers = self._max_workers if n_workers is None else min(n_workers, self._max_workers)
+        new_workers = []
+        with self._workers_lock:
+            while len(self._workers) < n_workers and not self._closed:
+                new_workers.append(new_worker := _WorkerHandler(self, f"worker {self._next_worker_id}"))
+                self._next_worker_id += 1
+                self._workers[new_worker.name] = new_worker
+
+        for new_worker in new_workers:
+            new_worker.start()
+
+    @property
+    def average_worker_startup_seconds(self) -> Optional[float]:
+        """
+        :return: the average time it took the workers of this pool to become ready (spawn the process and import the
+                 preloaded modules) or None if no worker was started yet
+        """
+        with self._workers_lock:
+            return self._startup_seconds_total / self._started_workers if self._started_workers else None
+
+    def _worker_started(self, worker: _WorkerHandler):
+        with self._workers_lock:
+            self._startup_seconds_total += worker.startup_seconds
+            self._started_workers += 1
+
+    def _retire_idle_worker(self, worker: _WorkerHandler) -> bool:
+        with self._workers_lock:
+            if len(self._workers) <= self.min_workers and not self._closed:
+                return False
+            self._workers.pop(worker.name, None)
+            return True
+
     def _removed_worker(self, worker: _WorkerHandler):
         with self._workers_lock:
-            del self._workers[worker.name]
+            self._workers.pop(worker.name, None)
 
         self._spawn_new_worker_if_needed()
 
@@ -0,0 +1,95 @@
+import os
+import pickle
+import struct
+from threading import Lock
+from typing import BinaryIO, Any, Optional
+
+# messages are framed as: kind (1 byte), payload size (8 bytes) and the payload, a pickled message is either sent
+# inline or (when large) through a shared memory block, in which case the frame's payload is the block name (the block
+# may be larger than the pickled message, which is fine as unpickling ignores the bytes after the pickled object)
+_FRAME_HEADER = struct.Struct('<BQ')
+_INLINE_FRAME = 0
+_SHARED_MEMORY_FRAME = 1
+
+# shared memory blocks are removed once all of their handles are closed on windows, so the sender cannot hand them over
+_USE_SHARED_MEMORY = os.name == 'posix'
+SHARED_MEMORY_MIN_PAYLOAD = 1024 * 1024
+
+
+def encode_message(message: Any) -> bytes:
+    """
+    :param message: the (picklable) message to encode
+    :return: the message frame, ready to be written by `write_frame`
+    """
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    if _USE_SHARED_MEMORY and len(payload) >= SHARED_MEMORY_MIN_PAYLOAD:
+        from multiprocessing import shared_memory, resource_tracker
+
+        shm = shared_memory.SharedMemory(create=True, size=len(payload))
+        try:
+            shm.buf[:len(payload)] = payload
+        finally:
+            shm.close()
+
+        # the receiver is the one that unlinks the block
+        resource_tracker.unregister(shm._name, "shared_memory")  # noqa
+        name = shm.name.encode()
+        return _FRAME_HEADER.pack(_SHARED_MEMORY_FRAME, len(name)) + name
+
+    return _FRAME_HEADER.pack(_INLINE_FRAME, len(payload)) + payload
+
+
+def write_frame(stream: BinaryIO, frame: bytes, lock: Optional[Lock] = None):
+    """
+    write the given `frame` (see `encode_message`) into `stream` and flush it
+    :param stream: the stream to write into
+    :param frame: the frame to write
+    :param lock: if given, the write is done while holding this lock
+    """
+    if lock:
+        with lock:
+            stream.write(frame)
+            stream.flush()
+    else:
+        stream.write(frame)
+        stream.flush()
+
+
+def write_message(stream: BinaryIO, message: Any):
+    """
+    encode the given `message` and write it into `stream`
+    :param stream: the stream to write into
+    :param message: the (picklable) message to write
+    """
+    write_frame(stream, encode_message(message))
+
+
+def read_message(stream: BinaryIO) -> Any:
+    """
+    read the next message (written by `write_message` or `write_frame`) from the given `stream`
+    :param stream: the stream to read from
+    :return: the read message, raises EOFError if the stream was closed
+    """
+    kind, size = _FRAME_HEADER.unpack(_read_exactly(stream, _FRAME_HEADER.size))
+    payload = _read_exactly(stream, size)
+    if kind == _INLINE_FRAME:
+        return pickle.loads(payload)
+
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=payload.tobytes().decode())
+    try:
+        return pickle.loads(shm.buf)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _read_exactly(stream: BinaryIO, size: int) -> memoryview:
+    result = memoryview(bytearray(size))
+    position = 0
+    while position < size:
+        if not (read := stream.readinto(result[position:])):
+            raise EOFError()
+        position += read
+    return result
@@ -1,4 +1,14 @@
 if __name__ == '__main__':
+    import importlib
+    import sys
+
+    # warm the worker up, the modules its tasks will need are imported before it reports being ready
+    for module in sys.argv[1:]:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass  # the task that needs the module will report the error
+
     from pkm.utils.multiproc import _Worker
     # from pkm.api.pkm import pkm
     # pkm.global_flags.package_installation_parallelizm = "thread"
@@ -1,6 +1,6 @@
 from unittest import TestCase
 
-from pkm.api.dependencies.dependency import Dependency
+from pkm.api.dependencies.dependency import Dependency, PEP508DependencyParser
 from pkm.api.versions.version_specifiers import VersionSpecifier, AllowAllVersions
 
 
@@ -53,6 +53,18 @@ class TestDependency(TestCase):
 
         assert_parsed('pip (<20.3.*,>=20.1.*)', package_name='pip', version_spec=VersionSpecifier.parse('<20.3,>=20.1'))
 
+    def test_fast_path_and_interning(self):
+        for text in ("requests", "requests >= 2.0, <3", "a[b, c]>=1.0.dev1; extra == 'x'", "pip (<20.3.*,>=20.1.*)",
+                     "x==1.0rc1 ; python_version < '3.8'", "x~=1.4.post2", "x===1.0", "x; ",
+                     "name@http://foo.com", "name>=1.0-r4", "name>=3 junk; os_name == 'nt'"):
+            parsed, expected = Dependency.parse(text), PEP508DependencyParser(text).read_dependency()
+            assert str(parsed) == str(expected), f"expecting {text} to be parsed as {expected} but got {parsed}"
+            assert parsed.extras == expected.extras
+            assert parsed.version_spec == expected.version_spec
+            assert Dependency.parse(text) is parsed
+
+        assert Dependency.parse("a; os_name == 'nt'").env_marker is Dependency.parse("b; os_name == 'nt'").env_marker
+
 
 def assert_parsed(text: str, **kwargs):
     assert_dependency(Dependency.parse(text), **kwargs)
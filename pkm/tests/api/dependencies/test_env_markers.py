@@ -50,6 +50,24 @@ class TestEnvMarkers(TestCase):
         assert_with_env("extra == 'bam'", True, extras=['ba', 'bam'])
         assert_with_env("extra == 'bam'", False, extras=['ba', 'm'])
 
+    def test_compiled_once_and_memoized(self):
+        marker = EnvironmentMarker.parse_pep508("python_version >= '3.7' and extra == 'test'")
+        assert marker is EnvironmentMarker.parse_pep508("python_version >= '3.7' and extra == 'test'")
+
+        env36, env38 = _MockEnvironment({'python_version': '3.6'}), _MockEnvironment({'python_version': '3.8'})
+        assert not marker.evaluate_on(env38, [])
+        assert marker.evaluate_on(env38, ['test'])
+        assert not marker.evaluate_on(env36, ['test'])
+
+        # the results are cached per environment markers hash and extras, the markers are not consulted again
+        env38.markers.clear()
+        assert marker.evaluate_on(env38, ['test'])
+        assert marker.evaluate_on(_MockEnvironment({'python_version': '3.8'}), ['test'])
+
+        assert_with_env("sys_platform == 'linux' and platform_machine != 'x86_64'", True,
+                        sys_platform='linux', platform_machine='aarch64')
+        assert_with_env("'3.6' < python_version", True, python_version='3.9')
+
 
 def assert_with_env(marker: str, expected: bool, **env_markers):
     parsed_marker = EnvironmentMarker.parse_pep508(marker)
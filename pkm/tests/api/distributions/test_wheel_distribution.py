@@ -0,0 +1,175 @@
+import base64
+import hashlib
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict
+from unittest import TestCase
+from zipfile import ZipFile
+
+from pkm.api.distributions.distinfo import DistInfo, Record
+from pkm.api.distributions.wheel_distribution import WheelDistribution, InstallationException, \
+    _install_wheel_archive
+from pkm.api.packages.package import PackageDescriptor
+from pkm.api.packages.package_installation import PackageInstallationTarget, compile_installed_packages
+from pkm.api.packages.site_packages import InstalledPackage
+from pkm.api.pkm import pkm
+from pkm.api.versions.version import Version
+from pkm.utils.bytecode import deferred_compilation
+from pkm.utils.content_store import ContentStore
+from pkm.utils.files import temp_dir
+
+_FILES = {
+    'pkg/__init__.py': b"VALUE = 1\n",
+    'pkg/data.bin': bytes(range(256)) * 4096,
+    'pkg-1.0.data/scripts/tool': b"#!python\nprint('tool')\n",
+    'pkg-1.0.dist-info/METADATA': b"Metadata-Version: 2.1\nName: pkg\nVersion: 1.0\n",
+    'pkg-1.0.dist-info/WHEEL': b"Wheel-Version: 1.0\nGenerator: test\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+}
+
+
+def _sha256(content: bytes) -> str:
+    return base64.urlsafe_b64encode(hashlib.sha256(content).digest()).decode().rstrip('=')
+
+
+def _sha256_hex(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _build_wheel(path: Path, files: Dict[str, bytes], tampered: str = ''):
+    with ZipFile(path, 'w') as zipf:
+        records = []
+        for name, content in files.items():
+            zipf.writestr(name, content + (b'tampered' if name == tampered else b''))
+            records.append(f"{name},sha256={_sha256(content)},{len(content)}")
+        zipf.writestr('pkg-1.0.dist-info/RECORD', '\n'.join(records + ['pkg-1.0.dist-info/RECORD,,']))
+
+
+def _target(root: Path) -> PackageInstallationTarget:
+    paths = {name: str(root / name) for name in (
+        'stdlib', 'platstdlib', 'platinclude', 'purelib', 'platlib', 'include', 'data', 'scripts')}
+    return PackageInstallationTarget(env=SimpleNamespace(interpreter_path=Path(sys.executable)), **paths)
+
+
+def _records_of(dist_info: Path) -> Dict[str, Record]:
+    return {r.file: r for r in DistInfo.load(dist_info).load_record_cfg().records}
+
+
+class TestWheelDistribution(TestCase):
+
+    def setUp(self):
+        self._bytecode_compilation = pkm.config.bytecode_compilation
+
+    def tearDown(self):
+        pkm.config.bytecode_compilation = self._bytecode_compilation
+
+    def test_streaming_installation(self):
+        pkm.config.bytecode_compilation = "inline"
+        with temp_dir() as workspace:
+            wheel = workspace / 'pkg-1.0-py3-none-any.whl'
+            _build_wheel(wheel, _FILES)
+            target = _target(workspace / 'env')
+
+            WheelDistribution(PackageDescriptor('pkg', Version.parse('1.0')), wheel).install_to(target)
+
+            purelib = Path(target.purelib)
+            assert (purelib / 'pkg/data.bin').read_bytes() == _FILES['pkg/data.bin']
+            script = Path(target.scripts, 'tool').read_text()
+            assert script.startswith(f"#!{Path(sys.executable).absolute()}") and script.endswith("print('tool')\n")
+            assert (purelib / 'pkg-1.0.dist-info/INSTALLER').read_text() == 'pkm'
+
+            records = _records_of(purelib / 'pkg-1.0.dist-info')
+            for file, record in records.items():
+                path = purelib / file
+                assert record.hash_signature.validate_against(path), f"mismatched record for {file}"
+                assert record.length == path.stat().st_size
+            assert 'pkg-1.0.dist-info/RECORD' not in records
+            assert any(file.endswith('.pyc') for file in records)
+
+    def test_batch_bytecode_compilation(self):
+        pkm.config.bytecode_compilation = "batch"
+        with temp_dir() as workspace:
+            wheel = workspace / 'pkg-1.0-py3-none-any.whl'
+            _build_wheel(wheel, _FILES)
+            target = _target(workspace / 'env')
+
+            with deferred_compilation():
+                WheelDistribution(PackageDescriptor('pkg', Version.parse('1.0')), wheel).install_to(target)
+            dist_info = Path(target.purelib, 'pkg-1.0.dist-info')
+            assert not any(file.endswith('.pyc') for file in _records_of(dist_info))
+
+            compile_installed_packages([InstalledPackage(DistInfo.load(dist_info))], [0, 2])
+            compiled = [file for file in _records_of(dist_info) if file.endswith('.pyc')]
+            assert len(compiled) == 2 and any('.opt-2.' in file for file in compiled)
+            for file in compiled:
+                assert _records_of(dist_info)[file].hash_signature.validate_against(Path(target.purelib, file))
+
+    def test_batch_bytecode_compilation_in_process_pool(self):
+        pkm.config.bytecode_compilation = "batch"
+        with temp_dir() as workspace:
+            wheel = workspace / 'pkg-1.0-py3-none-any.whl'
+            modules = {f"pkg/module_{i}.py": f"VALUE = {i}\n".encode() for i in range(256)}
+            _build_wheel(wheel, {**_FILES, **modules})
+            target = _target(workspace / 'env')
+
+            with deferred_compilation():
+                WheelDistribution(PackageDescriptor('pkg', Version.parse('1.0')), wheel).install_to(target)
+
+            # more than a single batch, compiled by the pool workers
+            dist_info = Path(target.purelib, 'pkg-1.0.dist-info')
+            compile_installed_packages([InstalledPackage(DistInfo.load(dist_info))], [0], pkm.processes)
+            compiled = [file for file in _records_of(dist_info) if file.endswith('.pyc')]
+            assert len(compiled) == len(modules) + 1
+
+    def test_batch_mode_outside_of_installation_plan(self):
+        pkm.config.bytecode_compilation = "batch"
+        with temp_dir() as workspace:
+            wheel = workspace / 'pkg-1.0-py3-none-any.whl'
+            _build_wheel(wheel, _FILES)
+            target = _target(workspace / 'env')
+
+            # there is no later compilation phase for a wheel that is installed directly, so it is compiled inline
+            WheelDistribution(PackageDescriptor('pkg', Version.parse('1.0')), wheel).install_to(target)
+            assert any(file.endswith('.pyc') for file in _records_of(Path(target.purelib, 'pkg-1.0.dist-info')))
+
+    def test_content_store_installation(self):
+        pkm.config.bytecode_compilation = "none"
+        with temp_dir() as workspace:
+            wheel = workspace / 'pkg-1.0-py3-none-any.whl'
+            _build_wheel(wheel, _FILES)
+            store = ContentStore(workspace / 'store', 'hardlink')
+            package = PackageDescriptor('pkg', Version.parse('1.0'))
+
+            targets = [_target(workspace / f'env{i}') for i in range(2)]
+            for target in targets:
+                with ZipFile(wheel) as zipf:
+                    _install_wheel_archive(package, zipf, target, None, None, store)
+
+            data_files = [Path(target.purelib, 'pkg/data.bin') for target in targets]
+            assert data_files[0].read_bytes() == data_files[1].read_bytes() == _FILES['pkg/data.bin']
+            assert data_files[0].stat().st_ino == data_files[1].stat().st_ino
+            assert data_files[0].stat().st_nlink == 3  # two environments and the store
+
+            # scripts are patched per environment and dist-info files may be modified, so they are not shared
+            scripts = [Path(target.scripts, 'tool') for target in targets]
+            assert scripts[0].stat().st_ino != scripts[1].stat().st_ino
+            assert sorted(it.name for it in store.workspace.rglob('*') if it.is_file()) == sorted(
+                _sha256_hex(_FILES[it])[2:] for it in ('pkg/__init__.py', 'pkg/data.bin'))
+            assert store.collect_garbage() == 0
+
+            for data_file in data_files:
+                data_file.unlink()
+            assert store.collect_garbage() == len(_FILES['pkg/data.bin'])
+            assert not store.contains(_sha256_hex(_FILES['pkg/data.bin']))
+            assert store.contains(_sha256_hex(_FILES['pkg/__init__.py']))
+
+    def test_tampered_wheel_is_rolled_back(self):
+        with temp_dir() as workspace:
+            wheel = workspace / 'pkg-1.0-py3-none-any.whl'
+            _build_wheel(wheel, _FILES, tampered='pkg/data.bin')
+            target = _target(workspace / 'env')
+
+            with self.assertRaises(InstallationException):
+                WheelDistribution(PackageDescriptor('pkg', Version.parse('1.0')), wheel).install_to(target)
+
+            assert not any(Path(target.purelib).rglob('*.*'))
@@ -0,0 +1,82 @@
+import copy
+import os
+import platform
+import sys
+import venv
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from pkm.api.environments.environment_introspection import IntrospectionCache, EnvironmentIntrospection
+from pkm.utils.files import temp_dir
+
+
+def _interpreter_of(env_root: Path) -> Path:
+    return env_root / ('Scripts/python.exe' if sys.platform == 'win32' else 'bin/python')
+
+
+def _is_inside(path: str, root: Path) -> bool:
+    # not using `Path.is_relative_to` which requires python 3.9
+    return os.path.commonpath([path, str(root)]) == str(root)
+
+
+class TestIntrospectionCache(TestCase):
+
+    def test_shared_between_environments_and_processes(self):
+        with temp_dir() as workspace:
+            env_roots = [workspace / 'env-a', workspace / 'env-ab']
+            for env_root in env_roots:
+                venv.create(env_root, symlinks=sys.platform != 'win32')
+
+            cache = IntrospectionCache(workspace / 'cache')
+            introspection = cache.get(_interpreter_of(env_roots[0]), env_roots[0])
+            assert _is_inside(introspection.paths['purelib'], env_roots[0].absolute())
+
+            # a new cache instance stands for a new process, it should not introspect the interpreters again
+            with patch.object(EnvironmentIntrospection, 'compute', side_effect=AssertionError("introspected")):
+                cache = IntrospectionCache(workspace / 'cache')
+                for env_root in env_roots:
+                    introspection = cache.get(_interpreter_of(env_root), env_root)
+                    assert _is_inside(introspection.paths['purelib'], env_root.absolute())
+                    assert Path(introspection['sys']['executable']).parent.parent == env_root.absolute()
+
+            if sys.platform != 'win32':  # the environments share the same base interpreter
+                assert len(list((workspace / 'cache').iterdir())) == 1
+
+    def test_invalidated_on_system_upgrade(self):
+        with temp_dir() as workspace:
+            IntrospectionCache(workspace / 'cache').get(Path(sys.executable))
+
+            # the interpreter did not change but the kernel did, the cached introspection records its release
+            uname = platform.uname()._replace(release='0.0.0-upgraded')
+            with patch.object(platform, 'uname', return_value=uname), \
+                    patch.object(EnvironmentIntrospection, 'compute', side_effect=AssertionError("introspected")):
+                with self.assertRaises(AssertionError):
+                    IntrospectionCache(workspace / 'cache').get(Path(sys.executable))
+
+            with patch.object(EnvironmentIntrospection, 'compute', side_effect=AssertionError("introspected")):
+                IntrospectionCache(workspace / 'cache').get(Path(sys.executable))
+
+    def test_memoized_compatibility_scores(self):
+        with temp_dir() as workspace:
+            cache = IntrospectionCache(workspace / 'cache')
+            introspection = cache.get(Path(sys.executable))
+            assert cache.get(Path(sys.executable)) is introspection
+
+            tags = ['py3-none-any', 'py2.py3-none-any', 'cp27-cp27mu-manylinux1_x86_64', 'py3-none-any']
+            scores = [introspection.compatibility_score(it) for it in tags]
+            assert scores == [introspection._compute_compatibility_score(it) for it in tags]  # noqa
+            assert scores[0] is not None and scores[0] == scores[1] and scores[2] is None
+
+    def test_compatibility_fingerprint(self):
+        with temp_dir() as workspace:
+            env_root = workspace / 'env'
+            venv.create(env_root, symlinks=sys.platform != 'win32')
+
+            cache = IntrospectionCache(workspace / 'cache')
+            introspection = cache.get(_interpreter_of(env_root), env_root)
+            assert cache.get(Path(sys.executable)).compatibility_fingerprint == introspection.compatibility_fingerprint
+
+            data = copy.deepcopy(introspection._data)  # noqa
+            data['sysconfig']['platform'] = 'other-platform'
+            assert EnvironmentIntrospection(data).compatibility_fingerprint != introspection.compatibility_fingerprint
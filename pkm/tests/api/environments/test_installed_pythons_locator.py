@@ -0,0 +1,43 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from pkm.api.environments import installed_pythons_locator
+from pkm.api.environments.installed_pythons_locator import InstalledPythonsLocator
+from pkm.api.versions.version_specifiers import VersionSpecifier
+from pkm.utils.files import temp_dir
+
+
+def _fake_interpreter(path: Path, version: str) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f'#!/bin/sh\necho {version}\necho "$0"\n')
+    path.chmod(0o755)
+    return path
+
+
+@unittest.skipIf(sys.platform == 'win32', "uses shell scripts as fake interpreters")
+class TestInstalledPythonsLocator(TestCase):
+
+    def test_registry(self):
+        with temp_dir() as workspace:
+            search_path = workspace / 'versions'
+            interpreter = _fake_interpreter(search_path / '3.99.1/bin/python3.99', '3.99.1')
+            _fake_interpreter(search_path / '3.98.1/deeply/nested/bin/python', '3.98.1')  # not scanned
+            registry = workspace / 'registry.json'
+
+            def fake_versions(locator: InstalledPythonsLocator):
+                return [str(it.version) for it in locator.all_installed if str(it.version).startswith('3.9')]
+
+            assert fake_versions(InstalledPythonsLocator([str(search_path)], registry)) == ['3.99.1']
+
+            # unchanged interpreters are not probed again
+            with patch.object(installed_pythons_locator, '_probe_interpreter', side_effect=AssertionError("probed")):
+                locator = InstalledPythonsLocator([str(search_path)], registry)
+                assert fake_versions(locator) == ['3.99.1']
+                assert locator.match(VersionSpecifier.parse('==3.99.1'))[0].interpreter == interpreter.resolve()
+
+            # but changed ones are
+            _fake_interpreter(interpreter, '3.99.12')
+            assert fake_versions(InstalledPythonsLocator([str(search_path)], registry)) == ['3.99.12']
@@ -45,6 +45,17 @@ class TestVersion(TestCase):
         assert v2 == v200, '2 expected to be equals to 2.0.0'
         assert StandardVersion.parse('3') == StandardVersion.parse('3.0'), '3.0 expected to be equals to 3'
 
+    def test_pep440_ordering(self):
+        ordered = ["1.0.dev0", "1.0a1.dev1", "1.0a1", "1.0a2.post1", "1.0b1", "1.0rc1", "1.0", "1.0+abc", "1.0+5",
+                   "1.0.post1.dev1", "1.0.post1", "1.0.1", "1!0.5"]
+        versions = [Version.parse(it) for it in ordered]
+        assert [str(it) for it in sorted(reversed(versions))] == ordered
+
+        assert StandardVersion.parse('1.0+local').equals_to(StandardVersion.parse('1.0'), False)
+        assert StandardVersion.parse('1.0+local') != StandardVersion.parse('1.0')
+        assert hash(StandardVersion.parse('2.0.0')) == hash(StandardVersion.parse('2'))
+        assert Version.parse('1.2.3') is Version.parse('1.2.3')
+
 
 def assert_version(version: Version, expected_str: str) -> None:
     vstr = str(version)  # noqa
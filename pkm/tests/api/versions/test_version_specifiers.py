@@ -140,6 +140,39 @@ class TestVersionSpecifiers(TestCase):
     def test_ordering(self):
         assert spec(">=4.62,<4.65") < spec(">=4.62")
 
+    def test_hash_consing(self):
+        intersection = VersionSpecifier.parse(">=1.0").intersect_with(VersionSpecifier.parse("<2.0"))
+        assert intersection is VersionSpecifier.parse(">=1.0, <2.0")
+        assert intersection is spec("<2.0").intersect_with(spec(">=1.0"))
+        assert intersection.inverse().inverse() is intersection
+
+        # equal specifiers that are written differently are kept apart
+        assert spec("==1.0") == spec("==1.0.0")
+        assert str(spec(">=1.0").intersect_with(spec("==1.0.0"))) == "==1.0.0"
+        assert str(spec(">=1.0").intersect_with(spec("==1.0"))) == "==1.0"
+
+        assert spec(">=1.0").allows_all(spec(">=1.5, <2.0"))
+        assert not spec(">=1.0").allows_all(spec("<2.0"))
+        assert spec(">=1.0").allows_any(spec("<2.0"))
+        assert not spec(">=2.0").allows_any(spec("<1.0"))
+
+    def test_sorted_versions_matching(self):
+        versions = [ver(it) for it in (
+            "2.0", "1.0", "1.0.post1", "1.0+local", "1.1", "1.2a1", "1.2.dev0", "1.2", "1.5.post2", "0.9", "2.0.1",
+            "3.0rc1", "3.0", "named")]
+        specs = [
+            AllowAllVersions, RestrictAllVersions, spec(">=1.0"), spec(">1.0"), spec("<2.0"), spec("==1.0"),
+            spec("!=1.0"), spec("==1.0.*"), spec("~=1.1"), spec(">=1.0, !=1.2, <3"), spec("!=1.0, !=2.0"),
+            spec("<1.1").union_with(spec(">=2.0")), spec(">1.0.post1"), spec("==1.0+local"),
+            VersionMatch(ver("named"), False)]
+
+        for items in (versions, sorted(versions, reverse=True)):
+            index = SortedVersions(items)
+            for s in specs:
+                expected = [v for v in items if s.allows_version(v)]
+                assert [str(v) for v in index.matching(s)] == [str(v) for v in expected], f"mismatch for {s}"
+                assert index.count_matching(s) == len(expected), f"wrong count for {s}"
+
 
 def assert_spec(version: VersionSpecifier, expected_str: str) -> None:
     vstr = str(version)  # noqa
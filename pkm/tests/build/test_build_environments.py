@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+from unittest import TestCase
+from unittest.mock import patch
+
+from pkm.api.dependencies.dependency import Dependency
+from pkm.api.environments.environment import Environment
+from pkm.build import build_environments
+from pkm.build.build_environments import BuildEnvironments
+from pkm.launchers.executables import Executables
+from pkm.utils.files import temp_dir
+
+
+class TestBuildEnvironments(TestCase):
+
+    def test_reuse_and_isolation(self):
+        installations: List[List[str]] = []
+
+        def install(env: Environment, requirements: List[Dependency]):
+            installations.append([str(it) for it in requirements])
+            purelib = env.site_packages.purelib_path
+            (purelib / 'build_requirement.py').write_text(f"REQUIREMENTS = {installations[-1]!r}")
+            (purelib / 'build_requirement_hook.pth').write_text("import os; os.environ['BUILD_REQUIREMENT_HOOK'] = '1'")
+
+        def run(env: Environment, code: str) -> str:
+            return subprocess.run(
+                [str(env.interpreter_path), '-c', code], capture_output=True, check=True).stdout.decode().strip()
+
+        with temp_dir() as tdir:
+            pool = BuildEnvironments(tdir / 'pool', max_environments=1)
+            requirements = [Dependency.parse('setuptools >= 61'), Dependency.parse('wheel')]
+
+            with pool.create(tdir / 'build-1', Path(sys.executable), requirements, 'test', install) as first:
+                assert run(first, "import os, build_requirement; print(os.environ.get('BUILD_REQUIREMENT_HOOK'))") == '1'
+
+                # the build environment content shadows the pooled environment without modifying it
+                (first.site_packages.purelib_path / 'build_requirement.py').write_text("REQUIREMENTS = 'shadowed'")
+                assert run(first, "import build_requirement; print(build_requirement.REQUIREMENTS)") == 'shadowed'
+
+            reversed_requirements = list(reversed(requirements))
+            with pool.create(tdir / 'build-2', Path(sys.executable), reversed_requirements, 'test', install) as second:
+                assert run(second, "import build_requirement; print(build_requirement.REQUIREMENTS)") != 'shadowed'
+            assert len(installations) == 1
+
+            with patch.object(build_environments, '_EVICTION_GRACE_SECONDS', -1):
+                with pool.create(tdir / 'build-3', Path(sys.executable), [Dependency.parse('flit-core')], 'test',
+                                 install) as third:
+                    # the environment of a running build is not evicted
+                    with pool.create(tdir / 'build-4', Path(sys.executable), [Dependency.parse('hatchling')], 'test',
+                                     install):
+                        assert len(installations) == 3
+                        assert len(list((tdir / 'pool').iterdir())) == 2
+                        assert run(third, "import build_requirement; print(build_requirement.REQUIREMENTS)") \
+                               == "['flit-core']"
+
+                with pool.create(tdir / 'build-5', Path(sys.executable), [Dependency.parse('hatchling')], 'test',
+                                 install):
+                    assert len(list((tdir / 'pool').iterdir())) == 1
+
+    def test_environments_max_age(self):
+        installations: List[List[str]] = []
+
+        def install(env: Environment, requirements: List[Dependency]):
+            installations.append([str(it) for it in requirements])
+
+        with temp_dir() as tdir:
+            pool = BuildEnvironments(tdir / 'pool', max_age_hours=1)
+            requirements = [Dependency.parse('setuptools')]
+            now = time.time()
+
+            for build, hours_passed in enumerate((0, 0, 1)):
+                with patch.object(build_environments.time, 'time', return_value=now + hours_passed * 60 * 60):
+                    with pool.create(tdir / f"build-{build}", Path(sys.executable), requirements, 'test', install):
+                        pass
+
+            # the unpinned requirement is installed again (getting its latest version) once the environment is too old
+            assert len(installations) == 2
+
+    def test_pooled_scripts_are_runnable(self):
+        def install(env: Environment, requirements: List[Dependency]):
+            (env.site_packages.purelib_path / 'build_tool.py').write_text("def main(): print('build tool')")
+            Executables.generate(
+                env, Path(env.installation_target.scripts), 'build-tool',
+                "import sys, build_tool; print(sys.prefix); build_tool.main()")
+
+        with temp_dir() as tdir:
+            pool = BuildEnvironments(tdir / 'pool')
+            requirements = [Dependency.parse('build-tool')]
+            with pool.create(tdir / 'build', Path(sys.executable), requirements, 'test', install) as build_env:
+                # the build tool is found on the build environment path and executes using its interpreter
+                env = dict(os.environ)
+                with build_env.activate(env):
+                    output = subprocess.run(
+                        ['build-tool'], env=env, capture_output=True, check=True).stdout.decode().split()
+                assert output == [str(build_env.path), 'build', 'tool']
@@ -0,0 +1,64 @@
+from textwrap import dedent
+from unittest import TestCase
+
+from pkm.api.projects.project import Project
+from pkm.build import external_builders
+from pkm.utils.files import temp_dir, mkdir
+from pkm.utils.monitors import Monitor
+from pkm.utils.processes import ProcessExecutionMonitoredOp, ProcessExecutionOutputLineEvent
+
+_PYPROJECT = """
+[project]
+name = "test-project"
+version = "1.0.0"
+
+[build-system]
+requires = []
+build-backend = "test_backend"
+backend-path = ["."]
+"""
+
+_BACKEND = """
+import os
+
+def get_requires_for_build_wheel(config_settings=None):
+    print(f"requires {os.getpid()}")
+    return []
+
+def prepare_metadata_for_build_wheel(metadata_directory, config_settings=None):
+    os.chdir(metadata_directory)
+    os.makedirs('test_project-1.0.0.dist-info')
+    with open('test_project-1.0.0.dist-info/METADATA', 'w') as metadata:
+        metadata.write("Metadata-Version: 2.1\\nName: test-project\\nVersion: 1.0.0\\n")
+    print(f"metadata {os.getpid()}", end='')
+    return 'test_project-1.0.0.dist-info'
+"""
+
+
+class TestBuildHooksRunner(TestCase):
+
+    def test_hooks_served_by_a_single_process(self):
+        with temp_dir() as tdir:
+            project_path = mkdir(tdir / 'project')
+            (project_path / 'pyproject.toml').write_text(dedent(_PYPROJECT))
+            (project_path / 'test_backend.py').write_text(dedent(_BACKEND))
+            project = Project.load(project_path)
+
+            lines, processes = [], []
+
+            def with_proc(op: ProcessExecutionMonitoredOp):
+                def on_line(e: ProcessExecutionOutputLineEvent):
+                    lines.append(e.line)
+
+                processes.append(op.cmd)
+                with op.listen(on_line=on_line):
+                    yield
+
+            with Monitor.listen(with_proc=with_proc):
+                dist_info = external_builders.build_wheel(project, tdir / 'output', only_meta=True)
+
+            assert (dist_info / 'METADATA').exists()
+            assert len(processes) == 1
+
+            pids = {line.split()[1] for line in lines if line.startswith(('requires', 'metadata'))}
+            assert len(pids) == 1 and len(lines) == 2
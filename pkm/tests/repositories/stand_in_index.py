@@ -0,0 +1,215 @@
+import hashlib
+import io
+import json
+import threading
+from dataclasses import dataclass
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Tuple, Optional
+from zipfile import ZipFile
+
+
+@dataclass
+class _File:
+    content: bytes
+    metadata: bytes
+
+    @property
+    def sha256(self) -> str:
+        return hashlib.sha256(self.content).hexdigest()
+
+    @property
+    def metadata_sha256(self) -> str:
+        return hashlib.sha256(self.metadata).hexdigest()
+
+
+class StandInIndex:
+    """
+    local stand-in for a python package index, serves the pypi json api (`/pypi/<name>/json` and
+    `/pypi/<name>/<version>/json`), the simple api (`/simple/<name>/`) in both its html (pep 503) and json (pep 691)
+    forms and the core metadata files of the served wheels (pep 658)
+
+    usage example:
+    >>> with StandInIndex({'pkg': {'1.0': ['dep>=1']}, 'dep': {'1.0': []}}) as index:
+    ...     repository = SimpleRepository('stand-in', f"{index.url}/simple")
+
+    every served request is recorded in `requests` (as path, number of body bytes sent) so that tests and benchmarks
+    can count the traffic produced by a repository, range requests (and head requests) are supported unless
+    disabled
+    """
+
+    def __init__(self, projects: Dict[str, Dict[str, List[str]]], *, json_api: bool = True,
+                 serve_metadata: bool = True, range_requests: bool = True, wheel_padding: int = 0):
+        """
+        :param projects: project name -> version -> the project's requires-dist at that version
+        :param json_api: if false, the simple api will only be served as html (like pre pep 691 indexes)
+        :param serve_metadata: if false, core metadata files will not be served (like pre pep 658 indexes)
+        :param range_requests: if false, range requests will not be supported
+        :param wheel_padding: amount of (incompressible) bytes to add to each wheel, to simulate real world wheels
+        """
+        self.projects = projects
+        self.json_api = json_api
+        self.serve_metadata = serve_metadata
+        self.range_requests = range_requests
+        self.requests: List[Tuple[str, int]] = []
+        self._lock = threading.Lock()
+        self._files: Dict[str, _File] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+        for name, versions in projects.items():
+            for version, requires_dist in versions.items():
+                metadata = '\n'.join([
+                    'Metadata-Version: 2.1', f'Name: {name}', f'Version: {version}',
+                    *(f'Requires-Dist: {d}' for d in requires_dist)]).encode() + b'\n'
+
+                self._files[self.wheel_name(name, version)] = _File(
+                    _build_wheel(name, version, metadata, wheel_padding), metadata)
+
+    @staticmethod
+    def wheel_name(name: str, version: str) -> str:
+        return f"{name.replace('-', '_')}-{version}-py3-none-any.whl"
+
+    def file_content(self, file_name: str) -> bytes:
+        return self._files[file_name].content
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def bytes_sent(self) -> int:
+        return sum(size for _, size in self.requests)
+
+    def reset_statistics(self):
+        with self._lock:
+            self.requests.clear()
+
+    def __enter__(self) -> "StandInIndex":
+        index = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_HEAD(self):  # noqa
+                self._serve(send_body=False)
+
+            def do_GET(self):  # noqa
+                self._serve(send_body=True)
+
+            def _serve(self, send_body: bool):
+                status, content_type, body = index._respond(self.path, self.headers.get('accept', ''))
+                headers = {'content-type': content_type, 'etag': f'"{hashlib.md5(body).hexdigest()}"'}
+
+                if index.range_requests and status == 200:
+                    headers['accept-ranges'] = 'bytes'
+                    if (range_ := self.headers.get('range', '')).startswith('bytes='):
+                        start, end = (int(it) for it in range_[len('bytes='):].split('-'))
+                        headers['content-range'] = f"bytes {start}-{end}/{len(body)}"
+                        status, body = 206, body[start:end + 1]
+
+                headers['content-length'] = str(len(body))
+                with index._lock:
+                    index.requests.append((self.path, len(body) if send_body else 0))
+
+                self.send_response(status)
+                for header, value in headers.items():
+                    self.send_header(header, value)
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _respond(self, path: str, accept: str) -> Tuple[int, str, bytes]:
+        parts = [p for p in path.split('/') if p]
+
+        if len(parts) == 2 and parts[0] == 'files':
+            if file := self._files.get(parts[1]):
+                return 200, 'application/octet-stream', file.content
+            if self.serve_metadata and parts[1].endswith('.metadata') \
+                    and (file := self._files.get(parts[1][:-len('.metadata')])):
+                return 200, 'application/octet-stream', file.metadata
+
+        elif len(parts) == 2 and parts[0] == 'simple' and parts[1] in self.projects:
+            if self.json_api and 'application/vnd.pypi.simple.v1+json' in accept:
+                return 200, 'application/vnd.pypi.simple.v1+json', self._simple_json(parts[1])
+            return 200, 'text/html', self._simple_html(parts[1])
+
+        elif len(parts) == 3 and parts[0] == 'pypi' and parts[2] == 'json' and parts[1] in self.projects:
+            return 200, 'application/json', self._pypi_project_json(parts[1])
+
+        elif len(parts) == 4 and parts[0] == 'pypi' and parts[3] == 'json' \
+                and parts[2] in self.projects.get(parts[1], {}):
+            return 200, 'application/json', self._pypi_version_json(parts[1], parts[2])
+
+        return 404, 'text/plain', b'not found'
+
+    def _project_files(self, name: str) -> List[Tuple[str, _File]]:
+        return [(wheel, self._files[wheel]) for wheel in (self.wheel_name(name, v) for v in self.projects[name])]
+
+    def _simple_json(self, name: str) -> bytes:
+        files = []
+        for file_name, file in self._project_files(name):
+            entry = {'filename': file_name, 'url': f"../../files/{file_name}", 'hashes': {'sha256': file.sha256}}
+            if self.serve_metadata:
+                entry['core-metadata'] = entry['dist-info-metadata'] = {'sha256': file.metadata_sha256}
+            files.append(entry)
+
+        return json.dumps({'meta': {'api-version': '1.0'}, 'name': name, 'files': files}).encode()
+
+    def _simple_html(self, name: str) -> bytes:
+        links = []
+        for file_name, file in self._project_files(name):
+            metadata_attr = f' data-dist-info-metadata="sha256={file.metadata_sha256}"' if self.serve_metadata else ''
+            links.append(f'<a href="../../files/{file_name}#sha256={file.sha256}"{metadata_attr}>{file_name}</a><br/>')
+
+        return f"<html><body><h1>Links for {name}</h1>{''.join(links)}</body></html>".encode()
+
+    def _pypi_release_files(self, name: str, version: str) -> List[dict]:
+        file_name = self.wheel_name(name, version)
+        file = self._files[file_name]
+        return [{
+            'filename': file_name, 'packagetype': 'bdist_wheel', 'python_version': 'py3', 'requires_python': None,
+            'url': f"{self.url}/files/{file_name}", 'digests': {'sha256': file.sha256, 'md5': '0' * 32},
+            'size': len(file.content), 'upload_time': '2020-01-01T00:00:00', 'yanked': False, 'yanked_reason': None,
+            'comment_text': '', 'has_sig': False}]
+
+    def _pypi_info(self, name: str, version: str) -> dict:
+        return {'name': name, 'version': version, 'summary': f'the {name} project', 'description': f'# {name}\n',
+                'requires_python': None, 'requires_dist': self.projects[name][version] or None}
+
+    def _pypi_project_json(self, name: str) -> bytes:
+        latest = list(self.projects[name])[-1]
+        return json.dumps({
+            'info': self._pypi_info(name, latest), 'last_serial': 1,
+            'releases': {v: self._pypi_release_files(name, v) for v in self.projects[name]},
+            'urls': self._pypi_release_files(name, latest)}).encode()
+
+    def _pypi_version_json(self, name: str, version: str) -> bytes:
+        return json.dumps({
+            'info': self._pypi_info(name, version), 'last_serial': 1,
+            'urls': self._pypi_release_files(name, version)}).encode()
+
+
+def _build_wheel(name: str, version: str, metadata: bytes, padding: int) -> bytes:
+    dist_info = f"{name}-{version}.dist-info"
+    wheel = io.BytesIO()
+    with ZipFile(wheel, 'w') as zipf:
+        zipf.writestr(f"{name}/__init__.py", f"__version__ = '{version}'\n")
+        if padding:
+            # deterministic but incompressible (for the default zip storing) padding
+            zipf.writestr(f"{name}/_padding.bin", hashlib.shake_256(f"{name}{version}".encode()).digest(padding))
+        zipf.writestr(f"{dist_info}/METADATA", metadata)
+        zipf.writestr(f"{dist_info}/WHEEL", "Wheel-Version: 1.0\nGenerator: stand-in\nRoot-Is-Purelib: true\n"
+                                            "Tag: py3-none-any\n")
+        zipf.writestr(f"{dist_info}/RECORD", "")
+    return wheel.getvalue()
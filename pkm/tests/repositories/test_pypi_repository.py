@@ -0,0 +1,37 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from pkm.repositories.pypi_repository import _compact_index_of
+from pkm.utils.files import temp_dir
+from pkm.utils.http.http_client import FetchedResource
+
+_PROJECT_JSON = {
+    'info': {'name': 'test-project', 'version': '1.0.0'},
+    'releases': {
+        f"1.{i}.0": [
+            {'filename': f"test_project-1.{i}.0-py3-none-any.whl", 'packagetype': 'bdist_wheel', 'yanked': False,
+             'requires_python': '>=3.8', 'url': 'https://example.com/wheel', 'digests': {'sha256': '0' * 64},
+             'size': 1024},
+            {'filename': f"test_project-1.{i}.0.tar.gz", 'packagetype': 'sdist', 'yanked': i == 0,
+             'requires_python': None, 'url': 'https://example.com/sdist', 'digests': {'sha256': '1' * 64}}]
+        for i in range(100)}}
+
+
+class TestCompactIndex(TestCase):
+
+    def test_concurrent_construction(self):
+        with temp_dir() as tdir:
+            resource = FetchedResource(tdir / 'project.toml', tdir / 'project.json', tdir)
+            resource.data.write_text(json.dumps(_PROJECT_JSON))
+
+            with ThreadPoolExecutor(8) as executor:
+                indexes = list(executor.map(lambda _: _compact_index_of(resource), range(8)))
+
+            assert len(set(indexes)) == 1
+            assert sorted(it.name for it in tdir.iterdir()) == ['project.json', 'project.json.index.json']
+
+            index = json.loads(indexes[0].read_text())
+            assert index['info'] == _PROJECT_JSON['info']
+            assert len(index['releases']['1.0.0']) == 1 and len(index['releases']['1.1.0']) == 2
+            assert set(index['releases']['1.1.0'][0]) == {'filename', 'requires_python', 'url', 'digests'}
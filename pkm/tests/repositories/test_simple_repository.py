@@ -0,0 +1,74 @@
+from unittest import TestCase
+
+from pkm.api.environments.environment import Environment
+from pkm.api.packages.package_metadata import PackageMetadata
+from pkm.repositories.pypi_repository import PypiRepositoryBuilder
+from pkm.repositories.simple_repository import SimpleRepository, _has_static_dependencies
+from pkm.utils.files import temp_dir
+from tests.repositories.stand_in_index import StandInIndex
+
+_PROJECTS = {
+    'alpha': {'1.0': ['beta>=1.0'], '1.1': ['beta>=1.1', 'gamma; python_version < "3"']},
+    'beta': {'1.0': [], '1.1': []},
+}
+
+
+class TestSimpleRepository(TestCase):
+
+    def _check_resolution(self, index: StandInIndex, repository: SimpleRepository):
+        env = Environment.current()
+        packages = repository.match('alpha >=1.0', env)
+        assert [str(p.version) for p in packages] == ['1.1', '1.0']
+
+        latest = packages[0]
+        assert [str(d) for d in latest.dependencies(env.installation_target)] == ['beta >=1.1']
+
+    def test_json_api_with_metadata_files(self):
+        with StandInIndex(_PROJECTS) as index:
+            self._check_resolution(index, SimpleRepository('stand-in', f"{index.url}/simple"))
+
+            requested = [path for path, _ in index.requests]
+            assert requested == ['/simple/alpha/', f"/files/{index.wheel_name('alpha', '1.1')}.metadata"]
+
+    def test_html_api_with_metadata_files(self):
+        with StandInIndex(_PROJECTS, json_api=False) as index:
+            self._check_resolution(index, SimpleRepository('stand-in', f"{index.url}/simple"))
+
+            requested = [path for path, _ in index.requests]
+            assert requested == ['/simple/alpha/', f"/files/{index.wheel_name('alpha', '1.1')}.metadata"]
+
+    def test_lazy_wheel_metadata(self):
+        with StandInIndex(_PROJECTS, serve_metadata=False, wheel_padding=1024 * 1024) as index:
+            self._check_resolution(index, SimpleRepository('stand-in', f"{index.url}/simple"))
+
+            wheel = f"/files/{index.wheel_name('alpha', '1.1')}"
+            assert [path for path, _ in index.requests] == ['/simple/alpha/', wheel, wheel]
+            assert index.bytes_sent < 128 * 1024
+
+    def test_fallback_to_artifact_download(self):
+        with StandInIndex(_PROJECTS, serve_metadata=False, range_requests=False) as index:
+            self._check_resolution(index, SimpleRepository('stand-in', f"{index.url}/simple"))
+
+            wheel = f"/files/{index.wheel_name('alpha', '1.1')}"
+            assert [path for path, _ in index.requests] == ['/simple/alpha/', wheel, wheel]
+            assert index.requests[-1][1] == len(index.file_content(index.wheel_name('alpha', '1.1')))
+
+    def test_pypi_simple_api_mode(self):
+        with StandInIndex(_PROJECTS) as index:
+            repository = PypiRepositoryBuilder().build('stand-in', f"{index.url}/simple", api='simple')
+            assert isinstance(repository, SimpleRepository)
+            self._check_resolution(index, repository)
+
+        with self.assertRaises(ValueError):
+            PypiRepositoryBuilder().build('stand-in', 'main', api='unknown')
+
+    def test_sdist_metadata_with_static_dependencies(self):
+        def metadata(*lines: str) -> PackageMetadata:
+            with temp_dir() as tdir:
+                (tdir / 'METADATA').write_text('\n'.join(['Name: alpha', 'Version: 1.0', *lines]) + '\n')
+                return PackageMetadata.load(tdir / 'METADATA')
+
+        assert not _has_static_dependencies(metadata('Metadata-Version: 2.1', 'Requires-Dist: beta'))
+        assert not _has_static_dependencies(metadata('Metadata-Version: 2.2', 'Dynamic: Requires-Dist'))
+        assert _has_static_dependencies(metadata('Metadata-Version: 2.2', 'Dynamic: Summary', 'Requires-Dist: beta'))
+        assert _has_static_dependencies(metadata('Metadata-Version: 2.3'))
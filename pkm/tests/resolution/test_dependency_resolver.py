@@ -0,0 +1,62 @@
+import threading
+import time
+from typing import List, Optional
+from unittest import TestCase
+
+from pkm.api.dependencies.dependency import Dependency
+from pkm.api.environments.environment import Environment
+from pkm.api.pkm import pkm
+from pkm.resolution.dependency_resolver import resolve_dependencies
+from tests.api.repositories.test_repository import DummyRepository, DummyPackage
+
+
+class TestDependencyResolver(TestCase):
+
+    def setUp(self):
+        self._config = pkm.config.resolution_cache, pkm.config.resolution_prefetch_versions
+        pkm.config.resolution_cache, pkm.config.resolution_prefetch_versions = False, 8
+
+    def tearDown(self):
+        pkm.config.resolution_cache, pkm.config.resolution_prefetch_versions = self._config
+
+    def test_no_speculations_outlive_the_resolution(self):
+        repo = SlowRepository({'root': ['1.0'], 'x': [f'{i}.0' for i in range(1, 9)]}, {'root': ['x']})
+        target = Environment.current().installation_target
+
+        resolved = resolve_dependencies(Dependency.parse('root ==1.0'), target, repo)
+        assert sorted(f"{p.name} {p.version}" for p in resolved) == ['root 1.0', 'x 8.0']
+
+        with repo.lock:
+            started, completed = repo.started, repo.completed
+        assert started == completed, "speculations are still running after the resolution"
+
+        time.sleep(0.3)  # queued speculations would have started by now
+        assert repo.started == started, "speculations were started after the resolution"
+
+
+class SlowRepository(DummyRepository):
+
+    def __init__(self, packages, dependencies):
+        super().__init__(packages)
+        self.lock = threading.Lock()
+        self.started = self.completed = 0
+
+        for name, versions in packages.items():
+            self._packages[name] = [
+                SlowPackage(self, name, version, dependencies.get(name, [])) for version in versions]
+
+
+class SlowPackage(DummyPackage):
+
+    def __init__(self, repo: SlowRepository, name: str, version: str, dependencies: List[str]):
+        super().__init__(name, version)
+        self._repo = repo
+        self._dependencies = [Dependency.parse(it) for it in dependencies]
+
+    def dependencies(self, target, extras: Optional[List[str]] = None) -> List[Dependency]:
+        with self._repo.lock:
+            self._repo.started += 1
+        time.sleep(0.1)  # e.g., building the package metadata
+        with self._repo.lock:
+            self._repo.completed += 1
+        return self._dependencies
@@ -2,6 +2,7 @@ from typing import Callable
 from unittest import TestCase
 
 from pkm.resolution.pubgrub import *
+from pkm.utils.monitors import Monitor
 
 
 class TestSolver(TestCase):
@@ -153,6 +154,60 @@ class TestSolver(TestCase):
 
         assert_failure(lambda: Solver(problem).solve())
 
+    def test_propagation_counters(self):
+        problem = ExampleProblem({
+            'root 1.0.0': ['foo >=1.0.0'],
+            'foo 2.0.0': ['bar ~=1.0'],
+            'foo 1.0.0': [],
+            'bar 1.0.0': ['foo ~=1.0'],
+        })
+
+        statistics: List[DependencyResolutionMonitoredOp] = []
+
+        def leave_resolution(mop_: DependencyResolutionMonitoredOp):
+            statistics.append(mop_)
+
+        with Monitor.listen(leave_resolution=leave_resolution):
+            Solver(problem).solve()
+
+        mop = statistics[0]
+        assert mop.conflicts == 1
+        assert 0 < mop.incompatibilities_checked <= mop.incompatibilities_visited
+        assert mop.derivations > 0
+
+    def test_prefetch_hints(self):
+        problem = PrefetchRecordingProblem({
+            'root 1.0.0': ['foo >=1.0.0'],
+            'foo 2.0.0': ['bar ~=1.0'],
+            'foo 1.0.0': [],
+            'bar 1.0.0': ['foo ~=1.0'],
+        })
+
+        Solver(problem).solve()
+        assert problem.prefetched == [('foo', '>=1.0.0'), ('bar', '~=1.0')]
+        assert problem.canceled == ['bar']
+
+    def test_partial_solution_backtracking(self):
+        solution = PartialSolution()
+        solution.assign(Term.create('root', '==1.0.0'))
+        solution.require(['foo', 'bar'])
+        solution.assign(Term.create('foo', '==1.0.0'))
+        solution.require(['baz'])
+        solution.assign(Term.create('baz', '<2.0.0'), cause=Incompatibility.create([], external_cause='test'))
+        solution.assign(Term.create('bar', '==2.0.0'))
+
+        solution.backtrack(1)
+        assert solution.decisions().keys() == {'root', 'foo'}
+        assert solution.undecided_packages() == ['bar', 'baz']
+        assert not solution.assignments_by_package['bar']
+        assert len(solution.assignments_by_package['baz']) == 1
+
+        solution.backtrack(0)
+        assert solution.decisions().keys() == {'root'}
+        assert solution.undecided_packages() == ['foo', 'bar']
+        assert not solution.assignments_by_package['baz']
+        assert not solution.requires('baz')
+
     # def test_error_reporting(self):
     #     # GOOD
     #     # problem = ExampleProblem({
@@ -195,6 +250,20 @@ class ExampleProblem(Problem):
         return True
 
 
+class PrefetchRecordingProblem(ExampleProblem):
+
+    def __init__(self, depency_graph: Dict[str, List[str]]):
+        super().__init__(depency_graph)
+        self.prefetched: List[Tuple[str, str]] = []
+        self.canceled: List[str] = []
+
+    def prefetch(self, package: str, constraint: VersionSpecifier):
+        self.prefetched.append((package, str(constraint)))
+
+    def cancel_prefetch(self, package: str):
+        self.canceled.append(package)
+
+
 def assert_solution(expected: Dict[str, str], solution: Dict[str, Version]):
     assert len(expected) == len(solution), \
         f'expected {expected} and solution {solution}, does not have the same length'
@@ -0,0 +1,67 @@
+from typing import Dict, List, Optional
+from unittest import TestCase
+from unittest.mock import patch, PropertyMock
+
+from pkm.api.dependencies.dependency import Dependency
+from pkm.api.environments.environment import Environment
+from pkm.resolution.resolution_cache import ResolutionCache
+from pkm.utils.files import temp_dir
+from tests.api.repositories.test_repository import DummyRepository
+
+
+class TestResolutionCache(TestCase):
+
+    def test_store_and_validate(self):
+        repo = FingerprintedRepository({'root': ['1.0'], 'x': ['1.0', '2.0'], 'y': ['1.0']})
+        env = Environment.current()
+        root = Dependency.parse('root ==1.0')
+
+        with temp_dir() as workspace:
+            cache = ResolutionCache(workspace)
+            key = cache.request_key(root, env, repo, {})
+            assert cache.load(key, env, repo) is None
+
+            resolved = [repo.match('root ==1.0', env)[0], repo.match('x ==2.0', env)[0]]
+            cache.store(key, env, repo, ['root', 'x', 'y'], resolved)
+
+            loaded = cache.load(key, env, repo)
+            assert [p.descriptor for p in loaded] == [p.descriptor for p in resolved]
+
+            assert cache.request_key(root, env, repo, {'x': Dependency.parse('x ==1.0')}) != key
+
+            repo.fingerprints['y'] = 'changed'
+            assert cache.load(key, env, repo) is None
+
+    def test_unknown_fingerprints_are_not_cached(self):
+        repo = FingerprintedRepository({'root': ['1.0'], 'x': ['1.0']})
+        env = Environment.current()
+
+        with temp_dir() as workspace:
+            cache = ResolutionCache(workspace)
+            key = cache.request_key(Dependency.parse('root ==1.0'), env, repo, {})
+
+            repo.fingerprints['x'] = None
+            cache.store(key, env, repo, ['root', 'x'], [repo.match('x ==1.0', env)[0]])
+            assert cache.load(key, env, repo) is None
+
+    def test_keyed_by_compatibility_fingerprint(self):
+        repo = FingerprintedRepository({'root': ['1.0']})
+        env = Environment.current()
+
+        with temp_dir() as workspace:
+            cache = ResolutionCache(workspace)
+            key = cache.request_key(Dependency.parse('root ==1.0'), env, repo, {})
+
+            # same markers, but an interpreter that selects different artifacts
+            with patch.object(Environment, 'compatibility_fingerprint', new_callable=PropertyMock, return_value='x'):
+                assert cache.request_key(Dependency.parse('root ==1.0'), env, repo, {}) != key
+
+
+class FingerprintedRepository(DummyRepository):
+
+    def __init__(self, packages: Dict[str, List[str]]):
+        super().__init__(packages)
+        self.fingerprints: Dict[str, Optional[str]] = {name: 'initial' for name in packages}
+
+    def fingerprint(self, package_name: str, env: Environment) -> Optional[str]:
+        return self.fingerprints.get(package_name)
@@ -0,0 +1,202 @@
+import gzip
+import hashlib
+import socket
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Tuple, Optional
+from unittest import TestCase
+
+from pkm.utils.files import temp_dir
+from pkm.utils.http.async_engine import AsyncHttpEngine
+from pkm.utils.http.http_client import HttpClient, HttpException, Url
+from pkm.utils.promises import await_all_promises
+
+
+_FLAKY_CONTENT = bytes(range(256)) * 1024
+
+
+class _SlowServer:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests: List[Tuple[str, Optional[str]]] = []
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "_SlowServer":
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):  # noqa
+                with server._lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                time.sleep(server.delay)
+                with server._lock:
+                    server.in_flight -= 1
+                    server.requests.append((self.path, self.headers.get('range')))
+                    attempt = sum(1 for path, _ in server.requests if path == self.path)
+
+                if self.path in ('/flaky', '/resumable'):
+                    # the first attempt on /flaky is disconnected mid-stream, later attempts support resuming
+                    range_ = self.headers.get('range')
+                    if range_ and self.headers.get('if-range') == '"v1"':
+                        start = int(range_[len('bytes='):-1])
+                        self.send_response(206)
+                        self.send_header('content-range', f"bytes {start}-{len(_FLAKY_CONTENT) - 1}/{len(_FLAKY_CONTENT)}")
+                    else:
+                        start = 0
+                        self.send_response(200)
+                    self.send_header('etag', '"v1"')
+                    self.send_header('accept-ranges', 'bytes')
+                    self.send_header('content-length', str(len(_FLAKY_CONTENT) - start))
+                    self.end_headers()
+                    if attempt == 1 and self.path == '/flaky':
+                        self.wfile.write(_FLAKY_CONTENT[:len(_FLAKY_CONTENT) // 2])
+                        self.wfile.flush()
+                        self.connection.shutdown(socket.SHUT_RDWR)
+                        self.close_connection = True
+                    else:
+                        self.wfile.write(_FLAKY_CONTENT[start:])
+                elif self.path == '/unavailable' and attempt <= 2:
+                    self.send_response(503)
+                    self.send_header('retry-after', '0')
+                    self.send_header('content-length', '0')
+                    self.end_headers()
+                elif self.path == '/missing':
+                    self.send_response(404)
+                    self.send_header('content-length', '0')
+                    self.end_headers()
+                elif self.path == '/chunked':
+                    self.send_response(200)
+                    self.send_header('transfer-encoding', 'chunked')
+                    self.send_header('content-encoding', 'gzip')
+                    self.end_headers()
+                    body = gzip.compress(b'chunked content ' * 1000)
+                    for i in range(0, len(body), 100):
+                        chunk = body[i:i + 100]
+                        self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                else:
+                    body = self.path.encode()
+                    self.send_response(200)
+                    self.send_header('content-length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class TestHttpClient(TestCase):
+
+    def test_concurrency_limits(self):
+        with temp_dir() as workspace, _SlowServer(delay=0.05) as server:
+            client = HttpClient(workspace, max_connections=8, max_connections_per_host=3)
+            promises = [client.fetch_resource_async(f"{server.url}/resource-{i}") for i in range(24)]
+            await_all_promises(promises)
+
+            for i, promise in enumerate(promises):
+                assert promise.result().data.read_text() == f"/resource-{i}"
+
+            assert server.max_in_flight == 3
+
+    def test_chunked_gzip_and_errors(self):
+        with temp_dir() as workspace, _SlowServer(delay=0) as server:
+            client = HttpClient(workspace)
+            assert client.fetch_resource(f"{server.url}/chunked").data.read_bytes() == b'chunked content ' * 1000
+
+            with self.assertRaises(HttpException):
+                client.fetch_resource(f"{server.url}/missing")
+            assert client.cached_resource(f"{server.url}/missing") is None
+
+    def test_resume_and_retry(self):
+        with temp_dir() as workspace, _SlowServer(delay=0) as server:
+            client = HttpClient(workspace, backoff_base=0.01)
+            expected_hash = {'sha256': hashlib.sha256(_FLAKY_CONTENT).hexdigest()}
+
+            resource = client.fetch_resource(f"{server.url}/flaky", hashes=expected_hash)
+            assert resource.data.read_bytes() == _FLAKY_CONTENT
+            assert not resource.partial.exists()
+            assert resource.fetch_info_data.hash == expected_hash
+            assert server.requests == [('/flaky', None), ('/flaky', f"bytes={len(_FLAKY_CONTENT) // 2}-")]
+
+            assert client.fetch_resource(f"{server.url}/unavailable").data.read_text() == '/unavailable'
+            assert [path for path, _ in server.requests].count('/unavailable') == 3
+
+    def test_resume_partial_of_previous_run(self):
+        with temp_dir() as workspace, _SlowServer(delay=0) as server:
+            client = HttpClient(workspace, backoff_base=0.01)
+            expected_hash = {'sha256': hashlib.sha256(_FLAKY_CONTENT).hexdigest()}
+
+            # simulate a download that was interrupted in a previous run
+            resource = client._resource_files_of(Url.parse(f"{server.url}/resumable"))  # noqa
+            resource.partial.parent.mkdir(parents=True, exist_ok=True)
+            resource.partial.write_bytes(_FLAKY_CONTENT[:1000])
+            resource.partial_info.write_text('etag = \'"v1"\'\n')
+
+            resource = client.fetch_resource(f"{server.url}/resumable", hashes=expected_hash)
+            assert server.requests == [('/resumable', 'bytes=1000-')]
+            assert resource.data.read_bytes() == _FLAKY_CONTENT
+            assert resource.fetch_info_data.hash == expected_hash
+            assert not resource.partial.exists() and not resource.partial_info.exists()
+
+    def test_hash_mismatch(self):
+        with temp_dir() as workspace, _SlowServer(delay=0) as server:
+            client = HttpClient(workspace, backoff_base=0.01)
+            with self.assertRaises(HttpException):
+                client.fetch_resource(f"{server.url}/resource", hashes={'sha256': '0' * 64})
+            assert client.cached_resource(f"{server.url}/resource") is None
+
+    def test_hashes_computed_while_streaming(self):
+        with temp_dir() as workspace, _SlowServer(delay=0) as server:
+            client = HttpClient(workspace)
+            expected = {name: hashlib.new(name, b'/resource').hexdigest() for name in ('sha256', 'md5')}
+
+            resource = client.fetch_resource(f"{server.url}/resource", hashes={'md5': expected['md5']})
+            assert resource.fetch_info_data.hash == expected
+
+            # the stored digests are used, the data itself is not read again
+            resource.data.write_bytes(b'changed')
+            assert resource.is_hash_valid('sha256', expected['sha256'])
+            assert resource.is_hash_valid('md5', expected['md5'])
+
+    def test_slow_sink_does_not_stall_other_transfers(self):
+        with _SlowServer(delay=0) as server:
+            engine = AsyncHttpEngine()
+            try:
+                slow_sink, fast_sink = _SlowSink(delay=1), _SlowSink(delay=0)
+                slow = engine.download(f"{server.url}/flaky-free", {}, lambda _: slow_sink)
+                time.sleep(0.2)  # the slow download is now writing its body
+
+                engine.download(f"{server.url}/resource", {}, lambda _: fast_sink).result(timeout=5)
+                assert not slow.done(), "the fast download waited for the slow sink"
+                assert bytes(fast_sink.data) == b'/resource'
+
+                slow.result(timeout=5)
+                assert bytes(slow_sink.data) == b'/flaky-free'
+            finally:
+                engine.close()
+
+
+class _SlowSink:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.data = bytearray()
+
+    def write(self, data: bytes):
+        time.sleep(self.delay)  # e.g., a slow disk
+        self.data.extend(data)
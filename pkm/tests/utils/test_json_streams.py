@@ -0,0 +1,49 @@
+import io
+import json
+from unittest import TestCase
+
+from pkm.utils.json_streams import JsonStreamReader
+
+
+class TestJsonStreamReader(TestCase):
+
+    def test_selective_reading(self):
+        document = {
+            "info": {"name": "pkg", "numbers": [1, 2.5, -3e10, 12345678901234567890]},
+            "ignored": {"deep": [{"a": "}{,:\\\""}] * 20},
+            "releases": {f"1.{i}": [{"filename": f"pkg-1.{i}.tar.gz"}] for i in range(50)},
+            "last": 1234567,
+        }
+        text = json.dumps(document)
+
+        for chunk_size in (1, 2, 3, 7, 64, 1 << 20):
+            reader = JsonStreamReader(io.StringIO(text), chunk_size)
+            info, releases, last = None, {}, None
+            for key in reader.iter_object():
+                if key == 'info':
+                    info = reader.read_value()
+                elif key == 'releases':
+                    for version in reader.iter_object():
+                        if version.endswith('7'):
+                            releases[version] = reader.read_value()
+                        else:
+                            reader.skip_value()
+                elif key == 'last':
+                    last = reader.read_value()
+                else:
+                    reader.skip_value()
+
+            assert info == document['info']
+            assert releases == {k: v for k, v in document['releases'].items() if k.endswith('7')}
+            assert last == document['last']
+
+    def test_empty_and_malformed(self):
+        assert list(JsonStreamReader(io.StringIO(' { } ')).iter_object()) == []
+
+        reader = JsonStreamReader(io.StringIO('{"a": 1'), 2)
+        with self.assertRaises(json.JSONDecodeError):
+            for _ in reader.iter_object():
+                reader.skip_value()
+
+        with self.assertRaises(json.JSONDecodeError):
+            list(JsonStreamReader(io.StringIO('[1, 2]')).iter_object())
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+from unittest import TestCase
+
+from pkm.api.pkm import Pkm
+from pkm.utils.files import temp_dir
+from pkm.utils.monitors import Monitor
+from pkm.utils.multiproc import ProcessPoolExecutor
+from pkm.utils.multiproc.transport import SHARED_MEMORY_MIN_PAYLOAD
+from pkm.utils.processes import monitored_run, ProcessExecutionMonitoredOp, ProcessExecutionOutputLineEvent
+
+_LOADED_MODULES = "[it in __import__('sys').modules for it in ('pkm.utils.hashes', 'pkm.api.pkm')]"
+
+
+class TestProcessPoolExecutor(TestCase):
+
+    def test_warm_workers(self):
+        pool = ProcessPoolExecutor(
+            max_workers=2, max_inactivity_seconds=1, min_workers=1, preload_modules=['pkm.utils.hashes'])
+        try:
+            pool.warm_up()
+            assert pool.execute(eval, _LOADED_MODULES).result() == [True, False]
+            assert pool.average_worker_startup_seconds > 0
+
+            # idle workers are retired, except for the warm ones, that keep serving tasks
+            time.sleep(2.5)
+            assert len(pool._workers) == 1  # noqa
+            worker_pids = {it._proc.pid for it in pool._workers.values()}  # noqa
+            assert pool.execute(os.getpid).result() in worker_pids
+        finally:
+            pool.close()
+
+    def test_pkm_keeps_warm_workers(self):
+        with temp_dir() as home:
+            pkm = Pkm(home)
+            pool = pkm.processes
+            try:
+                assert pool.min_workers == pkm.config.concurrency_warm_workers > 0
+                pool.max_inactivity_seconds = 1
+
+                pool.warm_up(pool.min_workers + 1)
+                time.sleep(2.5)
+
+                # the warm workers survive the inactivity timeout, with their modules already loaded
+                assert len(pool._workers) == min(pool.min_workers, pool._max_workers)  # noqa
+                worker_pids = {it._proc.pid for it in pool._workers.values()}  # noqa
+                assert pool.execute(os.getpid).result() in worker_pids
+                assert pool.execute(eval, _LOADED_MODULES).result() == [True, True]
+            finally:
+                pool.close()
+
+    def test_large_results_and_forwarded_monitoring(self):
+        pool = ProcessPoolExecutor(max_workers=1)
+        try:
+            payload = b'x' * (SHARED_MEMORY_MIN_PAYLOAD * 4)
+            assert pool.execute(bytes, payload).result() == payload
+
+            lines, leaves = [], []
+
+            def with_proc(op: ProcessExecutionMonitoredOp):
+                def on_line(e: ProcessExecutionOutputLineEvent):
+                    lines.append(e.line)
+
+                with op.listen(on_line=on_line):
+                    yield
+                leaves.append(op.execution_name)
+
+            with Monitor.listen(with_proc=with_proc):
+                pool.execute(
+                    monitored_run, 'echo', [sys.executable, '-c', 'print("hello")\nprint("world")']).result()
+
+            assert lines[:2] == ['hello', 'world']
+            assert leaves == ['echo']
+        finally:
+            pool.close()